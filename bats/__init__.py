@@ -9,3 +9,4 @@ More detailed information is stored in LICENSE.txt
 """
 
 from .parser import Exchange
+from .symbols import SymbolTable, NO_SYMBOL
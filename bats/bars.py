@@ -0,0 +1,238 @@
+"""
+@file           bars.py
+@description    Incremental OHLCV / VWAP bars from normalized events
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+BarBuilder is an Exchange consumer. Trades (Trade, Executed Order and,
+optionally, Trade Report messages) update per symbol running values kept
+in arrays indexed by symbol id; a bar is emitted for every symbol with
+trades left (not all broken) once the feed clock passes the end of the
+interval. Executions without a price on the wire take the price of the
+executed order, so Add, Modify, Reduce and Delete events are tracked as
+well.
+
+Executions are indexed by id (bats.executions.ExecutionIndex), so a Trade
+Break is resolved in O(1): inside the open interval its volume, notional
+and trade count are taken back out (open, high, low and close are kept);
+a break of a bar already emitted is reported through on_correction.
+
+    bars = exchange.add_consumer(BarBuilder((1, 60), on_bar=print))
+
+Prices are in ticks of 1 / PRICE_SCALE, times in ns since the epoch.
+"""
+
+from array import array
+from collections import namedtuple
+
+from .executions import ExecutionIndex
+from .store import EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE, \
+    EV_TRADE, EV_TRADE_BREAK, EV_TRADE_REPORT, EV_CLEAR
+from .symbols import NO_SYMBOL
+
+Bar = namedtuple('Bar', (
+    'interval', 'symbol', 'start', 'open', 'high', 'low', 'close',
+    'volume', 'vwap', 'trades'
+))
+
+# Trade Break of an emitted bar: shares and notional to take out of it
+Correction = namedtuple('Correction', (
+    'interval', 'symbol', 'start', 'shares', 'price', 'exec_id'
+))
+
+
+class Aggregator(object):
+    """Running bars of one interval"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.length = int(interval * 1000000000)
+        self.start = None
+        self.end = None
+        self.active = []        # symbol ids traded in the open interval
+        self.member = bytearray()   # symbol id => 1 when in self.active
+
+        self.open = array('q')
+        self.high = array('q')
+        self.low = array('q')
+        self.close = array('q')
+        self.volume = array('q')
+        self.notional = array('q')
+        self.trades = array('q')
+
+    def grow(self, size):
+        extra = size - len(self.open)
+        self.member.extend(bytes(extra))
+        for values in (self.open, self.high, self.low, self.close,
+                       self.volume, self.notional, self.trades):
+            values.extend([0] * extra)
+
+    def begin(self, ts):
+        self.start = ts - ts % self.length
+        self.end = self.start + self.length
+
+    def add(self, sid, price, shares):
+        if sid >= len(self.open):
+            self.grow(max(sid + 1, 2 * len(self.open)))
+        if not self.member[sid]:
+            self.member[sid] = 1
+            self.active.append(sid)
+            self.open[sid] = self.high[sid] = self.low[sid] = price
+        elif price > self.high[sid]:
+            self.high[sid] = price
+        elif price < self.low[sid]:
+            self.low[sid] = price
+        self.close[sid] = price
+        self.volume[sid] += shares
+        self.notional[sid] += price * shares
+        self.trades[sid] += 1
+
+    def remove(self, sid, price, shares):
+        if sid < len(self.trades) and self.trades[sid]:
+            self.volume[sid] -= shares
+            self.notional[sid] -= price * shares
+            self.trades[sid] -= 1
+
+    def bar(self, sid):
+        volume = self.volume[sid]
+        return Bar(self.interval, sid, self.start, self.open[sid],
+                   self.high[sid], self.low[sid], self.close[sid], volume,
+                   self.notional[sid] / volume if volume else 0.0,
+                   self.trades[sid])
+
+    """
+    Close the open interval
+    @return     list of Bar, one per symbol with trades left (all of a
+                symbol's trades may have been broken)
+    """
+    def roll(self, ts):
+        bars = []
+        for sid in self.active:
+            if self.trades[sid]:
+                bars.append(self.bar(sid))
+            self.member[sid] = 0
+            self.volume[sid] = self.notional[sid] = self.trades[sid] = 0
+        self.active = []
+        self.begin(ts)
+        return bars
+
+
+class BarBuilder(object):
+    """
+    @param      intervals, bar lengths in seconds
+    @param      on_bar, called with every Bar emitted, appended to
+                self.bars by default
+    @param      on_correction, called with a Correction for a break of an
+                emitted bar, appended to self.corrections by default
+    @param      reports, count Trade Report messages (off book trades)
+    @param      retention, seconds of feed time a trade can be broken
+    """
+
+    def __init__(self, intervals=(1, 60), on_bar=None, on_correction=None,
+                 reports=True, retention=8 * 3600):
+        self.aggregators = [Aggregator(interval) for interval in intervals]
+        self.bars = []
+        self.corrections = []
+        self.on_bar = on_bar or self.bars.append
+        self.on_correction = on_correction or self.corrections.append
+        self.reports = reports
+
+        self.next_close = None
+        # order id => [symbol id, price, shares, unit]
+        self.orders = {}
+        self.executions = ExecutionIndex(retention)
+
+    def on_event(self, event):
+        ts = event.ts
+        if self.next_close is None or ts >= self.next_close:
+            self.roll(ts)
+
+        etype = event.etype
+        if etype == EV_TRADE:
+            self.trade(event.symbol, ts, event.price, event.shares,
+                       event.exec_id)
+        elif etype == EV_EXECUTE:
+            order = self.orders.get(event.order_id)
+            if order is None:
+                return
+            order[2] -= event.shares
+            if order[2] <= 0:
+                del self.orders[event.order_id]
+            self.trade(order[0], ts, event.price or order[1], event.shares,
+                       event.exec_id)
+        elif etype == EV_ADD:
+            self.orders[event.order_id] = [event.symbol, event.price,
+                                           event.shares, event.aux_shares]
+        elif etype == EV_DELETE:
+            self.orders.pop(event.order_id, None)
+        elif etype == EV_MODIFY:
+            order = self.orders.get(event.order_id)
+            if order is not None:
+                order[1] = event.price
+                order[2] = event.shares
+        elif etype == EV_REDUCE:
+            order = self.orders.get(event.order_id)
+            if order is not None:
+                order[2] -= event.shares
+                if order[2] <= 0:
+                    del self.orders[event.order_id]
+        elif etype == EV_TRADE_BREAK:
+            self.trade_break(event.exec_id)
+        elif etype == EV_TRADE_REPORT:
+            if self.reports:
+                self.trade(event.symbol, ts, event.price, event.shares, 0)
+        elif etype == EV_CLEAR:
+            self.clear(event.symbol, event.aux_shares)
+
+    def trade(self, sid, ts, price, shares, exec_id):
+        if sid == NO_SYMBOL:
+            return
+        for aggregator in self.aggregators:
+            aggregator.add(sid, price, shares)
+        if exec_id:
+            self.executions.add(exec_id, ts, sid, shares, price)
+
+    def trade_break(self, exec_id):
+        execution = self.executions.pop(exec_id)
+        if execution is None:
+            return
+        ts, order_id, sid, shares, price, side = execution
+        for aggregator in self.aggregators:
+            if ts >= aggregator.start:
+                aggregator.remove(sid, price, shares)
+            else:
+                self.on_correction(Correction(
+                    aggregator.interval, sid, ts - ts % aggregator.length,
+                    shares, price, exec_id))
+
+    # Same as OrderBook.clear: a symbol, or the orders of a unit for
+    # NO_SYMBOL (every order for unit 0, BATS text)
+    def clear(self, sid, unit=0):
+        orders = self.orders
+        if sid == NO_SYMBOL and not unit:
+            orders.clear()
+            return
+        column, value = (3, unit) if sid == NO_SYMBOL else (0, sid)
+        for order_id in [oid for oid, order in orders.items()
+                         if order[column] == value]:
+            del orders[order_id]
+
+    # Emit the bars of every interval ending at or before ts
+    def roll(self, ts):
+        for aggregator in self.aggregators:
+            if aggregator.end is None:
+                aggregator.begin(ts)
+            elif ts >= aggregator.end:
+                for bar in aggregator.roll(ts):
+                    self.on_bar(bar)
+        self.next_close = min(a.end for a in self.aggregators)
+
+    # Emit the bars of the open intervals, e.g. at the end of the session
+    def flush(self):
+        for aggregator in self.aggregators:
+            if aggregator.end is not None:
+                for bar in aggregator.roll(aggregator.end):
+                    self.on_bar(bar)
@@ -0,0 +1,274 @@
+"""
+@file           batch.py
+@description    Multi-file, multi-day batch runner over a process pool
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Each capture file (BATS text or BATS MC binary, gzip/xz/zstd or
+uncompressed) is parsed whole by one worker process. Files are handed out
+largest first, so the long days start early and the short ones fill the
+gaps at the end. The events of a file go to an event store in the
+directory of its trading day, taken from the YYYYMMDD in the file name:
+
+    output/20261018/<file name>.evt
+
+A worker checkpoints the parser and the number of records written every
+`checkpoint_interval` seconds (<file name>.evt.ckp) and leaves a
+<file name>.evt.done summary when the file is finished. Running the same
+batch again skips finished files and resumes interrupted ones from their
+checkpoint.
+
+    report = run_batch(glob.glob("captures/*.gz"), "events",
+                       factory=batsmc.ring.RingExchange)
+    print(report.format())
+
+A batch of both protocols picks the factory of each file by the end of
+its name, with or without a compression suffix (longest match first):
+
+    run_batch(paths, "events", factories={
+        '.pitch': ShardExchange, '.bin': batsmc.ring.RingExchange})
+"""
+
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+from multiprocessing import Pool
+from struct import pack, unpack_from
+
+from . import checkpoint
+from .compressed import DecompressReader
+from .parallel import ShardExchange
+from .store import EventWriter, HEADER, RECORD
+
+FileResult = namedtuple('FileResult', (
+    'path',         # capture file
+    'day',          # trading date, YYYYMMDD
+    'output',       # event store written
+    'size',         # file size on disk
+    'bytes',        # decompressed bytes parsed by this run
+    'events',       # events in the store
+    'seconds',      # parse time of this run
+    'error',        # "ExceptionClass: message", None on success
+    'skipped'       # finished by an earlier run
+))
+
+DAY = re.compile(r'(\d{8})')
+
+# Compression suffixes ignored when matching a factory suffix
+COMPRESSED = ('.gz', '.xz', '.zst')
+
+
+def file_day(path):
+    found = DAY.search(os.path.basename(path))
+    if found is None:
+        return None
+    try:
+        return datetime.strptime(found.group(1), "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+"""
+Exchange factory of a file
+@param      factories, file name suffix => factory
+@param      factory, when no suffix matches
+"""
+def file_factory(path, factories, factory):
+    name = os.path.basename(path)
+    names = [name] + [name[:-len(ext)] for ext in COMPRESSED
+                      if name.endswith(ext)]
+    for suffix in sorted(factories, key=len, reverse=True):
+        if any(n.endswith(suffix) for n in names):
+            return factories[suffix]
+    return factory
+
+
+def output_path(path, output):
+    day = file_day(path)
+    folder = day.strftime("%Y%m%d") if day else "unknown"
+    return os.path.join(output, folder, os.path.basename(path) + ".evt")
+
+
+# Records in the event store at the time of the checkpoint
+def dump_sink(exchange):
+    records = getattr(exchange, 'sink_records', None)
+    if records is None:
+        return None
+    return pack("<q", records)
+
+
+def load_sink(exchange, payload):
+    exchange.sink_records = unpack_from("<q", payload)[0]
+
+
+checkpoint.register_section(b"SINK", dump_sink, load_sink)
+
+
+def save_checkpoint(exchange, writer, path):
+    writer.flush()
+    exchange.sink_records = writer.written
+    checkpoint.save(exchange, path)
+
+
+"""
+Parse one capture into its event store, worker entry point
+@param      task, (path, output directory, factory, checkpoint interval,
+            read size)
+@return     FileResult
+"""
+def run_file(task):
+    path, output, factory, interval, read_size = task
+    store = output_path(path, output)
+    day = file_day(path)
+    done = store + ".done"
+    ckp = store + ".ckp"
+    started = time.perf_counter()
+    size = os.path.getsize(path)
+
+    if os.path.exists(done):
+        with open(done) as f:
+            summary = json.load(f)
+        return FileResult(path, summary['day'], store, size, 0,
+                          summary['events'], 0.0, None, True)
+
+    parsed = 0
+    writer = None
+    try:
+        os.makedirs(os.path.dirname(store), exist_ok=True)
+        exchange = factory("batch-%s" % os.path.basename(path))
+        if day is not None:
+            exchange.date = day
+
+        skip = 0
+        if os.path.exists(ckp) and os.path.exists(store):
+            skip = checkpoint.restore(exchange, ckp)
+            # Drop the records written after the checkpoint
+            with open(store, "r+b") as f:
+                f.truncate(HEADER.size + exchange.sink_records * RECORD.size)
+            writer = EventWriter(store, append=True)
+            writer.written = exchange.sink_records
+        else:
+            writer = EventWriter(store)
+        exchange.add_consumer(writer)
+
+        saved = time.monotonic()
+        with DecompressReader(path, read_size=read_size) as reader:
+            for chunk in reader:
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk = chunk[skip:]
+                    skip = 0
+                exchange.feed(chunk)
+                parsed += len(chunk)
+                if time.monotonic() - saved >= interval:
+                    save_checkpoint(exchange, writer, ckp)
+                    saved = time.monotonic()
+        exchange.feed_end()
+        writer.close()
+
+        summary = {
+            'day': day.strftime("%Y%m%d") if day else None,
+            'events': writer.written,
+            'position': exchange.position,
+        }
+        with open(done, "w") as f:
+            json.dump(summary, f)
+        if os.path.exists(ckp):
+            os.remove(ckp)
+        return FileResult(path, summary['day'], store, size, parsed,
+                          writer.written, time.perf_counter() - started,
+                          None, False)
+    except Exception as ex:
+        if writer is not None:
+            writer.close()
+        return FileResult(path, day.strftime("%Y%m%d") if day else None,
+                          store, size, parsed,
+                          writer.written if writer is not None else 0,
+                          time.perf_counter() - started,
+                          "%s: %s" % (ex.__class__.__name__, ex), False)
+
+
+class BatchReport(object):
+    def __init__(self, results, seconds):
+        self.results = results
+        self.seconds = seconds      # wall time of the batch
+
+    @property
+    def failures(self):
+        return [r for r in self.results if r.error is not None]
+
+    def summary(self):
+        parsed = [r for r in self.results if not r.skipped]
+        total = sum(r.bytes for r in parsed)
+        return {
+            'files': len(self.results),
+            'skipped': sum(1 for r in self.results if r.skipped),
+            'failed': len(self.failures),
+            'bytes': total,
+            'events': sum(r.events for r in parsed),
+            'seconds': self.seconds,
+            'bytes_per_sec': total / self.seconds if self.seconds else 0.0,
+        }
+
+    def format(self):
+        lines = []
+        for r in self.results:
+            if r.skipped:
+                status = "done earlier"
+            elif r.error is not None:
+                status = "FAILED %s" % r.error
+            else:
+                status = "%.1f MB/s, %.0f events/s" % (
+                    r.bytes / r.seconds / 1e6 if r.seconds else 0.0,
+                    r.events / r.seconds if r.seconds else 0.0)
+            lines.append("%s  %s  %d events  %s" % (
+                r.day or "-", r.path, r.events, status))
+        s = self.summary()
+        lines.append("%d files (%d skipped, %d failed), %d events, "
+                     "%.1f MB in %.1fs, %.1f MB/s" % (
+                         s['files'], s['skipped'], s['failed'], s['events'],
+                         s['bytes'] / 1e6, s['seconds'],
+                         s['bytes_per_sec'] / 1e6))
+        return "\n".join(lines)
+
+
+"""
+Parse capture files over a process pool, largest first
+@param      paths, capture files
+@param      output, root directory of the per day event stores
+@param      factory, Exchange class (or picklable callable) for workers,
+            output to consumers only; ShardExchange parses BATS text,
+            batsmc.ring.RingExchange BATS MC
+@param      factories, file name suffix => factory, for batches of both
+            protocols; `factory` is used for the files matching none
+@param      processes, worker processes, os.cpu_count() by default
+@param      checkpoint_interval, seconds between two checkpoints of a file
+@param      on_result, called with each FileResult as files complete
+@return     BatchReport, results in completion order
+"""
+def run_batch(paths, output, factory=ShardExchange, processes=None,
+              checkpoint_interval=60.0, on_result=None,
+              read_size=256 << 10, factories=None):
+    processes = processes or os.cpu_count() or 1
+    paths = sorted(paths, key=os.path.getsize, reverse=True)
+    tasks = [(path, output, file_factory(path, factories or {}, factory),
+              checkpoint_interval, read_size)
+             for path in paths]
+
+    started = time.perf_counter()
+    results = []
+    with Pool(min(processes, max(1, len(tasks)))) as pool:
+        # chunksize 1 keeps the largest first order of the hand out
+        for result in pool.imap_unordered(run_file, tasks, chunksize=1):
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return BatchReport(results, time.perf_counter() - started)
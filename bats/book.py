@@ -0,0 +1,360 @@
+"""
+@file           book.py
+@description    Order book and top of book change stream
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+OrderBook rebuilds per symbol price levels from normalized order events.
+Each side keeps its aggregated shares per price in a dict and the prices in
+a sorted list, best price last: the frequent changes, at or near the top,
+touch the end of the list. Listeners are called with (ts, symbol id) every
+time a level of the symbol changes.
+
+TopOfBook derives best bid / offer changes from the book and emits a BBO
+only when a best price or size actually changes. With conflate=True it
+keeps the latest BBO per symbol in a dirty set instead, which a slow
+consumer drains on demand:
+
+    top = exchange.add_consumer(TopOfBook(conflate=True))
+    ...
+    for bbo in top.drain():
+        publish(bbo)
+
+The resting orders are saved in BOOK checkpoint sections (see
+bats.checkpoint) when an OrderBook is attached to the exchange.
+"""
+
+from array import array
+from bisect import bisect_left, insort
+from collections import namedtuple
+from struct import pack, unpack_from, calcsize
+
+from .checkpoint import register_section
+from .store import SIDE_BUY, EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, \
+    EV_DELETE, EV_CLEAR
+from .symbols import NO_SYMBOL
+
+BBO = namedtuple('BBO', (
+    'ts', 'symbol', 'bid_price', 'bid_shares', 'ask_price', 'ask_shares'
+))
+
+
+class Side(object):
+    """
+    Price levels of one side. Keys are prices for bids and negated prices
+    for asks, so that the best level is always the last key.
+    """
+
+    __slots__ = ('sign', 'levels', 'keys')
+
+    def __init__(self, sign):
+        self.sign = sign
+        self.levels = {}        # key => shares
+        self.keys = []          # sorted keys, best last
+
+    def add(self, price, shares):
+        key = price * self.sign
+        levels = self.levels
+        if key in levels:
+            levels[key] += shares
+        else:
+            levels[key] = shares
+            keys = self.keys
+            if not keys or key > keys[-1]:
+                keys.append(key)
+            else:
+                insort(keys, key)
+
+    def remove(self, price, shares):
+        key = price * self.sign
+        levels = self.levels
+        left = levels.get(key, 0) - shares
+        if left > 0:
+            levels[key] = left
+            return
+        levels.pop(key, None)
+        keys = self.keys
+        if keys and keys[-1] == key:
+            keys.pop()
+        else:
+            index = bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                del keys[index]
+
+    def best(self):
+        if not self.keys:
+            return 0, 0
+        key = self.keys[-1]
+        return key * self.sign, self.levels[key]
+
+    """
+    Best levels
+    @param      depth, number of levels
+    @return     list of (price, shares), best first
+    """
+    def top(self, depth):
+        levels = self.levels
+        sign = self.sign
+        return [(key * sign, levels[key])
+                for key in self.keys[:-depth - 1:-1]]
+
+    def clear(self):
+        self.levels.clear()
+        del self.keys[:]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class Book(object):
+    __slots__ = ('bids', 'asks')
+
+    def __init__(self):
+        self.bids = Side(1)
+        self.asks = Side(-1)
+
+    def side(self, side):
+        return self.bids if side == SIDE_BUY else self.asks
+
+
+class OrderBook(object):
+    """Price levels of every symbol, an Exchange consumer"""
+
+    def __init__(self):
+        self.books = []         # symbol id => Book or None
+        # order id => [symbol id, side, price, shares, unit]
+        self.orders = {}
+        self.listeners = []     # callables (ts, symbol id)
+
+    def book(self, sid):
+        books = self.books
+        if sid >= len(books):
+            books.extend([None] * (sid + 1 - len(books)))
+        book = books[sid]
+        if book is None:
+            book = books[sid] = Book()
+        return book
+
+    def get(self, sid):
+        if sid < len(self.books):
+            return self.books[sid]
+        return None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def on_event(self, event):
+        etype = event.etype
+        if etype == EV_ADD:
+            sid = event.symbol
+            self.orders[event.order_id] = [sid, event.side, event.price,
+                                           event.shares, event.aux_shares]
+            self.book(sid).side(event.side).add(event.price, event.shares)
+        elif etype == EV_EXECUTE or etype == EV_REDUCE:
+            order = self.orders.get(event.order_id)
+            if order is None:
+                return
+            sid, side, price, shares, unit = order
+            # Executed at price/size: the remaining size is on the wire
+            if etype == EV_EXECUTE and event.price:
+                left = event.aux_shares
+            else:
+                left = shares - event.shares
+            self.books[sid].side(side).remove(price, shares - max(left, 0))
+            if left > 0:
+                order[3] = left
+            else:
+                del self.orders[event.order_id]
+        elif etype == EV_DELETE:
+            order = self.orders.pop(event.order_id, None)
+            if order is None:
+                return
+            sid, side, price, shares, unit = order
+            self.books[sid].side(side).remove(price, shares)
+        elif etype == EV_MODIFY:
+            order = self.orders.get(event.order_id)
+            if order is None:
+                return
+            sid, side, price, shares, unit = order
+            levels = self.books[sid].side(side)
+            levels.remove(price, shares)
+            levels.add(event.price, event.shares)
+            order[2] = event.price
+            order[3] = event.shares
+        elif etype == EV_CLEAR:
+            self.clear(event.ts, event.symbol, event.aux_shares)
+            return
+        else:
+            return
+
+        for listener in self.listeners:
+            listener(event.ts, sid)
+
+    # Clear a symbol, or the orders of a unit for NO_SYMBOL (every order
+    # for unit 0, BATS text)
+    def clear(self, ts, sid, unit=0):
+        if sid == NO_SYMBOL and unit:
+            cleared = set()
+            orders = self.orders
+            for order_id in [oid for oid, order in orders.items()
+                             if order[4] == unit]:
+                sid, side, price, shares, unit = orders.pop(order_id)
+                self.books[sid].side(side).remove(price, shares)
+                cleared.add(sid)
+            cleared = sorted(cleared)
+        elif sid == NO_SYMBOL:
+            cleared = [s for s, book in enumerate(self.books)
+                       if book is not None and (book.bids or book.asks)]
+            self.orders.clear()
+            for s in cleared:
+                self.books[s].bids.clear()
+                self.books[s].asks.clear()
+        else:
+            # Symbols without a book (no order yet) have nothing to clear,
+            # listeners are only told about booked symbols
+            cleared = []
+            book = self.get(sid)
+            if book is not None:
+                cleared.append(sid)
+                for order_id in [oid for oid, order in self.orders.items()
+                                 if order[0] == sid]:
+                    del self.orders[order_id]
+                book.bids.clear()
+                book.asks.clear()
+
+        for s in cleared:
+            for listener in self.listeners:
+                listener(ts, s)
+
+    def bbo(self, sid):
+        book = self.get(sid)
+        if book is None:
+            return 0, 0, 0, 0
+        return book.bids.best() + book.asks.best()
+
+    def depth(self, sid, depth):
+        book = self.get(sid)
+        if book is None:
+            return [], []
+        return book.bids.top(depth), book.asks.top(depth)
+
+
+class TopOfBook(object):
+    """
+    Best bid / offer change stream, an Exchange consumer
+
+    @param      book, OrderBook to follow, a private one by default: it is
+                then driven by this consumer
+    @param      on_quote, called with every BBO change, appended to
+                self.quotes by default; not called in conflate mode
+    @param      conflate, keep the latest BBO per symbol until drain()
+    """
+
+    def __init__(self, book=None, on_quote=None, conflate=False):
+        self.driving = book is None
+        self.book = book if book is not None else OrderBook()
+        self.book.add_listener(self.on_book)
+        self.quotes = []
+        self.on_quote = on_quote or self.quotes.append
+        self.conflate = conflate
+        self.dirty = {}         # symbol id => ts of the latest change
+
+        # Latest BBO per symbol id
+        self.ts = array('q')
+        self.bid_price = array('q')
+        self.bid_shares = array('q')
+        self.ask_price = array('q')
+        self.ask_shares = array('q')
+
+    def grow(self, size):
+        extra = size - len(self.ts)
+        for values in (self.ts, self.bid_price, self.bid_shares,
+                       self.ask_price, self.ask_shares):
+            values.extend([0] * extra)
+
+    def on_event(self, event):
+        if self.driving:
+            self.book.on_event(event)
+
+    def on_book(self, ts, sid):
+        if sid >= len(self.ts):
+            self.grow(max(sid + 1, 2 * len(self.ts)))
+        book = self.book.books[sid]
+        bid_price, bid_shares = book.bids.best()
+        ask_price, ask_shares = book.asks.best()
+        if bid_price == self.bid_price[sid] and \
+                bid_shares == self.bid_shares[sid] and \
+                ask_price == self.ask_price[sid] and \
+                ask_shares == self.ask_shares[sid]:
+            return
+        self.ts[sid] = ts
+        self.bid_price[sid] = bid_price
+        self.bid_shares[sid] = bid_shares
+        self.ask_price[sid] = ask_price
+        self.ask_shares[sid] = ask_shares
+        if self.conflate:
+            self.dirty[sid] = ts
+        else:
+            self.on_quote(BBO(ts, sid, bid_price, bid_shares, ask_price,
+                              ask_shares))
+
+    def quote(self, sid):
+        if sid >= len(self.ts):
+            return BBO(0, sid, 0, 0, 0, 0)
+        return BBO(self.ts[sid], sid, self.bid_price[sid],
+                   self.bid_shares[sid], self.ask_price[sid],
+                   self.ask_shares[sid])
+
+    """
+    Latest BBO of every symbol changed since the previous drain
+    @return     list of BBO, in order of first change
+    """
+    def drain(self):
+        dirty = self.dirty
+        self.dirty = {}
+        return [self.quote(sid) for sid in dirty]
+
+
+ORDER = "<QIBqqB"
+ORDER_SIZE = calcsize(ORDER)
+
+
+def find_book(exchange):
+    for consumer in getattr(exchange, 'consumers', ()):
+        if isinstance(consumer, OrderBook):
+            return consumer
+        if isinstance(consumer, TopOfBook) and consumer.driving:
+            return consumer.book
+    return None
+
+
+def dump_book(exchange):
+    book = find_book(exchange)
+    if book is None:
+        return None
+    return pack("<I", len(book.orders)) + b"".join(
+        pack(ORDER, order_id, *order)
+        for order_id, order in book.orders.items()
+    )
+
+
+def load_book(exchange, payload):
+    book = find_book(exchange)
+    if book is None:
+        return
+    count = unpack_from("<I", payload)[0]
+    for i in range(count):
+        order_id, sid, side, price, shares, unit = unpack_from(
+            ORDER, payload, 4 + i * ORDER_SIZE)
+        book.orders[order_id] = [sid, side, price, shares, unit]
+        book.book(sid).side(side).add(price, shares)
+
+
+register_section(b"BOOK", dump_book, load_book)
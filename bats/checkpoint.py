@@ -0,0 +1,203 @@
+"""
+@file           checkpoint.py
+@description    Parser state checkpoint/restore in a compact binary format
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+File layout (little endian):
+    Magic           8 bytes     b"BATSCKP" + format version
+    Section *       4 bytes     Tag
+                    4 Binary    Payload length
+                    n bytes     Payload
+
+Sections:
+    HEAD    date ordinal (I), input position (q), first byte not parsed
+            yet (an incomplete block or line fed is parsed again after
+            a restore), written at, ns (q)
+    SEQN    count (I), then unit (B) / last sequence (I) per unit
+    CLCK    BATS MC clock, Time message seconds (4 bytes raw) of units
+            without a Time message yet, then count (B) and
+            unit (B) / seconds (4 bytes raw) per unit
+    SYMB    count (I), then length (B) / name per symbol id, UTF-8 (the
+            symbol table decodes non ASCII wire bytes to U+FFFD)
+
+Unknown sections are skipped on restore, so components attached later
+(order books, ...) can add their own through register_section().
+"""
+
+import os
+import time
+from datetime import date
+from struct import pack, unpack_from, calcsize
+
+MAGIC = b"BATSCKP\x01"
+
+# tag => (dump(exchange) -> bytes or None, load(exchange, payload))
+SECTIONS = {}
+
+
+def register_section(tag, dump, load):
+    SECTIONS[tag] = (dump, load)
+
+
+def dump_head(exchange):
+    return pack("<Iqq", exchange.date.toordinal(), exchange.position,
+                time.time_ns())
+
+
+def load_head(exchange, payload):
+    ordinal, exchange.position, written = unpack_from("<Iqq", payload)
+    exchange.date = date.fromordinal(ordinal)
+
+
+def dump_sequences(exchange):
+    sequences = getattr(exchange, 'sequences', None)
+    if sequences is None:
+        return None
+    return pack("<I", len(sequences)) + b"".join(
+        pack("<BI", unit, seq) for unit, seq in sorted(sequences.items())
+    )
+
+
+def load_sequences(exchange, payload):
+    count = unpack_from("<I", payload)[0]
+    exchange.sequences = dict(
+        unpack_from("<BI", payload, 4 + i * 5) for i in range(count)
+    )
+
+
+def dump_clock(exchange):
+    contexts = getattr(exchange, 'contexts', None)
+    if contexts is None:
+        return None
+    return exchange.pitch_time + pack("B", len(contexts)) + b"".join(
+        pack("B", unit) + ctx.pitch_time
+        for unit, ctx in sorted(contexts.items())
+    )
+
+
+def load_clock(exchange, payload):
+    exchange.pitch_time = bytes(payload[:4])
+    for i in range(payload[4]):
+        offset = 5 + i * 5
+        exchange.context(payload[offset]).pitch_time = \
+            bytes(payload[offset + 1:offset + 5])
+
+
+def dump_symbols(exchange):
+    chunks = [pack("<I", len(exchange.symbols))]
+    for name in exchange.symbols.export():
+        raw = name.encode('utf-8')
+        chunks.append(pack("B", len(raw)) + raw)
+    return b"".join(chunks)
+
+
+def load_symbols(exchange, payload):
+    count = unpack_from("<I", payload)[0]
+    offset = 4
+    names = []
+    for i in range(count):
+        size = payload[offset]
+        names.append(bytes(payload[offset + 1:offset + 1 + size])
+                     .decode('utf-8'))
+        offset += 1 + size
+    exchange.symbols = exchange.symbols.from_export(names)
+
+
+register_section(b"HEAD", dump_head, load_head)
+register_section(b"SEQN", dump_sequences, load_sequences)
+register_section(b"CLCK", dump_clock, load_clock)
+register_section(b"SYMB", dump_symbols, load_symbols)
+
+
+"""
+Write a checkpoint of the exchange state
+@param      exchange, bats.Exchange or batsmc.Exchange
+@param      path, checkpoint file, replaced atomically
+"""
+def save(exchange, path):
+    chunks = [MAGIC]
+    for tag, (dump, load) in SECTIONS.items():
+        payload = dump(exchange)
+        if payload is None:
+            continue
+        chunks.append(tag + pack("<I", len(payload)))
+        chunks.append(payload)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(chunks))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+"""
+Restore the exchange state from a checkpoint
+@param      exchange, freshly created bats.Exchange or batsmc.Exchange
+@param      path, checkpoint file
+@return     input position to resume parsing from
+"""
+def restore(exchange, path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("%s is not a checkpoint file" % path)
+
+    view = memoryview(data)
+    offset = len(MAGIC)
+    header = calcsize("<4sI")
+    while offset < len(data):
+        tag, size = unpack_from("<4sI", data, offset)
+        offset += header
+        section = SECTIONS.get(tag)
+        if section is not None:
+            section[1](exchange, view[offset:offset + size])
+        offset += size
+
+    return exchange.position
+
+
+class Checkpointer(object):
+    """
+    Saves a checkpoint every `interval` seconds of parsing. Data goes
+    through Exchange.feed(), so reads may cut blocks or lines anywhere.
+
+        checkpointer = Checkpointer(exchange, "feed.ckp", interval=30)
+        f.seek(checkpointer.restore())
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            checkpointer.feed(chunk)
+        checkpointer.feed_end()
+    """
+
+    def __init__(self, exchange, path, interval=60.0):
+        self.exchange = exchange
+        self.path = path
+        self.interval = interval
+        self.saved = time.monotonic()
+
+    def restore(self):
+        if not os.path.exists(self.path):
+            return 0
+        return restore(self.exchange, self.path)
+
+    def save(self):
+        save(self.exchange, self.path)
+        self.saved = time.monotonic()
+
+    def maybe_save(self):
+        if time.monotonic() - self.saved >= self.interval:
+            self.save()
+
+    def feed(self, data, *args):
+        self.exchange.feed(data, *args)
+        self.maybe_save()
+
+    # End of the input, the last checkpoint covers all of it
+    def feed_end(self):
+        self.exchange.feed_end()
+        self.save()
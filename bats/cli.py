@@ -0,0 +1,286 @@
+"""
+@file           cli.py
+@description    Command line decoder shared by python -m bats / -m batsmc
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Decodes capture files (gzip/xz/zstd or uncompressed) or stdin into
+normalized events written as CSV, JSON lines or the binary event store
+(bats.store, with the symbol names in <output>.symbols). Rows are
+formatted in batches and written through a large buffer. At the end a
+report with messages/s, bytes/s and the count per message type goes to
+stderr.
+
+    python -m batsmc capture.bin.gz --format csv --symbol VODl --type trade
+    zcat 20261018.pitch.gz | python -m bats --format jsonl -o trades.jsonl
+    python -m batsmc capture.bin --format evt -o 20261018.evt
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from .batch import file_day
+from .compressed import DecompressReader
+from .store import EventWriter, PRICE_SCALE, SIDE_BUY, SIDE_SELL, \
+    EV_CLEAR, EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE, \
+    EV_TRADE, EV_TRADE_BREAK, EV_TRADE_REPORT, EV_STATUS, EV_STATISTIC, \
+    EV_AUCTION_UPDATE, EV_AUCTION_SUMMARY, EV_END_SESSION
+from .symbols import NO_SYMBOL
+
+ETYPES = {
+    'clear': EV_CLEAR,
+    'add': EV_ADD,
+    'execute': EV_EXECUTE,
+    'reduce': EV_REDUCE,
+    'modify': EV_MODIFY,
+    'delete': EV_DELETE,
+    'trade': EV_TRADE,
+    'break': EV_TRADE_BREAK,
+    'report': EV_TRADE_REPORT,
+    'status': EV_STATUS,
+    'statistic': EV_STATISTIC,
+    'auction_update': EV_AUCTION_UPDATE,
+    'auction_summary': EV_AUCTION_SUMMARY,
+    'end_session': EV_END_SESSION,
+}
+NAMES = dict((etype, name) for name, etype in ETYPES.items())
+SIDES = {SIDE_BUY: 'B', SIDE_SELL: 'S'}
+
+COLUMNS = ('ts', 'type', 'symbol', 'side', 'order_id', 'exec_id', 'shares',
+           'price', 'aux_shares', 'aux_price', 'participant', 'flags')
+
+READ_SIZE = 1 << 20
+
+
+def price(ticks):
+    return "%d.%07d" % divmod(ticks, PRICE_SCALE) if ticks >= 0 else \
+        "-" + price(-ticks)
+
+
+def text(raw):
+    return raw.rstrip(b'\x00 ').decode('ascii', 'replace')
+
+
+class Output(object):
+    """
+    Filters events and writes them in the chosen format
+
+    @param      stream, binary file, ignored for the evt format
+    @param      symbols, SymbolTable of the exchange
+    @param      sids, symbol ids to keep, None for all; events without a
+                symbol (executions, deletes...) are kept when they refer
+                to an order of those symbols
+    @param      etypes, EV_* types to keep, None for all
+    """
+
+    def __init__(self, fmt, stream, symbols, path=None, sids=None,
+                 etypes=None, batch=4096):
+        self.fmt = fmt
+        self.stream = stream
+        self.symbols = symbols
+        self.sids = sids
+        self.etypes = etypes
+        self.batch = batch
+        self.rows = []
+        self.count = 0
+        self.orders = {}        # live order id => shares, kept symbols
+        # First write error, raised by check(): the parser would report
+        # an exception raised from on_event as a decode error and go on
+        self.error = None
+        self.writer = EventWriter(path) if fmt == 'evt' else None
+        if fmt == 'csv':
+            self.rows.append(",".join(COLUMNS))
+
+    def on_event(self, event):
+        # Orders are tracked on every event, the type filter comes after
+        if self.sids is not None and not self.keep(event):
+            return
+        if self.etypes is not None and event.etype not in self.etypes:
+            return
+        if self.error is not None:
+            return
+        self.count += 1
+        try:
+            if self.writer is not None:
+                self.writer.write(event)
+                return
+            self.rows.append(self.format(event))
+            if len(self.rows) >= self.batch:
+                self.flush()
+        except Exception as ex:
+            self.error = ex
+
+    def check(self):
+        if self.error is not None:
+            raise self.error
+
+    def keep(self, event):
+        etype = event.etype
+        if event.symbol != NO_SYMBOL:
+            if event.symbol not in self.sids:
+                return False
+            if etype == EV_ADD:
+                self.orders[event.order_id] = event.shares
+            return True
+        orders = self.orders
+        shares = orders.get(event.order_id)
+        if shares is None:
+            return False
+        if etype == EV_EXECUTE or etype == EV_REDUCE:
+            # Executed at price/size: the remaining size is on the wire
+            if etype == EV_EXECUTE and event.price:
+                left = event.aux_shares
+            else:
+                left = shares - event.shares
+            if left > 0:
+                orders[event.order_id] = left
+            else:
+                del orders[event.order_id]
+        elif etype == EV_MODIFY:
+            orders[event.order_id] = event.shares
+        elif etype == EV_DELETE:
+            del orders[event.order_id]
+        return True
+
+    def format(self, event):
+        name = self.symbols.name(event.symbol) if \
+            event.symbol != NO_SYMBOL else ''
+        values = (event.ts, NAMES.get(event.etype, event.etype), name,
+                  SIDES.get(event.side, ''), event.order_id, event.exec_id,
+                  event.shares, price(event.price), event.aux_shares,
+                  price(event.aux_price), text(event.participant),
+                  text(event.flags))
+        if self.fmt == 'csv':
+            return ",".join(map(str, values))
+        return json.dumps(dict(zip(COLUMNS, values)), separators=(',', ':'))
+
+    def flush(self):
+        rows = self.rows
+        self.rows = []
+        if rows:
+            rows.append('')
+            self.stream.write("\n".join(rows).encode('ascii', 'replace'))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            with open(self.writer.path + ".symbols", "w") as f:
+                f.write("".join(name + "\n"
+                                for name in self.symbols.export()))
+        else:
+            self.flush()
+            self.stream.flush()
+
+
+def chunks(path):
+    if path == '-':
+        read = sys.stdin.buffer.read
+        for chunk in iter(lambda: read(READ_SIZE), b''):
+            yield chunk
+        return
+    with DecompressReader(path, read_size=READ_SIZE) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def report(exchange, size, elapsed, written, stream):
+    stats = exchange.stats()
+    types = stats['types']
+    messages = sum(info['count'] for info in types.values())
+    elapsed = max(elapsed, 1e-9)
+    print("%d messages, %d bytes in %.2fs: %.0f msgs/s, %.1f MB/s, "
+          "%d events written" % (messages, size, elapsed, messages / elapsed,
+                                 size / elapsed / 1e6, written),
+          file=stream)
+    ordered = sorted(types.items(), key=lambda item: -item[1]['count'])
+    for key, info in ordered:
+        print("  %-6s %-28s %d" % (key if isinstance(key, str) else
+                                   "0x%02x" % key, info['handler'],
+                                   info['count']), file=stream)
+    errors = stats['errors']
+    if errors['total'] or stats['unknown']:
+        print("  errors %d, unknown types %s" % (errors['total'],
+                                                 stats['unknown']),
+              file=stream)
+
+
+"""
+Command line entry point
+@param      factory, consumer-only Exchange class of the protocol
+@param      prog, program name
+@return     exit status
+"""
+def main(factory, prog, argv=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Decode %s captures into normalized events"
+        % factory.__module__.split('.')[0])
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="capture files, stdin by default")
+    parser.add_argument("--format", choices=("csv", "jsonl", "evt"),
+                        default="csv")
+    parser.add_argument("-o", "--output", help="output file, stdout "
+                        "by default (required for evt)")
+    parser.add_argument("--symbol", action="append",
+                        help="keep events of this symbol and of its "
+                        "orders (repeatable)")
+    parser.add_argument("--type", action="append", choices=sorted(ETYPES),
+                        help="keep events of this type (repeatable)")
+    parser.add_argument("--date", help="trading date YYYYMMDD, from the "
+                        "file name or today by default")
+    parser.add_argument("--quiet", action="store_true",
+                        help="no report on stderr")
+    args = parser.parse_args(argv)
+
+    if args.format == 'evt' and not args.output:
+        parser.error("--format evt needs --output")
+
+    exchange = factory(prog)
+    day = datetime.strptime(args.date, "%Y%m%d").date() if args.date \
+        else file_day(args.inputs[0])
+    if day is not None:
+        exchange.date = day
+
+    sids = None
+    if args.symbol:
+        sids = set(exchange.symbols.add(name) for name in args.symbol)
+    etypes = set(ETYPES[name] for name in args.type) if args.type else None
+
+    if args.output and args.format != 'evt':
+        stream = open(args.output, "wb", buffering=READ_SIZE)
+    else:
+        stream = sys.stdout.buffer
+    output = exchange.add_consumer(Output(args.format, stream,
+                                          exchange.symbols, args.output,
+                                          sids, etypes))
+    exchange.enable_stats()
+
+    size = 0
+    started = time.perf_counter()
+    try:
+        for path in args.inputs:
+            for chunk in chunks(path):
+                exchange.feed(chunk)
+                output.check()
+                size += len(chunk)
+            exchange.feed_end()
+            output.check()
+        output.close()
+    except BrokenPipeError:
+        # Output closed early, e.g. piped into head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+    elapsed = time.perf_counter() - started
+
+    if not args.quiet:
+        report(exchange, size, elapsed, output.count, sys.stderr)
+    return 0
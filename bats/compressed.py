@@ -0,0 +1,161 @@
+"""
+@file           compressed.py
+@description    Streaming decompression overlapped with parsing
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+A background thread reads and decompresses a capture into a bounded queue
+of buffers, of at most `read_size` bytes each, while the caller feeds
+completed buffers to Exchange.feed().
+zlib and lzma release the GIL while decompressing, so decompression runs
+alongside decoding instead of before it.
+
+Formats are detected by magic number: gzip, xz, zstd (when the zstandard
+module is available) or uncompressed.
+"""
+
+import lzma
+import queue
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGICS = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+
+def detect(path):
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, kind in MAGICS:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def decompressor(kind):
+    if kind == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if kind == 'xz':
+        return lzma.LZMADecompressor()
+    if kind == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required for zstd captures")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+class DecompressReader(object):
+    """
+    Iterates over the decompressed content of a capture in buffers.
+
+        for chunk in DecompressReader("20261018.pitch.gz"):
+            exchange.feed(chunk)
+        exchange.feed_end()
+    """
+
+    def __init__(self, path, kind=None, read_size=256 << 10, buffers=8):
+        self.path = path
+        self.kind = kind or detect(path)
+        self.read_size = read_size
+        self.queue = queue.Queue(buffers)
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       name="decompress")
+        self.thread.start()
+
+    def put(self, item):
+        while not self.stopped:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    """
+    Decompress at most read_size bytes out of raw (zstd has no output
+    limit, its frames are decompressed in window sized pieces)
+    @return     (data, input left past the end of the stream, more output
+                pending for the same input)
+    """
+    def decompress(self, unpacker, raw):
+        if self.kind == 'zstd':
+            data = unpacker.decompress(raw)
+            if getattr(unpacker, 'eof', False):
+                return data, unpacker.unused_data, False
+            return data, b'', False
+
+        data = unpacker.decompress(raw, self.read_size)
+        if unpacker.eof:
+            return data, unpacker.unused_data, False
+        if self.kind == 'xz':
+            return data, b'', not unpacker.needs_input
+        return data, unpacker.unconsumed_tail, \
+            len(data) == self.read_size
+
+    def run(self):
+        try:
+            with open(self.path, "rb") as f:
+                unpacker = decompressor(self.kind)
+                while not self.stopped:
+                    raw = f.read(self.read_size)
+                    if not raw:
+                        break
+                    if unpacker is None:
+                        self.put(raw)
+                        continue
+                    more = False
+                    while (raw or more) and not self.stopped:
+                        # Concatenated members (gzip, xz, zstd frames),
+                        # the previous one may end on a read boundary
+                        if getattr(unpacker, 'eof', False):
+                            unpacker = decompressor(self.kind)
+                        data, raw, more = self.decompress(unpacker, raw)
+                        if data:
+                            self.put(data)
+            self.put(None)
+        except Exception as ex:
+            self.put(ex)
+
+    def close(self):
+        self.stopped = True
+        self.thread.join()
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+"""
+Parse a (compressed) capture file through the incremental path
+@param      exchange, bats.Exchange or batsmc.Exchange
+@param      path, capture file, gzip/xz/zstd or uncompressed
+@return     bytes parsed
+"""
+def parse_file(exchange, path, kind=None, read_size=256 << 10, buffers=8):
+    with DecompressReader(path, kind, read_size, buffers) as reader:
+        for chunk in reader:
+            exchange.feed(chunk)
+    exchange.feed_end()
+    return exchange.position
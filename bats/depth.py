@@ -0,0 +1,260 @@
+"""
+@file           depth.py
+@description    Periodic order book depth snapshots into NumPy arrays
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+DepthSampler samples the top `depth` price levels per side of all or a
+chosen set of symbols every `interval` seconds of feed time (Event.ts:
+Time message plus offset in BATS MC, the line timestamp in BATS). A sample
+at time t is the book as it stands before the first event at or after t;
+a gap in the feed repeats the same book for every sample it skips.
+
+Samples go into preallocated arrays of `chunk` rows:
+
+    ts              (chunk,)                    int64, sample time, ns
+    bid_price       (chunk, symbols, depth)     int64, ticks, 0 if no level
+    bid_shares      (chunk, symbols, depth)     int64
+    ask_price       (chunk, symbols, depth)     int64
+    ask_shares      (chunk, symbols, depth)     int64
+
+A row starts as a copy of the previous one and only the symbols whose book
+changed since are refilled, so a quiet symbol costs nothing per sample.
+Full chunks are handed to the sink, e.g. a DepthWriter, which appends each
+column to its own file:
+
+    sampler = exchange.add_consumer(DepthSampler(
+        interval=1, depth=10, symbols=["VODl", "BARCl"],
+        table=exchange.symbols, sink=DepthWriter("20261018.depth")))
+    ...
+    sampler.close()
+    depth = DepthReader("20261018.depth").arrays()
+"""
+
+import json
+import os
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .book import OrderBook
+
+COLUMNS = ('bid_price', 'bid_shares', 'ask_price', 'ask_shares')
+
+
+class DepthSampler(object):
+    """
+    @param      interval, seconds of feed time between samples
+    @param      depth, price levels per side
+    @param      symbols, names of the sampled symbols, None for all
+    @param      table, SymbolTable of the exchange, to resolve `symbols`
+    @param      capacity, number of symbol ids sampled when symbols is None
+    @param      chunk, rows per chunk
+    @param      sink, object with write(ts, columns, rows) and close(),
+                full chunks are kept in self.chunks by default
+    @param      book, OrderBook to sample, a private one by default: it is
+                then driven by this consumer. A shared book must be added
+                to the exchange after the sampler.
+    """
+
+    def __init__(self, interval=1, depth=10, symbols=None, table=None,
+                 capacity=1024, chunk=4096, sink=None, book=None):
+        if numpy is None:
+            raise ImportError("numpy is required for DepthSampler")
+
+        self.interval = int(interval * 1000000000)
+        self.depth = depth
+        self.chunk = chunk
+        self.sink = sink
+        self.chunks = []
+
+        # Symbol id => column, -1 if not sampled
+        self.columns = array('l')
+        if symbols is None:
+            self.names = None
+            self.columns.extend(range(capacity))
+            width = capacity
+        else:
+            if table is None:
+                raise ValueError("symbols need the exchange SymbolTable")
+            self.names = list(symbols)
+            for column, name in enumerate(self.names):
+                sid = table.add(name)
+                if sid >= len(self.columns):
+                    self.columns.extend([-1] * (sid + 1 - len(self.columns)))
+                self.columns[sid] = column
+            width = len(self.names)
+
+        self.ts = numpy.zeros(chunk, dtype=numpy.int64)
+        self.data = {
+            name: numpy.zeros((chunk, width, depth), dtype=numpy.int64)
+            for name in COLUMNS
+        }
+        self.rows = 0
+        self.samples = 0
+        self.next_sample = None
+        self.dirty = set()
+
+        self.driving = book is None
+        self.book = book if book is not None else OrderBook()
+        self.book.add_listener(self.on_book)
+
+    def on_book(self, ts, sid):
+        if sid < len(self.columns) and self.columns[sid] >= 0:
+            self.dirty.add(sid)
+
+    def on_event(self, event):
+        ts = event.ts
+        if self.next_sample is None:
+            self.next_sample = ts - ts % self.interval + self.interval
+        elif ts >= self.next_sample:
+            self.sample(ts)
+        if self.driving:
+            self.book.on_event(event)
+
+    # Take every sample due before ts
+    def sample(self, ts):
+        while self.next_sample <= ts:
+            self.take(self.next_sample)
+            self.next_sample += self.interval
+
+    def take(self, ts):
+        row = self.rows
+        data = self.data
+        if row:
+            for values in data.values():
+                values[row] = values[row - 1]
+        elif self.samples:
+            for values in data.values():
+                values[0] = values[-1]
+        self.ts[row] = ts
+
+        depth = self.depth
+        get = self.book.get
+        columns = self.columns
+        bid_price = data['bid_price'][row]
+        bid_shares = data['bid_shares'][row]
+        ask_price = data['ask_price'][row]
+        ask_shares = data['ask_shares'][row]
+        for sid in self.dirty:
+            column = columns[sid]
+            book = get(sid)
+            # A symbol never booked samples as an empty book
+            if book is None:
+                sides = ((bid_price, bid_shares, ()),
+                         (ask_price, ask_shares, ()))
+            else:
+                sides = ((bid_price, bid_shares, book.bids.top(depth)),
+                         (ask_price, ask_shares, book.asks.top(depth)))
+            for prices, shares, levels in sides:
+                n = len(levels)
+                if n:
+                    prices[column, :n], shares[column, :n] = zip(*levels)
+                prices[column, n:] = 0
+                shares[column, n:] = 0
+        self.dirty.clear()
+
+        self.rows += 1
+        self.samples += 1
+        if self.rows == self.chunk:
+            self.flush()
+
+    def flush(self):
+        rows = self.rows
+        if not rows:
+            return
+        if self.sink is not None:
+            self.sink.write(self.ts[:rows],
+                            {name: values[:rows]
+                             for name, values in self.data.items()}, rows)
+        else:
+            self.chunks.append((self.ts[:rows].copy(),
+                                {name: values[:rows].copy()
+                                 for name, values in self.data.items()}))
+        # The next chunk starts from the last row, kept at the end
+        if rows < self.chunk:
+            for values in self.data.values():
+                values[-1] = values[rows - 1]
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+
+class DepthWriter(object):
+    """
+    Columnar depth store: a directory with one raw little endian int64 file
+    per column, appended a chunk at a time, and a meta.json describing the
+    shape of a row.
+    """
+
+    def __init__(self, path, names=None):
+        self.path = path
+        self.names = names
+        self.files = None
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+
+    def open(self, columns):
+        self.files = {'ts': open(os.path.join(self.path, "ts.i8"), "wb")}
+        for name in columns:
+            self.files[name] = open(os.path.join(self.path, name + ".i8"),
+                                    "wb")
+        shape = next(iter(columns.values())).shape[1:]
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({'symbols': shape[0], 'depth': shape[1],
+                       'names': self.names, 'columns': list(columns)}, f)
+
+    def write(self, ts, columns, rows):
+        if self.files is None:
+            self.open(columns)
+        self.files['ts'].write(ts.astype('<i8', copy=False).tobytes())
+        for name, values in columns.items():
+            self.files[name].write(values.astype('<i8', copy=False)
+                                   .tobytes())
+        self.rows += rows
+
+    def close(self):
+        if self.files is not None:
+            for f in self.files.values():
+                f.close()
+            self.files = None
+
+
+class DepthReader(object):
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+    """
+    Memory mapped columns
+    @return     dict name => array, (rows,) for ts and
+                (rows, symbols, depth) for the price levels
+    """
+    def arrays(self):
+        if numpy is None:
+            raise ImportError("numpy is required for DepthReader.arrays()")
+        shape = (self.meta['symbols'], self.meta['depth'])
+        result = {}
+        for name in ['ts'] + self.meta['columns']:
+            path = os.path.join(self.path, name + ".i8")
+            if not os.path.getsize(path):
+                rows = numpy.zeros((0,) + (() if name == 'ts' else shape),
+                                   dtype='<i8')
+            elif name == 'ts':
+                rows = numpy.memmap(path, dtype='<i8', mode='r')
+            else:
+                rows = numpy.memmap(path, dtype='<i8', mode='r')\
+                    .reshape((-1,) + shape)
+            result[name] = rows
+        return result
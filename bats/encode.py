@@ -0,0 +1,281 @@
+"""
+@file           encode.py
+@description    BATS text wire format encoders
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+One encoder per message type of Exchange.types (ENCODERS), each returning
+the message payload after the type character, line() adding the
+timestamp, and TextEncoder, which turns normalized events
+(bats.store.Event) back into PITCH lines.
+
+Encoders take normalized values: order and execution ids as int (Base 36
+on the wire), prices in ticks of 1 / PRICE_SCALE, sides as 'B'/'S'.
+"""
+
+from datetime import date
+from time import mktime
+
+from .store import PRICE_SCALE, SIDE_BUY, SIDE_SELL, \
+    EV_CLEAR, EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE, \
+    EV_TRADE, EV_TRADE_BREAK, EV_TRADE_REPORT, EV_STATUS, EV_STATISTIC, \
+    EV_AUCTION_UPDATE, EV_AUCTION_SUMMARY
+from .symbols import NO_SYMBOL
+
+SHORT_PRICE = PRICE_SCALE // 10000
+LONG_PRICE = PRICE_SCALE // 10000000
+
+SIDES = {SIDE_BUY: 'B', SIDE_SELL: 'S'}
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+# Base 36 Numeric, right justified and zero filled
+def base36(value, size):
+    digits = []
+    while value:
+        value, digit = divmod(value, 36)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits)).rjust(size, "0")
+
+
+# Alphanumeric, left justified and space padded
+def alpha(value, size):
+    if isinstance(value, bytes):
+        value = value.decode('ascii')
+    return value[:size].ljust(size)
+
+
+def line(ms, mtype, body):
+    return "S%08d%s%s\n" % (ms, mtype, body)
+
+
+def clear(symbol):
+    return alpha(symbol, 8)
+
+
+def add_order(order, side, shares, symbol, price, display='Y'):
+    return "%s%s%06d%s%010d%s" % (base36(order, 12), side, shares,
+                                  alpha(symbol, 6), price // SHORT_PRICE,
+                                  display)
+
+
+def add_order_long(order, side, shares, symbol, price, display='Y'):
+    return "%s%s%010d%s%019d%s" % (base36(order, 12), side, shares,
+                                   alpha(symbol, 8), price // LONG_PRICE,
+                                   display)
+
+
+def add_order_exp(order, side, shares, symbol, price, order_type,
+                  participant):
+    return "%s%s%010d%s%019d%s%s" % (base36(order, 12), side, shares,
+                                     alpha(symbol, 8), price // LONG_PRICE,
+                                     order_type, alpha(participant, 4))
+
+
+def order_executed(order, shares, exec_id, flags):
+    return "%s%06d%s%s" % (base36(order, 12), shares, base36(exec_id, 12),
+                           alpha(flags, 3))
+
+
+def order_executed_long(order, shares, exec_id, flags):
+    return "%s%010d%s%s" % (base36(order, 12), shares, base36(exec_id, 12),
+                            alpha(flags, 3))
+
+
+def order_cancel(order, shares):
+    return "%s%06d" % (base36(order, 12), shares)
+
+
+def order_cancel_long(order, shares):
+    return "%s%010d" % (base36(order, 12), shares)
+
+
+def trade(order, side, shares, symbol, price, exec_id, flags):
+    return "%s%s%06d%s%010d%s%s" % (base36(order, 12), side, shares,
+                                    alpha(symbol, 6), price // SHORT_PRICE,
+                                    base36(exec_id, 12), alpha(flags, 4))
+
+
+def trade_long(order, side, shares, symbol, price, exec_id, flags):
+    return "%s%s%010d%s%019d%s%s" % (base36(order, 12), side, shares,
+                                     alpha(symbol, 8), price // LONG_PRICE,
+                                     base36(exec_id, 12), alpha(flags, 4))
+
+
+def trade_break(exec_id):
+    return base36(exec_id, 12)
+
+
+"""
+Trade Report
+@param      day, trade date
+@param      seconds, trade time, seconds past midnight
+"""
+def trade_report(shares, symbol, price, trade_id, day, seconds, venue,
+                 currency, flags):
+    return "%012d%s%019d%s%s%08d%s%s%s" % (
+        shares, alpha(symbol, 8), price // LONG_PRICE, base36(trade_id, 12),
+        day.strftime("%Y%m%d"), seconds, alpha(venue, 4),
+        alpha(currency, 3), alpha(flags, 11))
+
+
+def trading_status(symbol, status):
+    return "%s%s   " % (alpha(symbol, 8), status)
+
+
+def statistics(symbol, price, stat_type, determination):
+    return "%s%019d%s%s" % (alpha(symbol, 8), price // LONG_PRICE, stat_type,
+                            determination)
+
+
+def auction_update(symbol, auction_type, reference, buy, sell, indicative):
+    return "%s%s%019d%010d%010d%019d" % (
+        alpha(symbol, 8), auction_type, reference // LONG_PRICE, buy, sell,
+        indicative // LONG_PRICE)
+
+
+def auction_summary(symbol, auction_type, price, shares):
+    return "%s%s%019d%010d" % (alpha(symbol, 8), auction_type,
+                               price // LONG_PRICE, shares)
+
+
+# Message type => encoder, as Exchange.types
+ENCODERS = {
+    "s": clear,
+    "A": add_order,
+    "c": add_order_long,
+    "t": add_order_exp,
+    "E": order_executed,
+    "e": order_executed_long,
+    "X": order_cancel,
+    "x": order_cancel_long,
+    "P": trade,
+    "q": trade_long,
+    "B": trade_break,
+    "O": trade_report,
+    "H": trading_status,
+    "Z": statistics,
+    "k": auction_update,
+    "j": auction_summary
+}
+
+
+def short_form(shares, symbol, price):
+    return shares < 1000000 and len(symbol) <= 6 and \
+        not price % SHORT_PRICE and price // SHORT_PRICE < 10000000000
+
+
+class TextEncoder(object):
+    """
+    Encodes normalized events as PITCH lines, the inverse of
+    Exchange.normalize. Short forms are used whenever the values fit.
+
+    BATS has no Modify or Delete Order message: live orders are tracked,
+    a delete is sent as a Cancel of the remaining shares and a modify as a
+    Cancel followed by an Add of the same order. End of session events have
+    no text form and are dropped.
+
+    @param      symbols, bats.SymbolTable the event symbol ids refer to
+    @param      day, trading date, today by default
+    """
+
+    def __init__(self, symbols, day=None):
+        self.symbols = symbols
+        self.day = day or date.today()
+        self.midnight = int(mktime(self.day.timetuple()))
+        self.orders = {}        # order id => [side, shares, symbol]
+
+    def cancel(self, order, shares):
+        if shares < 1000000:
+            return "X", order_cancel(order, shares)
+        return "x", order_cancel_long(order, shares)
+
+    def add(self, order, side, shares, symbol, price):
+        self.orders[order] = [side, shares, symbol]
+        if short_form(shares, symbol, price):
+            return "A", add_order(order, side, shares, symbol, price)
+        return "c", add_order_long(order, side, shares, symbol, price)
+
+    """
+    Encode an event
+    @return     list of (message type, payload)
+    """
+    def messages(self, event):
+        etype = event.etype
+        symbol = '' if event.symbol == NO_SYMBOL \
+            else self.symbols.name(event.symbol)
+        side = SIDES.get(event.side, ' ')
+        flags = event.flags.rstrip(b'\x00').decode('ascii')
+        order = event.order_id
+        live = self.orders.get(order)
+
+        if etype == EV_ADD:
+            if event.participant.strip(b'\x00'):
+                self.orders[order] = [side, event.shares, symbol]
+                return [("t", add_order_exp(
+                    order, side, event.shares, symbol, event.price,
+                    flags[:1] or 'Y', event.participant))]
+            return [self.add(order, side, event.shares, symbol, event.price)]
+        if etype == EV_EXECUTE:
+            if live is not None:
+                live[1] -= event.shares
+                if live[1] <= 0:
+                    del self.orders[order]
+            if event.shares < 1000000:
+                return [("E", order_executed(order, event.shares,
+                                             event.exec_id, flags))]
+            return [("e", order_executed_long(order, event.shares,
+                                              event.exec_id, flags))]
+        if etype == EV_REDUCE or etype == EV_DELETE:
+            shares = event.shares
+            if live is not None:
+                if etype == EV_DELETE:
+                    shares = live[1]
+                live[1] -= shares
+                if live[1] <= 0:
+                    del self.orders[order]
+            return [self.cancel(order, shares)]
+        if etype == EV_MODIFY:
+            if live is None:
+                return []
+            del self.orders[order]
+            return [self.cancel(order, live[1]),
+                    self.add(order, live[0], event.shares, live[2],
+                             event.price)]
+        if etype == EV_TRADE:
+            encode, mtype = (trade, "P") \
+                if short_form(event.shares, symbol, event.price) \
+                else (trade_long, "q")
+            return [(mtype, encode(order, side, event.shares, symbol,
+                                   event.price, event.exec_id, flags))]
+        if etype == EV_TRADE_BREAK:
+            return [("B", trade_break(event.exec_id))]
+        if etype == EV_TRADE_REPORT:
+            seconds = event.ts // 1000000000 - self.midnight
+            return [("O", trade_report(event.shares, symbol, event.price,
+                                       event.exec_id, self.day, seconds,
+                                       '', '', flags))]
+        if etype == EV_STATUS:
+            return [("H", trading_status(symbol, flags[:1] or 'T'))]
+        if etype == EV_STATISTIC:
+            return [("Z", statistics(symbol, event.price, flags[:1] or 'C',
+                                     flags[1:2] or '0'))]
+        if etype == EV_AUCTION_UPDATE:
+            return [("k", auction_update(symbol, flags[:1] or 'O',
+                                         event.aux_price, event.shares,
+                                         event.aux_shares, event.price))]
+        if etype == EV_AUCTION_SUMMARY:
+            return [("j", auction_summary(symbol, flags[:1] or 'O',
+                                          event.price, event.shares))]
+        if etype == EV_CLEAR:
+            return [("s", clear(symbol))]
+        return []
+
+    def encode(self, event):
+        ms = (event.ts // 1000000) - self.midnight * 1000
+        return "".join(line(ms, mtype, body)
+                       for mtype, body in self.messages(event))
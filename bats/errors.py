@@ -0,0 +1,107 @@
+"""
+@file           errors.py
+@description    Structured error channel of the parsers
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Decode errors are counted per handler and error kind, and the offending
+messages are kept in a bounded dead-letter ring (oldest dropped first).
+Logging is rate limited: at most one record per `interval` seconds, which
+carries the number of errors suppressed since the previous one. Nothing is
+formatted unless it is logged, so a corrupt block costs a few microseconds
+per message.
+
+    exchange.errors.snapshot()
+    for letter in exchange.errors.letters():
+        print(letter.where, letter.offset, letter.data)
+"""
+
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+DeadLetter = namedtuple('DeadLetter', (
+    'where',        # handler (or parser stage) name
+    'kind',         # exception class name
+    'offset',       # stream offset of the line (BATS) or block (BATS MC)
+    'data',         # raw message payload
+    'error',        # exception, without traceback
+    'time'          # wall clock time, seconds
+))
+
+logger = logging.getLogger("bats")
+
+
+def hexdump(data, limit=64):
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'replace')
+    text = " ".join(["%02x" % b for b in data[:limit]])
+    return text + " ..." if len(data) > limit else text
+
+
+class ErrorChannel(object):
+    """
+    @param      capacity, dead letters kept
+    @param      interval, minimum seconds between two log records
+    @param      log, logging.Logger, the "bats" logger by default
+    """
+
+    def __init__(self, capacity=1024, interval=10.0, log=None):
+        self.counts = {}        # (where, kind) => count
+        self.dead = deque(maxlen=capacity)
+        self.total = 0
+        self.interval = interval
+        self.log = log or logger
+        self.logged = None
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def report(self, where, error, data=b'', offset=None):
+        kind = error.__class__.__name__
+        key = (where, kind)
+        now = time.time()
+        letter = DeadLetter(where, kind, offset, data,
+                            error.with_traceback(None), now)
+
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.total += 1
+            self.dead.append(letter)
+
+            if self.logged is not None and now - self.logged < self.interval:
+                self.suppressed += 1
+                return
+            self.logged = now
+            suppressed = self.suppressed
+            self.suppressed = 0
+
+        self.log.warning(
+            "%s failed with %s (%s) at offset %s: %s; %d errors suppressed",
+            where, kind, error, offset, hexdump(data), suppressed
+        )
+
+    def letters(self):
+        return list(self.dead)
+
+    def snapshot(self):
+        counts = {}
+        for (where, kind), n in self.counts.items():
+            counts.setdefault(where, {})[kind] = n
+        return {
+            'total': self.total,
+            'counts': counts,
+            'dead_letters': len(self.dead),
+        }
+
+    def clear(self):
+        self.counts = {}
+        self.dead.clear()
+        self.total = 0
+        self.suppressed = 0
+
+    def __len__(self):
+        return self.total
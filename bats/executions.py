@@ -0,0 +1,186 @@
+"""
+@file           executions.py
+@description    Execution id index with time based eviction
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+A Trade Break carries only the execution id of the trade it cancels. The
+index maps execution ids (Event.exec_id: the 8 bytes binary id of BATS MC
+or the Base 36 id of BATS, decoded to an int) to the execution, so a break
+is resolved with one dict lookup instead of a scan of the stored trades.
+
+Breaks come within the trading day, so executions older than `retention`
+seconds of feed time are evicted. Ids are kept in per `granularity`
+seconds buckets in time order: eviction drops whole buckets, which keeps
+memory bounded at about one bucket of slack.
+
+BATS MC Executed Order and BATS execution messages carry no symbol, price
+or side, so as a consumer the index also follows the resting orders (Add,
+Modify, Reduce, Delete, Clear) and completes executions from the order.
+
+    index = exchange.add_consumer(ExecutionIndex(on_break=tape.cancel))
+"""
+
+from collections import deque, namedtuple
+from struct import unpack
+
+from .store import EV_ADD, EV_CLEAR, EV_DELETE, EV_EXECUTE, EV_MODIFY, \
+    EV_REDUCE, EV_TRADE, EV_TRADE_BREAK
+from .symbols import NO_SYMBOL
+
+Execution = namedtuple('Execution', (
+    'ts', 'order_id', 'symbol', 'shares', 'price', 'side'
+))
+
+NS = 1000000000
+
+
+"""
+Execution id of a raw wire field
+@param      raw, 8 bytes (BATS MC) or Base 36 text (BATS)
+@return     int, as in Event.exec_id
+"""
+def execution_key(raw):
+    if isinstance(raw, str):
+        return int(raw, 36)
+    return unpack("<Q", raw)[0]
+
+
+class ExecutionIndex(object):
+    """
+    @param      retention, seconds of feed time an execution is kept
+    @param      granularity, seconds per eviction bucket
+    @param      on_break, called with (exec_id, Execution) for a Trade
+                Break of an indexed execution, when used as a consumer
+    """
+
+    def __init__(self, retention=8 * 3600, granularity=60, on_break=None):
+        self.retention = int(retention * NS)
+        self.granularity = int(granularity * NS)
+        self.on_break = on_break
+        self.executions = {}        # exec id => Execution
+        self.buckets = deque()      # [bucket start, [exec id, ...]]
+        self.bucket = None          # ids of the newest bucket
+        self.bucket_end = None
+        self.evicted = 0
+        self.breaks = 0
+        self.unknown = 0            # breaks of evicted or unseen executions
+        # order id => [symbol id, side, price, shares, unit], as a consumer
+        self.orders = {}
+
+    def __len__(self):
+        return len(self.executions)
+
+    def __contains__(self, exec_id):
+        return exec_id in self.executions
+
+    def get(self, exec_id, default=None):
+        return self.executions.get(exec_id, default)
+
+    def add(self, exec_id, ts, symbol, shares, price, side=0, order_id=0):
+        if self.bucket_end is None or ts >= self.bucket_end:
+            self.expire(ts)
+            start = ts - ts % self.granularity
+            self.bucket = []
+            self.buckets.append((start, self.bucket))
+            self.bucket_end = start + self.granularity
+        self.executions[exec_id] = Execution(ts, order_id, symbol, shares,
+                                             price, side)
+        self.bucket.append(exec_id)
+
+    """
+    Remove a broken execution
+    @return     Execution, None if unknown or already evicted
+    """
+    def pop(self, exec_id):
+        execution = self.executions.pop(exec_id, None)
+        self.breaks += 1
+        if execution is None:
+            self.unknown += 1
+        return execution
+
+    # Drop the buckets entirely older than ts - retention
+    def expire(self, ts):
+        horizon = ts - self.retention
+        buckets = self.buckets
+        executions = self.executions
+        while buckets and buckets[0][0] + self.granularity <= horizon:
+            for exec_id in buckets.popleft()[1]:
+                if executions.pop(exec_id, None) is not None:
+                    self.evicted += 1
+
+    def clear(self):
+        self.orders.clear()
+        self.executions.clear()
+        self.buckets.clear()
+        self.bucket = self.bucket_end = None
+
+    def on_event(self, event):
+        etype = event.etype
+        if etype == EV_TRADE:
+            if event.exec_id:
+                self.add(event.exec_id, event.ts, event.symbol, event.shares,
+                         event.price, event.side, event.order_id)
+        elif etype == EV_EXECUTE:
+            self.execute(event)
+        elif etype == EV_ADD:
+            self.orders[event.order_id] = [event.symbol, event.side,
+                                           event.price, event.shares,
+                                           event.aux_shares]
+        elif etype == EV_DELETE:
+            self.orders.pop(event.order_id, None)
+        elif etype == EV_MODIFY:
+            order = self.orders.get(event.order_id)
+            if order is not None:
+                order[2] = event.price
+                order[3] = event.shares
+        elif etype == EV_REDUCE:
+            order = self.orders.get(event.order_id)
+            if order is not None:
+                order[3] -= event.shares
+                if order[3] <= 0:
+                    del self.orders[event.order_id]
+        elif etype == EV_CLEAR:
+            self.clear_orders(event.symbol, event.aux_shares)
+        elif etype == EV_TRADE_BREAK:
+            execution = self.pop(event.exec_id)
+            if execution is not None and self.on_break is not None:
+                self.on_break(event.exec_id, execution)
+
+    # Index an execution with the symbol, price and side of its order
+    def execute(self, event):
+        order = self.orders.get(event.order_id)
+        if order is None:
+            if event.exec_id:
+                self.add(event.exec_id, event.ts, event.symbol, event.shares,
+                         event.price, event.side, event.order_id)
+            return
+
+        sid, side, price, shares, unit = order
+        # Executed at price/size: the remaining size is on the wire
+        if event.price:
+            left = event.aux_shares
+        else:
+            left = shares - event.shares
+        if left > 0:
+            order[3] = left
+        else:
+            del self.orders[event.order_id]
+        if event.exec_id:
+            self.add(event.exec_id, event.ts, sid, event.shares,
+                     event.price or price, side, event.order_id)
+
+    # Same as OrderBook.clear: a symbol, or the orders of a unit for
+    # NO_SYMBOL (every order for unit 0, BATS text)
+    def clear_orders(self, sid, unit=0):
+        orders = self.orders
+        if sid == NO_SYMBOL and not unit:
+            orders.clear()
+            return
+        column, value = (4, unit) if sid == NO_SYMBOL else (0, sid)
+        for order_id in [oid for oid, order in orders.items()
+                         if order[column] == value]:
+            del orders[order_id]
@@ -0,0 +1,123 @@
+"""
+@file           hooks.py
+@description    Tracing hooks around blocks, message handlers and the sink
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Hooks are compiled in by swapping methods: the handlers of Exchange.types
+are wrapped by "layers" (hooks, bats.stats.Instrumentation), the block
+method and write_quote are shadowed by instance attributes. Nothing is
+swapped while no callback is registered, so the default path is the plain
+parser.
+
+event           callback arguments
+block_start     exchange, then the block method arguments:
+block_end           BATS      bytes_data, receive_timestamp (parse)
+                    BATS MC   unit, seq, msg_count, data, offset, ctx
+                              (parse_block)
+before_message  exchange, message type, message body, decode context
+after_message   exchange, message type, message body, decode context
+write           exchange, then the write_quote arguments
+
+    exchange.add_hook('before_message', lambda ex, mtype, body, ctx: ...)
+"""
+
+EVENTS = ('block_start', 'block_end', 'before_message', 'after_message',
+          'write')
+
+
+def rebuild_types(exchange):
+    """Re-wrap the original handlers with the installed layers, in order"""
+    if exchange.base_types is None:
+        exchange.base_types = dict(exchange.types)
+    types = dict(exchange.base_types)
+    for layer in exchange.layers:
+        for key, handler in types.items():
+            types[key] = layer.wrap(key, handler)
+    exchange.types.update(types)
+    if not exchange.layers:
+        exchange.base_types = None
+
+
+def install_layer(exchange, layer):
+    if layer not in exchange.layers:
+        exchange.layers.append(layer)
+    rebuild_types(exchange)
+
+
+def remove_layer(exchange, layer):
+    if layer in exchange.layers:
+        exchange.layers.remove(layer)
+    rebuild_types(exchange)
+
+
+class Hooks(object):
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.callbacks = dict((event, []) for event in EVENTS)
+        # BATS MC hooks sequenced unit blocks, BATS whole parse() calls
+        self.block = 'parse_block' if hasattr(exchange, 'parse_block') \
+            else 'parse'
+
+    def add(self, event, callback):
+        if event not in self.callbacks:
+            raise ValueError("Unknown hook %r, expected one of %s" %
+                             (event, ", ".join(EVENTS)))
+        self.callbacks[event].append(callback)
+        self.refresh()
+        return callback
+
+    def remove(self, event, callback):
+        self.callbacks[event].remove(callback)
+        self.refresh()
+
+    def refresh(self):
+        exchange = self.exchange
+        callbacks = self.callbacks
+
+        if callbacks['before_message'] or callbacks['after_message']:
+            install_layer(exchange, self)
+        elif self in exchange.layers:
+            remove_layer(exchange, self)
+
+        self.shadow(self.block, callbacks['block_start'],
+                    callbacks['block_end'])
+        self.shadow('write_quote', (), callbacks['write'])
+
+    # Shadow a method by an instance attribute calling the callbacks
+    def shadow(self, name, before, after):
+        exchange = self.exchange
+        exchange.__dict__.pop(name, None)
+        if not before and not after:
+            return
+
+        method = getattr(exchange, name)
+        before = tuple(before)
+        after = tuple(after)
+
+        def hooked(*args):
+            for callback in before:
+                callback(exchange, *args)
+            result = method(*args)
+            for callback in after:
+                callback(exchange, *args)
+            return result
+        setattr(exchange, name, hooked)
+
+    def wrap(self, key, handler):
+        exchange = self.exchange
+        before = tuple(self.callbacks['before_message'])
+        after = tuple(self.callbacks['after_message'])
+
+        # Handlers are called with (context, message body)
+        def hooked(ctx, body):
+            for callback in before:
+                callback(exchange, key, body, ctx)
+            result = handler(ctx, body)
+            for callback in after:
+                callback(exchange, key, body, ctx)
+            return result
+        return hooked
@@ -0,0 +1,345 @@
+"""
+@file           index.py
+@description    Seekable time and symbol index over raw capture files
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+A capture is cut into segments at sequenced unit block (BATS MC) or line
+(BATS) boundaries, every `time_interval` ms of feed time or every
+`seq_interval` messages. The sidecar index keeps the byte offset, feed
+time and sequence of every segment start, plus a bitmap of segments per
+symbol. Messages which only refer to an order (executions, cancels...)
+count for the symbol of that order. Malformed BATS lines are skipped and
+reported to the builder's ErrorChannel (IndexBuilder.errors).
+
+Sidecar layout (little endian):
+    Magic           8 bytes     b"BATSIDX" + format version
+    Kind            1 Binary    0 = BATS text, 1 = BATS MC binary
+    Intervals       4+4 Binary  time_interval (ms), seq_interval
+    File size       8 Binary
+    Entry count     4 Binary
+    Entry *         8+4+1+4     offset, time (ms past midnight), unit, seq
+    Symbol count    4 Binary
+    Symbol *        1 + n       name length, name
+                    4 + n       bitmap length, bitmap (bit i = segment i)
+"""
+
+import mmap
+from bisect import bisect_right
+from datetime import time as dtime
+from struct import pack, unpack_from
+
+from .errors import ErrorChannel
+from .symbols import SymbolTable
+
+MAGIC = b"BATSIDX\x01"
+
+TEXT = 0
+BINARY = 1
+
+# BATS text: message type => (symbol offset, symbol length) in the line
+TEXT_SYMBOLS = {
+    's': (10, 8), 'A': (29, 6), 'c': (33, 8), 't': (33, 8), 'P': (29, 6),
+    'q': (33, 8), 'O': (22, 8), 'H': (10, 8), 'Z': (10, 8), 'k': (10, 8),
+    'j': (10, 8),
+}
+# Adds, executions and cancels: message type => shares (start, end)
+TEXT_ADDS = {'A': (23, 29), 'c': (23, 33), 't': (23, 33)}
+TEXT_ORDER_REFS = {'E': (22, 28), 'e': (22, 32), 'X': (22, 28),
+                   'x': (22, 32)}
+
+# BATS MC: message type => (symbol offset, symbol length) in the body
+BINARY_SYMBOLS = {
+    0x22: (15, 6), 0x40: (17, 8), 0x2f: (17, 8), 0x2b: (15, 6),
+    0x41: (17, 8), 0x32: (12, 8), 0x31: (4, 8), 0x34: (4, 8),
+    0x95: (4, 8), 0x96: (4, 8),
+}
+BINARY_ADDS = (0x22, 0x40, 0x2f)
+BINARY_ORDER_REFS = (0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x29)
+BINARY_DELETE = 0x29
+BINARY_TIME = 0x20
+
+
+# Time of day to ms past midnight: int ms, "HH:MM[:SS[.fff]]" or time
+def to_ms(value):
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = dtime.fromisoformat(value)
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + \
+        value.microsecond // 1000
+
+
+def has_segment(bitmap, segment):
+    byte = segment >> 3
+    return byte < len(bitmap) and bitmap[byte] >> (segment & 7) & 1
+
+
+class Index(object):
+    def __init__(self, kind, time_interval=1000, seq_interval=100000):
+        self.kind = kind
+        self.time_interval = time_interval
+        self.seq_interval = seq_interval
+        self.size = 0
+        self.entries = []   # (offset, time ms, unit, seq)
+        self.bitmaps = {}   # symbol name => segment bitmap (bytes)
+
+    """
+    Byte ranges of the segments overlapping [start, end] and, when a symbol
+    is given, mentioning that symbol
+    @return     list of (offset, end offset), adjacent segments merged
+    """
+    def ranges(self, start=None, end=None, symbol=None):
+        start, end = to_ms(start), to_ms(end)
+        entries = self.entries
+        bitmap = None
+        if symbol is not None:
+            bitmap = self.bitmaps.get(symbol, b'')
+
+        ranges = []
+        for i, (offset, ts, unit, seq) in enumerate(entries):
+            stop = entries[i + 1][0] if i + 1 < len(entries) else self.size
+            if end is not None and ts > end:
+                break
+            if start is not None and i + 1 < len(entries) and \
+                    entries[i + 1][1] < start:
+                continue
+            if bitmap is not None and not has_segment(bitmap, i):
+                continue
+            if ranges and ranges[-1][1] == offset:
+                ranges[-1][1] = stop
+            else:
+                ranges.append([offset, stop])
+        return [tuple(r) for r in ranges]
+
+    def save(self, path):
+        chunks = [MAGIC, pack("<BIIQI", self.kind, self.time_interval,
+                              self.seq_interval, self.size,
+                              len(self.entries))]
+        chunks += [pack("<QIBI", *entry) for entry in self.entries]
+        chunks.append(pack("<I", len(self.bitmaps)))
+        for name, bitmap in self.bitmaps.items():
+            raw = name.encode('ascii')
+            chunks.append(pack("<B", len(raw)) + raw +
+                          pack("<I", len(bitmap)) + bitmap)
+        with open(path, "wb") as f:
+            f.write(b"".join(chunks))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("%s is not an index file" % path)
+
+        offset = len(MAGIC)
+        kind, time_interval, seq_interval, size, count = \
+            unpack_from("<BIIQI", data, offset)
+        offset += 21
+
+        index = cls(kind, time_interval, seq_interval)
+        index.size = size
+        index.entries = [unpack_from("<QIBI", data, offset + i * 17)
+                         for i in range(count)]
+        offset += count * 17
+
+        count = unpack_from("<I", data, offset)[0]
+        offset += 4
+        for i in range(count):
+            size = data[offset]
+            name = data[offset + 1:offset + 1 + size].decode('ascii')
+            offset += 1 + size
+            size = unpack_from("<I", data, offset)[0]
+            offset += 4
+            index.bitmaps[name] = data[offset:offset + size]
+            offset += size
+        return index
+
+
+class IndexBuilder(object):
+    def __init__(self, kind, time_interval=1000, seq_interval=100000):
+        self.index = Index(kind, time_interval, seq_interval)
+        self.symbols = SymbolTable()
+        self.orders = {}        # order id => symbol id, BATS MC
+                                # order id => [symbol id, shares], BATS
+        self.seen = set()       # symbol ids of the current segment
+        self.bitmaps = []       # symbol id => segment bitmap (bytearray)
+        self.errors = ErrorChannel()
+        self.segment_time = None
+        self.segment_messages = 0
+
+    def new_segment(self, offset, now, unit=0, seq=0):
+        self.close_segment()
+        self.index.entries.append((offset, now, unit, seq))
+        self.segment_time = now
+        self.segment_messages = 0
+
+    def close_segment(self):
+        segment = len(self.index.entries) - 1
+        byte = segment >> 3
+        bit = 1 << (segment & 7)
+        bitmaps = self.bitmaps
+        for sid in self.seen:
+            while sid >= len(bitmaps):
+                bitmaps.append(bytearray())
+            bits = bitmaps[sid]
+            if byte >= len(bits):
+                bits.extend(bytes(byte + 1 - len(bits)))
+            bits[byte] |= bit
+        self.seen = set()
+
+    def need_segment(self, now):
+        index = self.index
+        return self.segment_time is None or \
+            now - self.segment_time >= index.time_interval or \
+            self.segment_messages >= index.seq_interval
+
+    def finish(self, size):
+        self.close_segment()
+        index = self.index
+        index.size = size
+        index.bitmaps = dict(
+            (self.symbols.name(sid), bytes(bitmap))
+            for sid, bitmap in enumerate(self.bitmaps) if bitmap
+        )
+        return index
+
+    def scan_text(self, data):
+        intern = self.symbols.intern
+        orders = self.orders
+        seen = self.seen
+        start = 0
+        size = len(data)
+        while start < size:
+            stop = data.find(b'\n', start)
+            if stop < 0:
+                stop = size
+            line = data[start:stop].decode('ascii', 'replace')
+            if len(line) > 9:
+                try:
+                    now = int(line[1:9])
+                    if self.need_segment(now):
+                        self.new_segment(start, now)
+                        seen = self.seen
+                    self.segment_messages += 1
+
+                    m_type = line[9]
+                    loc = TEXT_SYMBOLS.get(m_type)
+                    if loc is not None:
+                        sid = intern(line[loc[0]:loc[0] + loc[1]])
+                        seen.add(sid)
+                        loc = TEXT_ADDS.get(m_type)
+                        if loc is not None:
+                            orders[line[10:22]] = \
+                                [sid, int(line[loc[0]:loc[1]])]
+                    elif m_type in TEXT_ORDER_REFS:
+                        key = line[10:22]
+                        order = orders.get(key)
+                        if order is not None:
+                            seen.add(order[0])
+                            # Forget fully executed or cancelled orders
+                            loc = TEXT_ORDER_REFS[m_type]
+                            order[1] -= int(line[loc[0]:loc[1]])
+                            if order[1] <= 0:
+                                del orders[key]
+                except ValueError as ex:
+                    self.errors.report('scan_text', ex, line, start)
+            start = stop + 1
+        return self.finish(size)
+
+    def scan_binary(self, data):
+        intern = self.symbols.intern
+        orders = self.orders
+        seen = self.seen
+        now = 0
+        start = 0
+        size = len(data)
+        while start + 8 <= size:
+            seq_len, count, unit, seq = unpack_from("<HBBI", data, start)
+            if not seq_len:
+                break
+            if self.need_segment(now):
+                self.new_segment(start, now, unit, seq)
+                seen = self.seen
+            self.segment_messages += count
+
+            offset = start + 8
+            for i in range(count):
+                mlen = data[offset]
+                mtype = data[offset + 1]
+                body = offset + 2
+                if mtype == BINARY_TIME:
+                    now = unpack_from("<I", data, body)[0] * 1000
+                else:
+                    loc = BINARY_SYMBOLS.get(mtype)
+                    if loc is not None:
+                        at = body + loc[0]
+                        sid = intern(data[at:at + loc[1]])
+                        seen.add(sid)
+                        if mtype in BINARY_ADDS:
+                            orders[data[body + 4:body + 12]] = sid
+                    elif mtype in BINARY_ORDER_REFS:
+                        key = data[body + 4:body + 12]
+                        sid = orders.get(key)
+                        if sid is not None:
+                            seen.add(sid)
+                            if mtype == BINARY_DELETE:
+                                del orders[key]
+                offset += mlen
+            start += seq_len
+        return self.finish(start)
+
+
+"""
+Build the sidecar index of a capture file in one pass
+@param      path, BATS text or BATS MC binary capture
+@param      kind, TEXT or BINARY
+@param      index_path, sidecar file, path + ".idx" by default
+"""
+def build(path, kind, index_path=None, time_interval=1000,
+          seq_interval=100000):
+    builder = IndexBuilder(kind, time_interval, seq_interval)
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if kind == TEXT:
+                index = builder.scan_text(data)
+            else:
+                index = builder.scan_binary(data)
+    index.save(index_path or path + ".idx")
+    return index
+
+
+"""
+Parse only the parts of a capture matching a time range and/or symbol.
+Segments are replayed whole, so consumers still see some messages just
+outside the range or of other symbols.
+@param      exchange, bats.Exchange or batsmc.Exchange
+@param      start, end, time of day (ms, "HH:MM:SS" or datetime.time)
+"""
+def replay(exchange, path, start=None, end=None, symbol=None, index=None):
+    if index is None:
+        index = Index.load(path + ".idx")
+
+    entries = index.entries
+    offsets = [entry[0] for entry in entries] + [index.size]
+    with open(path, "rb") as f:
+        for begin, stop in index.ranges(start, end, symbol):
+            f.seek(begin)
+            # Restore the feed clock of every unit at each jump, units
+            # first seen later start from the exchange default
+            i = bisect_right(offsets, begin) - 1
+            if index.kind == BINARY:
+                clock = pack("<I", entries[i][1] // 1000)
+                exchange.pitch_time = clock
+                for ctx in list(exchange.contexts.values()):
+                    ctx.pitch_time = clock
+            # Feed segment by segment
+            pos = begin
+            for offset in offsets[i + 1:]:
+                if offset > stop:
+                    break
+                exchange.parse(f.read(offset - pos))
+                pos = offset
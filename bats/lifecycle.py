@@ -0,0 +1,253 @@
+"""
+@file           lifecycle.py
+@description    Incremental order lifecycle analytics
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+OrderLifecycle follows every order from Add through Modify, Reduce,
+Execute and Delete and updates counters per symbol id and per participant
+(the participant of expanded Add Orders, "" for the other ones) in
+arrays. Resting times (add to full execution or cancel) also go to
+per symbol and per participant quantile sketches, so order to trade
+ratios, fill rates, resting times and cancel latencies are available live
+in constant memory besides the live orders themselves:
+
+    lifecycle = exchange.add_consumer(OrderLifecycle())
+    ...
+    lifecycle.metrics(exchange.symbols.get("VODl"))
+    lifecycle.participant_metrics("ABCD")
+"""
+
+from array import array
+from math import ceil, log
+
+from .store import EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE, \
+    EV_TRADE, EV_CLEAR
+from .symbols import NO_SYMBOL
+
+COLUMNS = (
+    'orders',           # orders added
+    'added_shares',
+    'modifies',
+    'reduces',
+    'executions',       # executions of displayed orders
+    'executed_shares',
+    'trades',           # executions of non displayed orders (Trade)
+    'filled',           # orders fully executed
+    'cancelled',        # orders deleted or reduced to zero
+    'cancelled_shares',
+    'resting_ns',       # sum of resting times of filled/cancelled orders
+    'cancel_ns',        # sum of add to cancel times
+)
+
+
+class LogSketch(object):
+    """
+    Streaming quantiles with relative accuracy `alpha`: values are counted
+    in buckets of geometric width, between `low` and `high` (clamped), so
+    the memory is fixed whatever the number of values.
+    """
+
+    __slots__ = ('low', 'gamma', 'scale', 'counts', 'count')
+
+    def __init__(self, alpha=0.05, low=1000, high=86400 * 10 ** 9):
+        self.low = low
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.scale = 1 / log(self.gamma)
+        self.counts = array('l', [0]) * (self.bucket(high) + 1)
+        self.count = 0
+
+    def bucket(self, value):
+        if value <= self.low:
+            return 0
+        return int(ceil(log(value / self.low) * self.scale))
+
+    def add(self, value):
+        counts = self.counts
+        counts[min(self.bucket(value), len(counts) - 1)] += 1
+        self.count += 1
+
+    # Value of the bucket holding the quantile, within alpha
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen > rank:
+                if not i:
+                    return self.low
+                return self.low * 2 * self.gamma ** i / (self.gamma + 1)
+        return self.low * self.gamma ** (len(self.counts) - 1)
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+
+
+class Accumulators(object):
+    """Lifecycle counters per index (symbol id or participant)"""
+
+    def __init__(self, size=1024):
+        self.size = 0
+        for name in COLUMNS:
+            setattr(self, name, array('q'))
+        self.sketches = []      # index => LogSketch or None
+        self.grow(size)
+
+    def grow(self, size):
+        extra = size - self.size
+        for name in COLUMNS:
+            getattr(self, name).extend([0] * extra)
+        self.sketches.extend([None] * extra)
+        self.size = size
+
+    def ensure(self, index):
+        if index >= self.size:
+            self.grow(max(index + 1, 2 * self.size))
+
+    def rested(self, index, ns, sketch_params):
+        self.resting_ns[index] += ns
+        sketch = self.sketches[index]
+        if sketch is None:
+            sketch = self.sketches[index] = LogSketch(*sketch_params)
+        sketch.add(ns)
+
+    def metrics(self, index):
+        if index >= self.size:
+            return None
+        info = dict((name, getattr(self, name)[index]) for name in COLUMNS)
+        done = info['filled'] + info['cancelled']
+        executions = info['executions'] + info['trades']
+        info['order_to_trade'] = \
+            info['orders'] / executions if executions else None
+        info['fill_rate'] = info['executed_shares'] / info['added_shares'] \
+            if info['added_shares'] else None
+        info['resting_mean_ns'] = info['resting_ns'] / done if done else None
+        info['cancel_mean_ns'] = info['cancel_ns'] / info['cancelled'] \
+            if info['cancelled'] else None
+        sketch = self.sketches[index]
+        if sketch is not None:
+            for q in (0.5, 0.9, 0.99):
+                info['resting_p%d_ns' % (q * 100)] = sketch.quantile(q)
+        return info
+
+
+class OrderLifecycle(object):
+    """
+    @param      alpha, relative accuracy of the resting time quantiles
+    """
+
+    def __init__(self, alpha=0.05):
+        self.symbols = Accumulators()
+        self.participants = Accumulators(16)
+        self.participant_ids = {'': 0}      # participant => index
+        self.participant_names = ['']
+        self.sketch_params = (alpha,)
+        # order id => [symbol id, participant index, add ts, shares, unit]
+        self.orders = {}
+
+    def participant(self, raw):
+        name = raw.rstrip(b'\x00 ').decode('ascii', 'replace') \
+            if isinstance(raw, bytes) else raw.rstrip()
+        index = self.participant_ids.get(name)
+        if index is None:
+            index = self.participant_ids[name] = len(self.participant_names)
+            self.participant_names.append(name)
+            self.participants.ensure(index)
+        return index
+
+    def on_event(self, event):
+        etype = event.etype
+        if etype == EV_ADD:
+            sid = event.symbol
+            pid = self.participant(event.participant) \
+                if event.participant else 0
+            self.orders[event.order_id] = [sid, pid, event.ts, event.shares,
+                                           event.aux_shares]
+            self.symbols.ensure(sid)
+            for acc, index in ((self.symbols, sid), (self.participants, pid)):
+                acc.orders[index] += 1
+                acc.added_shares[index] += event.shares
+            return
+
+        if etype == EV_TRADE:
+            sid = event.symbol
+            if sid != NO_SYMBOL:
+                self.symbols.ensure(sid)
+                self.symbols.trades[sid] += 1
+            return
+
+        if etype == EV_CLEAR:
+            self.clear(event.symbol, event.aux_shares)
+            return
+
+        order = self.orders.get(event.order_id)
+        if order is None:
+            return
+        sid, pid, added, shares, unit = order
+        both = ((self.symbols, sid), (self.participants, pid))
+
+        if etype == EV_EXECUTE:
+            left = event.aux_shares if event.price else shares - event.shares
+            for acc, index in both:
+                acc.executions[index] += 1
+                acc.executed_shares[index] += event.shares
+            if left > 0:
+                order[3] = left
+                return
+            for acc, index in both:
+                acc.filled[index] += 1
+                acc.rested(index, event.ts - added, self.sketch_params)
+            del self.orders[event.order_id]
+        elif etype == EV_MODIFY:
+            order[3] = event.shares
+            for acc, index in both:
+                acc.modifies[index] += 1
+        elif etype == EV_REDUCE:
+            left = shares - event.shares
+            for acc, index in both:
+                acc.reduces[index] += 1
+                acc.cancelled_shares[index] += event.shares
+            if left > 0:
+                order[3] = left
+                return
+            self.cancel(event, order, 0)
+        elif etype == EV_DELETE:
+            self.cancel(event, order, shares)
+
+    def cancel(self, event, order, shares):
+        sid, pid, added, left, unit = order
+        ns = event.ts - added
+        for acc, index in ((self.symbols, sid), (self.participants, pid)):
+            acc.cancelled[index] += 1
+            acc.cancelled_shares[index] += shares
+            acc.cancel_ns[index] += ns
+            acc.rested(index, ns, self.sketch_params)
+        del self.orders[event.order_id]
+
+    # Orders of a cleared symbol, or of a unit for NO_SYMBOL (every order
+    # for unit 0, BATS text), are forgotten
+    def clear(self, sid, unit=0):
+        orders = self.orders
+        if sid == NO_SYMBOL and not unit:
+            orders.clear()
+            return
+        column, value = (4, unit) if sid == NO_SYMBOL else (0, sid)
+        for order_id in [oid for oid, order in orders.items()
+                         if order[column] == value]:
+            del orders[order_id]
+
+    def metrics(self, sid):
+        return self.symbols.metrics(sid)
+
+    def participant_metrics(self, name):
+        index = self.participant_ids.get(name)
+        if index is None:
+            return None
+        return self.participants.metrics(index)
@@ -0,0 +1,132 @@
+"""
+@file           memory.py
+@description    Memory accounting of an Exchange and its components
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+memory_usage() walks the objects reachable from the parser buffers, the
+symbol table, the error and stats channels and every consumer (order maps,
+books, output buffers...) and sums their sys.getsizeof(). An object
+reachable from two components is counted once, in the first one. Classes,
+functions and bound methods are not followed, so handlers do not pull the
+whole Exchange into a component.
+
+    usage = exchange.memory_usage()
+    print(format_usage(usage))
+
+Keys are component names ('pending', 'symbols', 'OrderBook.orders'...),
+in bytes, with the sum under 'total'. Walking millions of orders takes a
+while: this is a report, not something to call per message.
+"""
+
+import sys
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+# Not followed, counted neither
+OPAQUE = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+# Exchange attributes reported on their own, in this order
+COMPONENTS = (
+    ('pending', ('pending',)),              # incomplete input
+    ('contexts', ('contexts', 'sequences')),
+    ('symbols', ('symbols',)),
+    ('errors', ('errors', 'unknown')),
+    ('stats', ('instrumentation', 'unit_stats')),
+    ('hooks', ('hooks', 'layers', 'base_types')),
+)
+
+
+"""
+Size of an object and everything it references, not seen before
+@param      obj, root object
+@param      seen, ids of objects already counted, updated
+@return     bytes
+"""
+def deep_size(obj, seen):
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, OPAQUE):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        elif isinstance(obj, (str, bytes, bytearray, int, float,
+                              memoryview)):
+            continue
+        else:
+            attrs = getattr(obj, '__dict__', None)
+            if attrs is not None:
+                stack.append(attrs)
+            for cls in type(obj).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    value = getattr(obj, name, None)
+                    if value is not None:
+                        stack.append(value)
+    return size
+
+
+# Per attribute sizes of a consumer
+def component_usage(prefix, obj, seen, usage):
+    usage[prefix] = sys.getsizeof(obj)
+    seen.add(id(obj))
+    for name, value in sorted(getattr(obj, '__dict__', {}).items()):
+        size = deep_size(value, seen)
+        if size:
+            usage[prefix + '.' + name] = size
+
+
+"""
+Memory held by an Exchange (bats or batsmc) and its consumers
+@param      exchange, Exchange
+@param      seen, ids of objects already counted, updated
+@return     dict component => bytes, 'total' for the sum
+"""
+def memory_usage(exchange, seen=None):
+    seen = set() if seen is None else seen
+    seen.add(id(exchange))
+    attrs = vars(exchange)
+    # The consumers list itself, its items are reported one by one
+    seen.add(id(attrs['consumers']))
+
+    usage = {}
+    reported = set(['consumers'])
+    for component, names in COMPONENTS:
+        size = 0
+        for name in names:
+            if name in attrs:
+                size += deep_size(attrs[name], seen)
+                reported.add(name)
+        usage[component] = size
+
+    names = {}
+    for consumer in attrs['consumers']:
+        name = type(consumer).__name__
+        count = names[name] = names.get(name, 0) + 1
+        component_usage(name if count == 1 else "%s#%d" % (name, count),
+                        consumer, seen, usage)
+
+    usage['other'] = sum(deep_size(value, seen)
+                         for name, value in attrs.items()
+                         if name not in reported)
+    usage['total'] = sum(usage.values())
+    return usage
+
+
+def format_usage(usage):
+    total = usage['total'] or 1
+    lines = ["%-40s %14d %5.1f%%" % (name, size, 100.0 * size / total)
+             for name, size in sorted(usage.items(), key=lambda x: -x[1])
+             if name != 'total']
+    lines.append("%-40s %14d" % ('total', usage['total']))
+    return "\n".join(lines)
@@ -0,0 +1,159 @@
+"""
+@file           parallel.py
+@description    Sharded multiprocess parsing of BATS text files
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Text PITCH files are newline delimited, so a file is cut into byte ranges
+aligned to line starts and every range is parsed by its own process. The
+workers map the file (the pages are shared through the OS cache), and
+return their normalized events as packed records (bats.store.RECORD),
+which are cheap to send back compared to pickled objects.
+
+Symbol ids are local to a worker; results are remapped onto one global
+SymbolTable before they are handed out.
+"""
+
+import mmap
+import os
+from array import array
+from multiprocessing import Pool
+
+from .parser import Exchange
+from .store import EventBuffer, HEADER, MAGIC, RECORD, iter_records
+from .symbols import SymbolTable, NO_SYMBOL
+
+# Lines are decoded in pieces of about this size inside a shard
+CHUNK_SIZE = 4 << 20
+
+# Index of the symbol field in a record viewed as uint32 array
+SYMBOL_WORD = 14
+RECORD_WORDS = RECORD.size // 4
+
+
+class ShardExchange(Exchange):
+    """Exchange used by the workers, output goes to consumers only"""
+
+    def write_quote(self, *quote):
+        pass
+
+    def close_quotes(self):
+        pass
+
+
+class ShardResult(object):
+    def __init__(self, index, start, end, records, count, symbols):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.records = records      # packed bats.store.RECORD
+        self.count = count
+        self.symbols = symbols      # worker symbol id => name
+
+    def events(self):
+        return iter_records(self.records)
+
+
+# Byte ranges of about size / shards, each starting at a line start
+def shard_ranges(data, shards):
+    size = len(data)
+    step = max(1, size // max(1, shards))
+    ranges = []
+    start = 0
+    while start < size:
+        end = data.find(b'\n', min(size - 1, start + step - 1))
+        end = size if end < 0 else end + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def parse_shard(task):
+    index, path, start, end, factory, day = task
+
+    exchange = factory("bats-shard-%d" % index)
+    if day is not None:
+        exchange.date = day
+    output = exchange.add_consumer(EventBuffer())
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            pos = start
+            while pos < end:
+                stop = data.find(b'\n', min(end - 1, pos + CHUNK_SIZE))
+                stop = end if stop < 0 or stop >= end else stop + 1
+                exchange.parse(data[pos:stop])
+                pos = stop
+
+    return ShardResult(index, start, end, bytes(output.buffer), output.count,
+                       exchange.symbols.export())
+
+
+def remap_symbols(result, symbols):
+    mapping = [symbols.add(name) for name in result.symbols]
+    if mapping == list(range(len(mapping))) or not result.count:
+        return result
+
+    words = array('I', result.records)
+    ids = words[SYMBOL_WORD::RECORD_WORDS]
+    words[SYMBOL_WORD::RECORD_WORDS] = array(
+        'I', [sid if sid == NO_SYMBOL else mapping[sid] for sid in ids]
+    )
+    result.records = words.tobytes()
+    result.symbols = symbols.export()
+    return result
+
+
+"""
+Parse a BATS text file in parallel
+@param      path, text PITCH file
+@param      processes, worker processes, os.cpu_count() by default
+@param      shards, number of byte ranges, 4 per process by default
+@param      ordered, yield shards in file order, or as soon as parsed
+@param      factory, Exchange class (or picklable callable) for workers
+@param      day, trading date of the file, today by default
+@param      symbols, SymbolTable the shard symbol ids are mapped onto
+@return     ShardResult generator
+"""
+def parse_shards(path, processes=None, shards=None, ordered=True,
+                 factory=ShardExchange, day=None, symbols=None):
+    processes = processes or os.cpu_count() or 1
+    shards = shards or processes * 4
+    if symbols is None:
+        symbols = SymbolTable()
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ranges = shard_ranges(data, shards)
+
+    tasks = [(i, path, start, end, factory, day)
+             for i, (start, end) in enumerate(ranges)]
+    with Pool(processes) as pool:
+        run = pool.imap if ordered else pool.imap_unordered
+        for result in run(parse_shard, tasks):
+            yield remap_symbols(result, symbols)
+
+
+def iter_events(path, **params):
+    for result in parse_shards(path, **params):
+        for event in result.events():
+            yield event
+
+
+"""
+Parse a BATS text file in parallel straight into an event store
+@return     number of events written
+"""
+def parse_to_store(path, store_path, **params):
+    count = 0
+    with open(store_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, RECORD.size))
+        for result in parse_shards(path, **params):
+            out.write(result.records)
+            count += result.count
+    return count
@@ -8,10 +8,21 @@ This file is released under MIT license.
 More detailed information is stored in LICENSE.txt
 """
 
-import traceback
+from functools import wraps
 from datetime import datetime, date
 from time import mktime
 from struct import *
+import threading
+
+from .symbols import SymbolTable, NO_SYMBOL
+from .errors import ErrorChannel, hexdump
+from .stats import Instrumentation
+from .hooks import Hooks
+from .memory import memory_usage
+from .store import Event, PRICE_SCALE, SIDE_BUY, SIDE_SELL, \
+    EV_CLEAR, EV_ADD, EV_EXECUTE, EV_REDUCE, EV_TRADE, EV_TRADE_BREAK, \
+    EV_TRADE_REPORT, EV_STATUS, EV_STATISTIC, EV_AUCTION_UPDATE, \
+    EV_AUCTION_SUMMARY
 
 
 class MsgBody(object):
@@ -32,35 +43,65 @@ class MsgBody(object):
         return self.data
 
 
-class Exchange():
+# Normalized price ticks per wire unit
+SHORT_PRICE = PRICE_SCALE // 10000
+LONG_PRICE = PRICE_SCALE // 10000000
+
+SHARES = ('pitch_shares_s', 'pitch_shares_l', 'pitch_buy_shares_l')
+
+PRICES = (
+    ('pitch_price_s', SHORT_PRICE),
+    ('pitch_price_l', LONG_PRICE),
+    ('pitch_indicative_price_l', LONG_PRICE),
+)
+
+SIDES = {'B': SIDE_BUY, 'S': SIDE_SELL}
 
-    def flag(func):
-        def wrapper(_flag, *args, **kwargs):
-            try:
-                return func(chr(_flag), *args, **kwargs)
-            except Exception as ex:
-                print("Error! In ", func.__name__, str(ex))
 
-        return wrapper
+class Context(object):
+    """
+    Decode state of one parse() call: the clock of the line being decoded
+    and the text of the chunk, for error offsets. Handlers get the context
+    as an argument instead of keeping state on the Exchange, so one
+    Exchange can parse chunks from several threads.
+    """
+
+    __slots__ = ('midnight', 'receive_timestamp', 'timestamp', 'time',
+                 'text', 'text_start', 'text_hint')
 
-    def process_msg_header(msg_len):
+    def __init__(self, midnight, receive_timestamp, text, text_start):
+        self.midnight = midnight
+        self.receive_timestamp = receive_timestamp
+        self.timestamp = None       # ns since the epoch
+        self.time = None            # datetime
+        self.text = text
+        self.text_start = text_start
+        self.text_hint = 0
+
+
+class Exchange():
+
+    def process_msg_header(msg_len, etype=None):
         def wrap(func):
-            def wrapper(self, ts, data, *args, **kwargs):
+            @wraps(func)
+            def wrapper(self, ctx, data, *args, **kwargs):
                 try:
                     # print("Call %s(%s)" %
                     #     (func.__name__, data[0:msg_len])
                     # )
                     msg_data = MsgBody(data[0:msg_len])
                     fields = func(self, msg_data, *args, **kwargs)
-                    fields['receive_timestamp'] = ts
-                    q_map = self.map_quote(fields)
+                    fields['receive_timestamp'] = ctx.time
+                    q_map = self.map_quote(fields, ctx)
                     self.write_quote(*q_map)
+                    if etype and self.consumers:
+                        event = self.normalize(etype, fields, ctx)
+                        for consumer in self.consumers:
+                            consumer.on_event(event)
 
                 except Exception as ex:
-                    print("Error! Message", func.__name__,
-                          self.to_bstr(data[0:msg_len]),
-                          "ignored. (%s)" % str(ex))
-                    traceback.print_exc()
+                    self.errors.report(func.__name__, ex, data[0:msg_len],
+                                       self.error_offset(ctx, data))
                 return data[msg_len:]
 
             return wrapper
@@ -68,7 +109,10 @@ class Exchange():
         return wrap
 
     @staticmethod
-    @flag
+    def to_bstr(data):
+        return hexdump(data, len(data))
+
+    @staticmethod
     def market_mechanism(key):
         return {
             "1": 1,
@@ -78,7 +122,6 @@ class Exchange():
         }.get(key)
 
     @staticmethod
-    @flag
     def trading_mode(key):
         return {
             "1": 1,
@@ -95,7 +138,6 @@ class Exchange():
         }.get(key)
 
     @staticmethod
-    @flag
     def transaction_category(key):
         return {
             "P": 1,
@@ -106,21 +148,18 @@ class Exchange():
         }.get(key)
 
     @staticmethod
-    @flag
     def negotiated_trade(key):
         return {
             "N": 1,
         }.get(key, 2)
 
     @staticmethod
-    @flag
     def crossing_trade(key):
         return {
             "X": 1,
         }.get(key, 2)
 
     @staticmethod
-    @flag
     def modification_indicator(key):
         return {
             "A": 1,
@@ -128,21 +167,18 @@ class Exchange():
         }.get(key, 3)
 
     @staticmethod
-    @flag
     def benchmark_indicator(key):
         return {
             "B": 1,
         }.get(key, 2)
 
     @staticmethod
-    @flag
     def ex_cum_dividend(key):
         return {
             "E": 1,
         }.get(key, 2)
 
     @staticmethod
-    @flag
     def offbook_automated_indicator(key):
         return {
             "Q": 1,
@@ -150,7 +186,6 @@ class Exchange():
         }.get(key, 3)
 
     @staticmethod
-    @flag
     def publication_indicator(key):
         return {
             "1": 1,
@@ -191,7 +226,7 @@ class Exchange():
         }
 
     # Clear msg parser
-    @process_msg_header(8)
+    @process_msg_header(8, EV_CLEAR)
     def msg_clear(self, data):
         names = (
             ('pitch_symbol', 8),
@@ -199,7 +234,7 @@ class Exchange():
         return data.get_fields(names)
 
     # Add Order Message
-    @process_msg_header(45)
+    @process_msg_header(45, EV_ADD)
     def msg_add_order(self, data):
         names = (
             ('pitch_order', 12),
@@ -212,7 +247,7 @@ class Exchange():
         return data.get_fields(names)
 
     # Add Order Message — Long Form
-    @process_msg_header(60)
+    @process_msg_header(60, EV_ADD)
     def msg_add_order_long(self, data):
         names = (
             ('pitch_order', 12),
@@ -225,7 +260,7 @@ class Exchange():
         return data.get_fields(names)
 
     # Add Order Message — Expanded Form
-    @process_msg_header(64)
+    @process_msg_header(64, EV_ADD)
     def msg_add_order_exp(self, data):
         names = (
             ('pitch_order', 12),
@@ -239,7 +274,7 @@ class Exchange():
         return data.get_fields(names)
 
     # Executed Order Message
-    @process_msg_header(42)
+    @process_msg_header(42, EV_EXECUTE)
     def msg_order_executed(self, data):
         names = (
             ('pitch_order', 12),
@@ -250,11 +285,10 @@ class Exchange():
         fields = data.get_fields(names)
 
         fields.update(self.parse_order_execution_flag(fields['flags']))
-        del fields['flags']
         return fields
 
     # Executed Order Message — Long Form
-    @process_msg_header(46)
+    @process_msg_header(46, EV_EXECUTE)
     def msg_order_executed_long(self, data):
         names = (
             ('pitch_order', 12),
@@ -265,11 +299,10 @@ class Exchange():
         fields = data.get_fields(names)
 
         fields.update(self.parse_order_execution_flag(fields['flags']))
-        del fields['flags']
         return fields
 
     # Cancel Order Message
-    @process_msg_header(27)
+    @process_msg_header(27, EV_REDUCE)
     def msg_order_cancel(self, data):
         names = (
             ('pitch_order', 12),
@@ -278,7 +311,7 @@ class Exchange():
         return data.get_fields(names)
 
     # Cancel Order Message — Long Form
-    @process_msg_header(31)
+    @process_msg_header(31, EV_REDUCE)
     def msg_order_cancel_long(self, data):
         names = (
             ('pitch_order', 12),
@@ -287,7 +320,7 @@ class Exchange():
         return data.get_fields(names)
 
     # Trade Message
-    @process_msg_header(60)
+    @process_msg_header(60, EV_TRADE)
     def msg_trade(self, data):
         names = (
             ('pitch_order', 12),
@@ -301,12 +334,11 @@ class Exchange():
         fields = data.get_fields(names)
 
         fields.update(self.parse_trade_flags(fields['flags']))
-        del fields['flags']
 
         return fields
 
     # Trade Message - Long form
-    @process_msg_header(75)
+    @process_msg_header(75, EV_TRADE)
     def msg_trade_long(self, data):
         names = (
             ('pitch_order', 12),
@@ -320,12 +352,11 @@ class Exchange():
         fields = data.get_fields(names)
 
         fields.update(self.parse_trade_flags(fields['flags']))
-        del fields['flags']
 
         return fields
 
     # Trade Break Message
-    @process_msg_header(21)
+    @process_msg_header(21, EV_TRADE_BREAK)
     def msg_trade_break(self, data):
         names = (
             ('pitch_execution', 12),
@@ -333,7 +364,7 @@ class Exchange():
         return data.get_fields(names)
 
     # Trade Report Message
-    @process_msg_header(94)
+    @process_msg_header(94, EV_TRADE_REPORT)
     def msg_trade_report(self, data):
         names = (
             ('pitch_shares_l', 12),
@@ -357,12 +388,11 @@ class Exchange():
         del fields['time']
 
         fields.update(self.parse_trade_report_flags(fields['flags']))
-        del fields['flags']
 
         return fields
 
     # Trading Status Message
-    @process_msg_header(21)
+    @process_msg_header(21, EV_STATUS)
     def msg_trading_status(self, data):
         names = (
             ('pitch_symbol', 8),
@@ -373,11 +403,11 @@ class Exchange():
         fields['pitch_trading_status'] = \
             {'T': 1, 'R': 2, 'C': 3, 'S': 4, 'N': 5, 'V': 6, 'O': 7,
              'E': 8, 'H': 9, 'M': 10, 'P': 11} \
-            .get(fields['pitch_trading_status'])
+            .get(fields['pitch_status'])
         return fields
 
     # Statistics Message
-    @process_msg_header(38)
+    @process_msg_header(38, EV_STATISTIC)
     def msg_statistics(self, data):
         names = (
             ('pitch_symbol', 8),
@@ -386,6 +416,8 @@ class Exchange():
             ('pitch_price_determination', 1)
         )
         fields = data.get_fields(names)
+        fields['flags'] = fields['pitch_statistic_type'] + \
+            fields['pitch_price_determination']
         fields['pitch_statistic_type'] = \
             {'C': 1, 'H': 2, 'L': 3, 'O': 4, 'P': 5} \
             .get(fields['pitch_statistic_type'])
@@ -394,7 +426,7 @@ class Exchange():
         return fields
 
     # Auction Update Message
-    @process_msg_header(76)
+    @process_msg_header(76, EV_AUCTION_UPDATE)
     def msg_auction_update(self, data):
         names = (
             ('pitch_symbol', 8),
@@ -405,21 +437,23 @@ class Exchange():
             ('pitch_indicative_price_l', 19)
         )
         fields = data.get_fields(names)
+        fields['flags'] = fields['pitch_auction_type']
         fields['pitch_auction_type'] = \
             {'O': 1, 'C': 2, 'H': 3, 'V': 4} \
             .get(fields['pitch_auction_type'])
         return fields
 
     # Auction Summary Message
-    @process_msg_header(47)
+    @process_msg_header(47, EV_AUCTION_SUMMARY)
     def msg_auction_summary(self, data):
         names = (
             ('pitch_symbol', 8),
             ('pitch_auction_type', 1),
             ('pitch_price_l', 19),
-            ('pitch_share_l', 10)
+            ('pitch_shares_l', 10)
         )
         fields = data.get_fields(names)
+        fields['flags'] = fields['pitch_auction_type']
         fields['pitch_auction_type'] = \
             {'O': 1, 'C': 2, 'H': 3, 'V': 4} \
             .get(fields['pitch_auction_type'])
@@ -447,34 +481,187 @@ class Exchange():
         }
 
         self.date = date.today()
+        self.symbols = SymbolTable()
+
+        # Bytes of input parsed so far, a restored session resumes from here
+        self.position = 0
+
+        # Receivers of normalized events (bats.store.Event)
+        self.consumers = []
+
+        # Incomplete last line of the data fed so far
+        self.pending = b''
+
+        # Decode errors per handler and skipped unknown message types,
+        # counted on those paths only; see enable_stats() for the rest
+        self.errors = ErrorChannel()
+        self.unknown = {}
+        self.lock = threading.Lock()
+        self.instrumentation = None
+
+        # Handler wrappers (stats, hooks) over the original self.types
+        self.layers = []
+        self.base_types = None
+        self.hooks = None
 
     """
     Parse data entry point
     @param      bytes_data, RAW data to parse
-    @param      date, timestamp
+    @param      receive_timestamp, time the data was received (ns), optional
     """
-    def parse(self, bytes_data):
-        self.midnight = mktime(datetime.today().timetuple())
+    def parse(self, bytes_data, receive_timestamp=None):
+        midnight = mktime(self.date.timetuple())
+
+        # Concurrent calls get their own stream offsets
+        with self.lock:
+            position = self.position
+            self.position += len(bytes_data)
+
+        data = bytes_data.decode('utf-8', 'replace')
+        ctx = Context(midnight, receive_timestamp, data, position)
+        types = self.types
 
-        data = bytes_data.decode('utf-8')
         for msg in data.split('\n'):
             if not msg:
                 continue
 
             msg = msg[1:]
-            # Check minimum message length (timestamp + type)
-            ts = int(msg[0:7])
-            m_type = msg[8]
+            try:
+                # Check minimum message length (timestamp + type)
+                ts = int(msg[0:8])
+                m_type = msg[8]
+            except (ValueError, IndexError) as ex:
+                self.errors.report('parse', ex, msg,
+                                   self.error_offset(ctx, msg))
+                continue
 
-            # ignore unknown messages
-            if m_type in self.types.keys():
-                ts = self.date_format(self.midnight + ts)
-                self.types[m_type](ts, msg[9:])
+            # unknown messages are counted and ignored
+            if m_type in types:
+                # Milliseconds past midnight
+                ctx.timestamp = (int(midnight) * 1000 + ts) * 1000000
+                ctx.time = self.date_format(midnight + ts / 1000.0)
+                types[m_type](ctx, msg[9:])
+            else:
+                with self.lock:
+                    self.unknown[m_type] = self.unknown.get(m_type, 0) + 1
 
         # closing quotes, also flush rows...
         self.close_quotes()
 
-    def map_quote(self, fields):
+    # Stream offset of the line holding a message, on the error path only
+    def error_offset(self, ctx, data):
+        found = ctx.text.find(data, ctx.text_hint)
+        if found < 0:
+            return None
+        ctx.text_hint = found + len(data)
+        return ctx.text_start + ctx.text.rfind('\n', 0, found) + 1
+
+    """
+    Incremental parse entry point, data may be cut anywhere
+    @param      bytes_data, RAW data to parse
+    @param      receive_timestamp, time the data was received (ns), optional
+    """
+    def feed(self, bytes_data, receive_timestamp=None):
+        data = self.pending + bytes_data if self.pending else bytes_data
+        end = data.rfind(b'\n') + 1
+        self.pending = data[end:]
+        if end:
+            self.parse(data[:end] if end < len(data) else data,
+                       receive_timestamp)
+
+    # End of the fed stream, parse the last line if not terminated
+    def feed_end(self):
+        if self.pending:
+            data, self.pending = self.pending, b''
+            self.parse(data)
+
+    """
+    Count messages and bytes per type
+    @param      sample_every, time one message of N per type, 0 disables
+                latency histograms
+    """
+    def enable_stats(self, sample_every=0):
+        self.disable_stats()
+        self.instrumentation = Instrumentation(self, sample_every).install()
+        return self.instrumentation
+
+    def disable_stats(self):
+        if self.instrumentation is not None:
+            self.instrumentation.uninstall()
+            self.instrumentation = None
+
+    def stats(self):
+        if self.instrumentation is not None:
+            return self.instrumentation.snapshot()
+        return {'errors': self.errors.snapshot(),
+                'unknown': dict(self.unknown)}
+
+    """
+    Register a tracing callback, see bats.hooks for events and arguments
+    """
+    def add_hook(self, event, callback):
+        if self.hooks is None:
+            self.hooks = Hooks(self)
+        return self.hooks.add(event, callback)
+
+    def remove_hook(self, event, callback):
+        self.hooks.remove(event, callback)
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+        return consumer
+
+    def remove_consumer(self, consumer):
+        self.consumers.remove(consumer)
+
+    """
+    Memory held by the parser buffers, symbol table and each consumer,
+    see bats.memory
+    @return     dict component => bytes, 'total' for the sum
+    """
+    def memory_usage(self):
+        return memory_usage(self)
+
+    """
+    Normalize decoded message fields into bats.store.Event
+    @param      etype, EV_* event type
+    @param      fields, fields returned by the message handler
+    @param      ctx, Context of the parse call
+    """
+    def normalize(self, etype, fields, ctx):
+        get = fields.get
+
+        symbol = get('pitch_symbol')
+        symbol = NO_SYMBOL if symbol is None else self.symbols.intern(symbol)
+
+        order = get('pitch_order')
+        order = int(order, 36) if order else 0
+        exec_id = get('pitch_execution') or get('pitch_trade')
+        exec_id = int(exec_id, 36) if exec_id else 0
+
+        shares = aux_shares = price = aux_price = 0
+        for name in SHARES:
+            if name in fields:
+                shares = int(fields[name])
+                break
+        for name, scale in PRICES:
+            if name in fields:
+                price = int(fields[name]) * scale
+                break
+        if 'pitch_sell_shares_l' in fields:
+            aux_shares = int(fields['pitch_sell_shares_l'])
+        if 'pitch_reference_price_l' in fields:
+            aux_price = int(fields['pitch_reference_price_l']) * LONG_PRICE
+
+        flags = get('flags') or get('pitch_status') or ''
+        participant = get('pitch_participant') or ''
+
+        return Event(ctx.timestamp, order, exec_id, shares, price,
+                     aux_shares, aux_price, symbol,
+                     participant.encode('ascii'), flags.encode('ascii'),
+                     etype, SIDES.get(get('pitch_side'), 0))
+
+    def map_quote(self, fields, ctx):
 
         """
         Type: Description
@@ -573,6 +760,9 @@ class Exchange():
         pitch_reference_price  | Long Price        |
         """
 
+        if 'pitch_symbol' in fields:
+            fields['symbol_id'] = self.symbols.intern(fields['pitch_symbol'])
+
         # TODO: Map fields described above to quote
 
         return "", 0, "", ""
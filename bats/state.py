@@ -0,0 +1,168 @@
+"""
+@file           state.py
+@description    Per symbol trading status, statistics and auction state
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+StateTable keeps the latest Trading Status, Statistics, Auction Update and
+Auction Summary of every symbol in arrays indexed by symbol id. Reads are
+an index into an array (no dict lookup, no object built), so risk checks
+can poll them at any rate:
+
+    state = exchange.add_consumer(StateTable())
+    sid = exchange.symbols.get("VODl")
+    if state.halted(sid) or state.in_auction(sid):
+        price = state.indicative[sid]
+
+Status and types are kept as the ASCII code of the wire value (ord('T'),
+ord('O')...), 0 until the first message. Prices are in ticks of
+1 / PRICE_SCALE. Listeners are called with (ts, symbol id, EV_* type)
+when a message changes the state of a symbol.
+"""
+
+from array import array
+
+from .store import EV_STATUS, EV_STATISTIC, EV_AUCTION_UPDATE, \
+    EV_AUCTION_SUMMARY
+from .symbols import NO_SYMBOL
+
+# Trading status codes
+TRADING = ord('T')
+OFF_BOOK = ord('R')
+CLOSED = ord('C')
+SUSPENDED = ord('S')
+NO_REFERENCE = ord('N')
+VOLATILITY = ord('V')
+OPENING_AUCTION = ord('O')
+CLOSING_AUCTION = ord('E')
+HALT = ord('H')
+MARKET_IMBALANCE = ord('M')
+PRICE_MONITORING = ord('P')
+
+
+def lookup(codes):
+    table = bytearray(256)
+    for code in codes:
+        table[code] = 1
+    return bytes(table)
+
+
+HALTED = lookup((SUSPENDED, HALT))
+# Auctions and their extensions
+AUCTION = lookup((VOLATILITY, OPENING_AUCTION, CLOSING_AUCTION,
+                  MARKET_IMBALANCE, PRICE_MONITORING))
+
+# Statistic type code => attribute
+STATISTICS = {
+    ord('O'): 'open',
+    ord('H'): 'high',
+    ord('L'): 'low',
+    ord('C'): 'close',
+    ord('P'): 'previous_close',
+}
+
+COLUMNS = (
+    ('ts', 'q'),                # time of the latest change
+    ('status', 'B'),
+    ('open', 'q'),
+    ('high', 'q'),
+    ('low', 'q'),
+    ('close', 'q'),
+    ('previous_close', 'q'),
+    ('auction_type', 'B'),
+    ('reference', 'q'),
+    ('indicative', 'q'),
+    ('buy_shares', 'q'),
+    ('sell_shares', 'q'),
+    ('imbalance', 'q'),         # buy - sell shares
+    ('auction_price', 'q'),     # of the latest Auction Summary
+    ('auction_shares', 'q'),
+)
+
+
+class StateTable(object):
+    """Latest trading state per symbol id, an Exchange consumer"""
+
+    def __init__(self, size=1024):
+        self.size = 0
+        for name, code in COLUMNS:
+            setattr(self, name, array(code))
+        self.listeners = []     # callables (ts, symbol id, EV_* type)
+        self.grow(size)
+
+    def grow(self, size):
+        extra = size - self.size
+        for name, code in COLUMNS:
+            getattr(self, name).extend([0] * extra)
+        self.size = size
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def halted(self, sid):
+        return sid < self.size and HALTED[self.status[sid]] == 1
+
+    def in_auction(self, sid):
+        return sid < self.size and AUCTION[self.status[sid]] == 1
+
+    def on_event(self, event):
+        etype = event.etype
+        if etype < EV_STATUS or etype > EV_AUCTION_SUMMARY:
+            return
+        sid = event.symbol
+        if sid == NO_SYMBOL:
+            return
+        if sid >= self.size:
+            self.grow(max(sid + 1, 2 * self.size))
+
+        code = event.flags[0] if event.flags else 0
+        if etype == EV_STATUS:
+            if self.status[sid] == code:
+                return
+            self.status[sid] = code
+        elif etype == EV_STATISTIC:
+            name = STATISTICS.get(code)
+            if name is None:
+                return
+            values = getattr(self, name)
+            if values[sid] == event.price:
+                return
+            values[sid] = event.price
+        elif etype == EV_AUCTION_UPDATE:
+            imbalance = event.shares - event.aux_shares
+            if self.auction_type[sid] == code and \
+                    self.indicative[sid] == event.price and \
+                    self.reference[sid] == event.aux_price and \
+                    self.buy_shares[sid] == event.shares and \
+                    self.sell_shares[sid] == event.aux_shares:
+                return
+            self.auction_type[sid] = code
+            self.indicative[sid] = event.price
+            self.reference[sid] = event.aux_price
+            self.buy_shares[sid] = event.shares
+            self.sell_shares[sid] = event.aux_shares
+            self.imbalance[sid] = imbalance
+        else:
+            self.auction_type[sid] = code
+            self.auction_price[sid] = event.price
+            self.auction_shares[sid] = event.shares
+
+        self.ts[sid] = event.ts
+        for listener in self.listeners:
+            listener(event.ts, sid, etype)
+
+    """
+    State of one symbol, for display or logging (builds a dict)
+    @return     dict column => value
+    """
+    def snapshot(self, sid):
+        if sid >= self.size:
+            return None
+        return dict((name, getattr(self, name)[sid]) for name, code in COLUMNS)
@@ -0,0 +1,193 @@
+"""
+@file           stats.py
+@description    Per message type throughput and latency instrumentation
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Instrumentation swaps the handlers of Exchange.types for counting
+wrappers, so a parser without stats enabled runs the plain handlers.
+Latency is measured on one message out of `sample_every` per type and
+kept in log2 buckets of nanoseconds.
+"""
+
+from time import perf_counter_ns, time_ns
+
+from .hooks import install_layer, remove_layer
+
+# Latency histogram buckets: bucket i counts latencies < 2 ** i ns
+BUCKETS = 32
+
+
+class TypeStats(object):
+    __slots__ = ('name', 'count', 'bytes', 'samples', 'histogram')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.bytes = 0
+        self.samples = 0
+        self.histogram = [0] * BUCKETS
+
+    def observe(self, ns):
+        self.samples += 1
+        self.histogram[min(ns.bit_length(), BUCKETS - 1)] += 1
+
+    # Upper bound (ns) of the bucket holding the given quantile
+    def quantile(self, q):
+        if not self.samples:
+            return None
+        rank = q * self.samples
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if seen >= rank:
+                return 1 << i
+        return 1 << (BUCKETS - 1)
+
+    def snapshot(self):
+        info = {
+            'handler': self.name,
+            'count': self.count,
+            'bytes': self.bytes,
+        }
+        if self.samples:
+            info['samples'] = self.samples
+            info['p50_ns'] = self.quantile(0.5)
+            info['p99_ns'] = self.quantile(0.99)
+            info['histogram'] = dict(
+                (1 << i, n) for i, n in enumerate(self.histogram) if n
+            )
+        return info
+
+
+class UnitStats(object):
+    """Sequenced unit block counters, BATS MC only"""
+
+    def __init__(self):
+        self.units = {}     # unit => [blocks, messages, duplicates, gaps,
+                            #          missing, last sequence]
+
+    def block(self, unit, seq, count, duplicates):
+        counters = self.units.get(unit)
+        if counters is None:
+            counters = self.units[unit] = [0, 0, 0, 0, 0, 0]
+        counters[0] += 1
+        counters[1] += count
+        counters[2] += duplicates
+        last = counters[5]
+        if last and seq > last + 1:
+            counters[3] += 1
+            counters[4] += seq - last - 1
+        if seq + count - 1 > last:
+            counters[5] = seq + count - 1
+
+    def snapshot(self):
+        return dict(
+            (unit, {
+                'blocks': c[0], 'messages': c[1], 'duplicates': c[2],
+                'gaps': c[3], 'missing': c[4], 'last_sequence': c[5],
+            }) for unit, c in self.units.items()
+        )
+
+
+class Instrumentation(object):
+    def __init__(self, exchange, sample_every=0):
+        self.exchange = exchange
+        self.sample_every = sample_every
+        self.types = {}         # message type => TypeStats
+        self.units = None
+
+    def install(self):
+        exchange = self.exchange
+        install_layer(exchange, self)
+        if hasattr(exchange, 'sequences'):
+            self.units = exchange.unit_stats = UnitStats()
+        return self
+
+    def uninstall(self):
+        remove_layer(self.exchange, self)
+        if self.units is not None:
+            self.exchange.unit_stats = None
+
+    def wrap(self, key, handler):
+        stats = self.types.get(key)
+        if stats is None:
+            stats = self.types[key] = TypeStats(handler.__name__)
+        every = self.sample_every
+
+        if not every:
+            def counted(*args):
+                stats.count += 1
+                stats.bytes += len(args[-1])
+                return handler(*args)
+            return counted
+
+        def sampled(*args):
+            stats.count += 1
+            stats.bytes += len(args[-1])
+            if stats.count % every:
+                return handler(*args)
+            start = perf_counter_ns()
+            try:
+                return handler(*args)
+            finally:
+                stats.observe(perf_counter_ns() - start)
+        return sampled
+
+    def snapshot(self):
+        exchange = self.exchange
+        info = {
+            'types': dict(
+                (key, stats.snapshot())
+                for key, stats in self.types.items() if stats.count
+            ),
+            'errors': exchange.errors.snapshot(),
+            'unknown': dict(exchange.unknown),
+        }
+        if self.units is not None:
+            info['units'] = self.units.snapshot()
+        return info
+
+
+class LatencyProbe(object):
+    """
+    Wire to callback latency per message type, a bats.hooks client.
+
+        probe = LatencyProbe().attach(exchange)
+
+    Measured from the receive timestamp given to parse() (packet time), or
+    else from the exchange clock of the message (BATS timestamp, ms).
+    """
+
+    def __init__(self, clock=time_ns):
+        self.clock = clock
+        self.types = {}         # message type => TypeStats
+        self.exchange = None
+
+    def attach(self, exchange):
+        self.exchange = exchange
+        exchange.add_hook('after_message', self.on_message)
+        return self
+
+    def detach(self):
+        self.exchange.remove_hook('after_message', self.on_message)
+        self.exchange = None
+
+    def on_message(self, exchange, key, body, ctx):
+        origin = ctx.receive_timestamp or getattr(ctx, 'timestamp', None)
+        if origin is None:
+            return
+        stats = self.types.get(key)
+        if stats is None:
+            stats = self.types[key] = TypeStats(str(key))
+        stats.count += 1
+        stats.bytes += len(body)
+        stats.observe(max(0, int(self.clock() - origin)))
+
+    def snapshot(self):
+        return dict(
+            (key, stats.snapshot()) for key, stats in self.types.items()
+        )
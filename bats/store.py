@@ -0,0 +1,185 @@
+"""
+@file           store.py
+@description    Normalized fixed-width event format, buffered writer and
+                memory mapped reader
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Both parsers normalize decoded messages into the same Event record, so
+consumers (stores, books, bars...) do not care about the wire protocol.
+
+field           type        description
+ts              int64       Exchange time, ns since the epoch
+order_id        uint64      Order ID (Base 36 decoded in BATS)
+exec_id         uint64      Execution ID, Trade ID for trade reports
+shares          int64       Shares added/executed/cancelled/traded,
+                            buy shares of an auction update
+price           int64       Price in ticks of 1 / PRICE_SCALE,
+                            indicative price of an auction update
+aux_shares      int64       Remaining shares (executed price/size),
+                            sell shares of an auction update, unit of a
+                            BATS MC Add Order or Clear (0 in BATS text)
+aux_price       int64       Reference price of an auction update
+symbol          uint32      Symbol id, NO_SYMBOL when not on the wire
+participant     4 bytes     Participant of an expanded Add Order
+flags           12 bytes    Wire flags as ASCII codes: trade flags,
+                            trading status, statistic type, auction type
+etype           uint8       EV_* event type
+side            uint8       SIDE_BUY, SIDE_SELL or 0
+
+File layout: 16 bytes header (magic, record size), then records.
+"""
+
+import mmap
+from collections import namedtuple
+from struct import Struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b"BATSEVT\x01"
+HEADER = Struct("<8sI4x")
+
+EV_CLEAR = 1
+EV_ADD = 2
+EV_EXECUTE = 3
+EV_REDUCE = 4
+EV_MODIFY = 5
+EV_DELETE = 6
+EV_TRADE = 7
+EV_TRADE_BREAK = 8
+EV_TRADE_REPORT = 9
+EV_STATUS = 10
+EV_STATISTIC = 11
+EV_AUCTION_UPDATE = 12
+EV_AUCTION_SUMMARY = 13
+EV_END_SESSION = 14
+
+SIDE_BUY = 1
+SIDE_SELL = 2
+
+# Price ticks: seven implied decimals, as the BATS Long Price
+PRICE_SCALE = 10000000
+
+Event = namedtuple('Event', (
+    'ts', 'order_id', 'exec_id', 'shares', 'price', 'aux_shares',
+    'aux_price', 'symbol', 'participant', 'flags', 'etype', 'side'
+))
+
+RECORD = Struct("<qQQqqqqI4s12sBBxx")
+
+if numpy is not None:
+    DTYPE = numpy.dtype([
+        ('ts', '<i8'), ('order_id', '<u8'), ('exec_id', '<u8'),
+        ('shares', '<i8'), ('price', '<i8'), ('aux_shares', '<i8'),
+        ('aux_price', '<i8'), ('symbol', '<u4'), ('participant', 'S4'),
+        ('flags', 'S12'), ('etype', 'u1'), ('side', 'u1'), ('pad', 'V2')
+    ])
+else:
+    DTYPE = None
+
+
+class EventWriter(object):
+    """
+    Appends events to a store file through a large preallocated buffer.
+    Can be attached to an Exchange as a consumer:
+
+        exchange.add_consumer(EventWriter("20261018.evt"))
+    """
+
+    def __init__(self, path, buffer_size=1 << 20, append=False):
+        self.path = path
+        self.file = open(path, "ab" if append else "wb")
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, RECORD.size))
+
+        self.records = max(1, buffer_size // RECORD.size)
+        self.buffer = bytearray(self.records * RECORD.size)
+        self.count = 0
+        self.written = 0
+
+    def write(self, event):
+        RECORD.pack_into(self.buffer, self.count * RECORD.size, *event)
+        self.count += 1
+        if self.count == self.records:
+            self.flush()
+
+    on_event = write
+
+    def flush(self):
+        if self.count:
+            size = self.count * RECORD.size
+            self.file.write(memoryview(self.buffer)[:size])
+            self.written += self.count
+            self.count = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventBuffer(object):
+    """
+    Packs events into an in-memory bytearray of records, e.g. to hand the
+    output of a worker process over without pickling every event.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.count = 0
+
+    def on_event(self, event):
+        self.buffer += RECORD.pack(*event)
+        self.count += 1
+
+    def clear(self):
+        self.buffer = bytearray()
+        self.count = 0
+
+
+def iter_records(data):
+    for record in RECORD.iter_unpack(data):
+        yield Event._make(record)
+
+
+class EventReader(object):
+    """
+    Memory mapped view of a store file.
+
+        events = EventReader("20261018.evt").array()
+        trades = events[events['etype'] == EV_TRADE]
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or size != RECORD.size:
+            raise ValueError("%s is not an event store" % path)
+
+    def array(self):
+        if numpy is None:
+            raise ImportError("numpy is required for EventReader.array()")
+        return numpy.memmap(self.path, dtype=DTYPE, mode='r',
+                            offset=HEADER.size)
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = HEADER.size + \
+                    (len(data) - HEADER.size) // RECORD.size * RECORD.size
+                for offset in range(HEADER.size, end, RECORD.size):
+                    yield Event._make(RECORD.unpack_from(data, offset))
@@ -0,0 +1,80 @@
+"""
+@file           symbols.py
+@description    Symbol interning into dense integer ids
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+"""
+
+import threading
+
+# Symbol id used for messages which carry no symbol (executions, deletes...)
+NO_SYMBOL = 0xFFFFFFFF
+
+# New symbols are added under a lock, known ones are plain dict lookups
+_lock = threading.Lock()
+
+
+class SymbolTable(object):
+    """
+    Raw symbols (bytes in BATS MC, str in BATS) are interned as they come
+    from the wire, right padding included, so a known symbol costs a single
+    dict lookup. The padding is stripped only the first time a raw form is
+    seen; 6 and 8 characters forms of one symbol share the same id.
+    """
+
+    def __init__(self, names=()):
+        self.ids = {}       # raw symbol => id
+        self.by_name = {}   # stripped name => id
+        self.names = []     # id => stripped name
+        for name in names:
+            self.add(name)
+
+    def intern(self, raw):
+        try:
+            return self.ids[raw]
+        except KeyError:
+            return self._intern_slow(raw)
+
+    def _intern_slow(self, raw):
+        if isinstance(raw, str):
+            name = raw.rstrip()
+        else:
+            raw = bytes(raw)
+            name = raw.decode('ascii', 'replace').rstrip()
+
+        with _lock:
+            sid = self.add(name)
+            self.ids[raw] = sid
+        return sid
+
+    def add(self, name):
+        sid = self.by_name.get(name)
+        if sid is None:
+            sid = len(self.names)
+            self.names.append(name)
+            self.by_name[name] = sid
+        return sid
+
+    def get(self, name, default=None):
+        return self.by_name.get(name, default)
+
+    def name(self, sid):
+        if sid == NO_SYMBOL:
+            return None
+        return self.names[sid]
+
+    def export(self):
+        return list(self.names)
+
+    @classmethod
+    def from_export(cls, names):
+        return cls(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.by_name
@@ -0,0 +1,200 @@
+"""
+@file           synth.py
+@description    Synthetic order flow as normalized events
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Synthesizer generates a consistent order lifecycle over a set of symbols:
+every execute, reduce, modify and delete refers to a live order, executed
+shares never exceed the order size, trade breaks refer to earlier
+executions. Events are bats.store.Event records, which the encoders turn
+into BATS text (bats.encode.TextEncoder) or BATS MC blocks
+(batsmc.encode.BlockEncoder).
+
+    synth = Synthesizer(symbols=500)
+    write_text("synthetic.pitch", synth, 10000000)
+"""
+
+import random
+from collections import deque
+from datetime import date
+from time import mktime
+
+from .encode import TextEncoder
+from .store import Event, PRICE_SCALE, SIDE_BUY, SIDE_SELL, \
+    EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE, EV_TRADE, \
+    EV_TRADE_BREAK, EV_AUCTION_UPDATE
+from .symbols import SymbolTable, NO_SYMBOL
+
+# Event type => weight, skewed to Add/Execute/Delete as on a real feed
+MIX = {
+    EV_ADD: 420,
+    EV_EXECUTE: 120,
+    EV_REDUCE: 50,
+    EV_MODIFY: 80,
+    EV_DELETE: 270,
+    EV_TRADE: 40,
+    EV_TRADE_BREAK: 1,
+    EV_AUCTION_UPDATE: 19,
+}
+
+CENT = PRICE_SCALE // 100
+
+
+class Synthesizer(object):
+    """
+    @param      symbols, number of symbols
+    @param      mix, event type => weight, MIX by default
+    @param      rate, messages per second of feed time outside bursts
+    @param      burst_every, seconds between bursts
+    @param      burst_length, seconds a burst lasts
+    @param      burst_factor, rate multiplier during a burst
+    @param      day, trading date, today by default
+    @param      start, seconds past midnight of the first event
+    """
+
+    def __init__(self, symbols=100, mix=None, seed=1, rate=100000,
+                 burst_every=1.0, burst_length=0.05, burst_factor=10,
+                 day=None, start=8 * 3600):
+        self.random = random.Random(seed)
+        self.symbols = SymbolTable()
+        self.ids = [self.symbols.add("S%05d" % i) for i in range(symbols)]
+        # Reference price per symbol id, in cents, random walk
+        self.prices = [self.random.randrange(1000, 50000)
+                       for i in range(symbols)]
+
+        mix = mix or MIX
+        self.types = list(mix)
+        self.weights = [mix[etype] for etype in self.types]
+        self.rate = rate
+        self.burst_every = int(burst_every * 1e9)
+        self.burst_length = int(burst_length * 1e9)
+        self.burst_factor = burst_factor
+
+        self.day = day or date.today()
+        self.clock = (int(mktime(self.day.timetuple())) + start) * 1000000000
+        self.orders = []        # [order id, symbol id, side, shares, price]
+        self.executions = deque(maxlen=1024)
+        self.next_order = 1
+        self.next_exec = 1
+
+    def tick(self):
+        burst = self.clock % self.burst_every < self.burst_length
+        rate = self.rate * self.burst_factor if burst else self.rate
+        self.clock += int(self.random.expovariate(rate) * 1e9) + 1
+        return self.clock
+
+    def remove(self, index):
+        orders = self.orders
+        orders[index] = orders[-1]
+        orders.pop()
+
+    def execution(self):
+        exec_id = self.next_exec
+        self.next_exec += 1
+        self.executions.append(exec_id)
+        return exec_id
+
+    def quote(self, sid):
+        rnd = self.random
+        price = self.prices[sid] = max(100, self.prices[sid] +
+                                       rnd.randrange(-2, 3))
+        return rnd.randrange(1, 100) * 100, price + rnd.randrange(-20, 21)
+
+    """
+    Generate events
+    @param      count, number of events
+    @return     bats.store.Event generator
+    """
+    def events(self, count):
+        rnd = self.random
+        ids = self.ids
+        orders = self.orders
+        for etype in rnd.choices(self.types, self.weights, k=count):
+            ts = self.tick()
+            if etype in (EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE) and \
+                    not orders:
+                etype = EV_ADD
+            elif etype == EV_TRADE_BREAK and not self.executions:
+                etype = EV_TRADE
+
+            if etype == EV_ADD:
+                sid = rnd.choice(ids)
+                side = SIDE_BUY if rnd.random() < 0.5 else SIDE_SELL
+                shares, price = self.quote(sid)
+                order = self.next_order
+                self.next_order += 1
+                orders.append([order, sid, side, shares, price])
+                yield Event(ts, order, 0, shares, price * CENT, 0, 0, sid,
+                            b'', b'', EV_ADD, side)
+                continue
+
+            if etype == EV_TRADE:
+                sid = rnd.choice(ids)
+                side = SIDE_BUY if rnd.random() < 0.5 else SIDE_SELL
+                shares, price = self.quote(sid)
+                yield Event(ts, 0, self.execution(), shares, price * CENT,
+                            0, 0, sid, b'', b'12P ', EV_TRADE, side)
+                continue
+
+            if etype == EV_TRADE_BREAK:
+                exec_id = self.executions[
+                    rnd.randrange(len(self.executions))]
+                yield Event(ts, 0, exec_id, 0, 0, 0, 0, NO_SYMBOL, b'',
+                            b'', EV_TRADE_BREAK, 0)
+                continue
+
+            if etype == EV_AUCTION_UPDATE:
+                sid = rnd.choice(ids)
+                reference = self.prices[sid] * CENT
+                yield Event(ts, 0, 0, rnd.randrange(1, 1000) * 100,
+                            reference + rnd.randrange(-10, 11) * CENT,
+                            rnd.randrange(1, 1000) * 100, reference, sid,
+                            b'', b'O', EV_AUCTION_UPDATE, 0)
+                continue
+
+            index = rnd.randrange(len(orders))
+            order = orders[index]
+            oid, sid, side, shares, price = order
+            if etype == EV_DELETE:
+                self.remove(index)
+                yield Event(ts, oid, 0, 0, 0, 0, 0, NO_SYMBOL, b'', b'',
+                            EV_DELETE, 0)
+            elif etype == EV_MODIFY:
+                order[3], order[4] = self.quote(sid)
+                yield Event(ts, oid, 0, order[3], order[4] * CENT, 0, 0,
+                            NO_SYMBOL, b'', b'', EV_MODIFY, 0)
+            else:
+                done = rnd.randrange(1, shares + 1) if shares > 1 else shares
+                order[3] -= done
+                if not order[3]:
+                    self.remove(index)
+                if etype == EV_EXECUTE:
+                    yield Event(ts, oid, self.execution(), done, 0, 0, 0,
+                                NO_SYMBOL, b'', b'12 ', EV_EXECUTE, 0)
+                else:
+                    yield Event(ts, oid, 0, done, 0, 0, 0, NO_SYMBOL,
+                                b'', b'', EV_REDUCE, 0)
+
+
+"""
+Write synthetic BATS text
+@param      path, output file
+@param      synth, Synthesizer
+@param      count, number of events
+@return     number of lines written
+"""
+def write_text(path, synth, count, batch=65536):
+    encoder = TextEncoder(synth.symbols, synth.day)
+    lines = 0
+    with open(path, "w") as f:
+        while count > 0:
+            chunk = "".join(encoder.encode(event)
+                            for event in synth.events(min(batch, count)))
+            lines += chunk.count("\n")
+            f.write(chunk)
+            count -= batch
+    return lines
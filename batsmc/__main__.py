@@ -0,0 +1,17 @@
+"""
+@file         __main__.py
+@description  python -m batsmc, BATS MC binary capture decoder
+@author       Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date         18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+"""
+
+import sys
+
+from bats.cli import main
+from .ring import RingExchange
+
+if __name__ == "__main__":
+    sys.exit(main(RingExchange, "python -m batsmc"))
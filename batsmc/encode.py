@@ -0,0 +1,410 @@
+"""
+@file           encode.py
+@description    BATS MC wire format encoders
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+One encoder per message type of Exchange.types (ENCODERS), the sequenced
+unit header, and BlockEncoder, which turns normalized events
+(bats.store.Event) back into sequenced unit blocks.
+
+Encoders take normalized values: prices in ticks of 1 / PRICE_SCALE,
+alphanumeric fields as str or bytes (space padded), sides as b'B'/b'S'.
+"""
+
+from datetime import date
+from struct import Struct, pack
+from time import mktime
+
+from bats.store import PRICE_SCALE, SIDE_BUY, SIDE_SELL, \
+    EV_CLEAR, EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE, \
+    EV_TRADE, EV_TRADE_BREAK, EV_TRADE_REPORT, EV_STATUS, EV_STATISTIC, \
+    EV_AUCTION_UPDATE, EV_AUCTION_SUMMARY, EV_END_SESSION
+from bats.symbols import NO_SYMBOL
+
+# Sequenced unit header: length, count, unit, sequence
+HEADER = Struct("<HBBI")
+
+SHORT_PRICE = PRICE_SCALE // 100
+LONG_PRICE = PRICE_SCALE // 10000
+
+SIDES = {SIDE_BUY: b'B', SIDE_SELL: b'S'}
+
+
+def pack_message(mtype, body):
+    return pack("BB", len(body) + 2, mtype) + body
+
+
+def pack_block(unit, seq, messages):
+    body = b"".join(messages)
+    return HEADER.pack(len(body) + 8, len(messages), unit, seq) + body
+
+
+# Alphanumeric field, left justified and space padded on the right
+def pad(value, size):
+    if isinstance(value, str):
+        value = value.encode('ascii')
+    return value[:size].ljust(size, b' ')
+
+
+class Message(Struct):
+    """Message layout including the length and type bytes"""
+
+    def __init__(self, mtype, body):
+        Struct.__init__(self, "<BB" + body)
+        self.mtype = mtype
+
+    def encode(self, *values):
+        return self.pack(self.size, self.mtype, *values)
+
+
+LOGIN = Message(0x01, "4s4s2s10s")
+LOGIN_RESPONSE = Message(0x02, "c")
+GAP_REQUEST = Message(0x03, "BIH")
+GAP_RESPONSE = Message(0x04, "BIHc")
+SPIN_IMAGE_AVAILABLE = Message(0x80, "I")
+SPIN_REQUEST = Message(0x81, "I")
+SPIN_RESPONSE = Message(0x82, "IIc")
+SPIN_FINISHED = Message(0x83, "I")
+TIME = Message(0x20, "I")
+CLEAR = Message(0x97, "I")
+ADD_ORDER = Message(0x22, "IQcH6sH")
+ADD_ORDER_LONG = Message(0x40, "IQcI8sQ")
+ADD_ORDER_EXP = Message(0x2f, "IQcI8sQc4s")
+ORDER_EXECUTED = Message(0x23, "IQIQ3s")
+ORDER_EXECUTED_PRICE = Message(0x24, "IQIIQQ3s")
+REDUCE_SIZE_LONG = Message(0x25, "IQI")
+REDUCE_SIZE_SHORT = Message(0x26, "IQH")
+MODIFY_ORDER_LONG = Message(0x27, "IQIQ")
+MODIFY_ORDER_SHORT = Message(0x28, "IQHH")
+DELETE_ORDER = Message(0x29, "IQ")
+TRADE_SHORT = Message(0x2b, "IQcH6sHQ4s")
+TRADE_LONG = Message(0x41, "IQcI8sQQ4s")
+TRADE_BREAK = Message(0x2c, "IQ")
+TRADE_REPORT = Message(0x32, "IQ8sQQQ4s3s11s")
+END_SESSION = Message(0x2d, "I")
+TRADING_STATUS = Message(0x31, "I8sc3s")
+STATISTICS = Message(0x34, "I8sQcc")
+AUCTION_UPDATE = Message(0x95, "I8scQIIQ8s")
+AUCTION_SUMMARY = Message(0x96, "I8scQI")
+
+
+def login(session_sub_id, username, password):
+    return LOGIN.encode(pad(session_sub_id, 4), pad(username, 4), b'  ',
+                        pad(password, 10))
+
+
+def login_response(status):
+    return LOGIN_RESPONSE.encode(status)
+
+
+def gap_request(unit, seq, count):
+    return GAP_REQUEST.encode(unit, seq, count)
+
+
+def gap_response(unit, seq, count, status):
+    return GAP_RESPONSE.encode(unit, seq, count, status)
+
+
+def spin_image_available(seq):
+    return SPIN_IMAGE_AVAILABLE.encode(seq)
+
+
+def spin_request(seq):
+    return SPIN_REQUEST.encode(seq)
+
+
+def spin_response(seq, order_count, status):
+    return SPIN_RESPONSE.encode(seq, order_count, status)
+
+
+def spin_finished(seq):
+    return SPIN_FINISHED.encode(seq)
+
+
+def time(seconds):
+    return TIME.encode(seconds)
+
+
+def clear(offset):
+    return CLEAR.encode(offset)
+
+
+def add_order(offset, order, side, shares, symbol, price):
+    return ADD_ORDER.encode(offset, order, side, shares, pad(symbol, 6),
+                            price // SHORT_PRICE)
+
+
+def add_order_long(offset, order, side, shares, symbol, price):
+    return ADD_ORDER_LONG.encode(offset, order, side, shares, pad(symbol, 8),
+                                 price // LONG_PRICE)
+
+
+def add_order_exp(offset, order, side, shares, symbol, price, flags,
+                  participant):
+    return ADD_ORDER_EXP.encode(offset, order, side, shares, pad(symbol, 8),
+                                price // LONG_PRICE, flags,
+                                pad(participant, 4))
+
+
+def order_executed(offset, order, shares, exec_id, flags):
+    return ORDER_EXECUTED.encode(offset, order, shares, exec_id,
+                                 pad(flags, 3))
+
+
+def order_executed_price(offset, order, shares, remaining, exec_id, price,
+                         flags):
+    return ORDER_EXECUTED_PRICE.encode(offset, order, shares, remaining,
+                                       exec_id, price // LONG_PRICE,
+                                       pad(flags, 3))
+
+
+def reduce_size_long(offset, order, shares):
+    return REDUCE_SIZE_LONG.encode(offset, order, shares)
+
+
+def reduce_size_short(offset, order, shares):
+    return REDUCE_SIZE_SHORT.encode(offset, order, shares)
+
+
+def modify_order_long(offset, order, shares, price):
+    return MODIFY_ORDER_LONG.encode(offset, order, shares,
+                                    price // LONG_PRICE)
+
+
+def modify_order_short(offset, order, shares, price):
+    return MODIFY_ORDER_SHORT.encode(offset, order, shares,
+                                     price // SHORT_PRICE)
+
+
+def delete_order(offset, order):
+    return DELETE_ORDER.encode(offset, order)
+
+
+def trade_short(offset, order, side, shares, symbol, price, exec_id, flags):
+    return TRADE_SHORT.encode(offset, order, side, shares, pad(symbol, 6),
+                              price // SHORT_PRICE, exec_id, pad(flags, 4))
+
+
+def trade_long(offset, order, side, shares, symbol, price, exec_id, flags):
+    return TRADE_LONG.encode(offset, order, side, shares, pad(symbol, 8),
+                             price // LONG_PRICE, exec_id, pad(flags, 4))
+
+
+def trade_break(offset, exec_id):
+    return TRADE_BREAK.encode(offset, exec_id)
+
+
+def trade_report(offset, shares, symbol, price, trade_id, trade_timestamp,
+                 venue, currency, flags):
+    return TRADE_REPORT.encode(offset, shares, pad(symbol, 8),
+                               price // LONG_PRICE, trade_id,
+                               trade_timestamp, pad(venue, 4),
+                               pad(currency, 3), pad(flags, 11))
+
+
+def end_session(offset):
+    return END_SESSION.encode(offset)
+
+
+def trading_status(offset, symbol, status):
+    return TRADING_STATUS.encode(offset, pad(symbol, 8), status, b'   ')
+
+
+def statistics(offset, symbol, price, stat_type, determination):
+    return STATISTICS.encode(offset, pad(symbol, 8), price // LONG_PRICE,
+                             stat_type, determination)
+
+
+def auction_update(offset, symbol, auction_type, reference, buy, sell,
+                   indicative):
+    return AUCTION_UPDATE.encode(offset, pad(symbol, 8), auction_type,
+                                 reference // LONG_PRICE, buy, sell,
+                                 indicative // LONG_PRICE, b' ' * 8)
+
+
+def auction_summary(offset, symbol, auction_type, price, shares):
+    return AUCTION_SUMMARY.encode(offset, pad(symbol, 8), auction_type,
+                                  price // LONG_PRICE, shares)
+
+
+# Message type => encoder, as Exchange.types
+ENCODERS = {
+    0x01: login,
+    0x02: login_response,
+    0x03: gap_request,
+    0x04: gap_response,
+    0x20: time,
+    0x97: clear,
+    0x22: add_order,
+    0x40: add_order_long,
+    0x2f: add_order_exp,
+    0x23: order_executed,
+    0x24: order_executed_price,
+    0x25: reduce_size_long,
+    0x26: reduce_size_short,
+    0x27: modify_order_long,
+    0x28: modify_order_short,
+    0x29: delete_order,
+    0x2b: trade_short,
+    0x41: trade_long,
+    0x2c: trade_break,
+    0x32: trade_report,
+    0x2d: end_session,
+    0x31: trading_status,
+    0x34: statistics,
+    0x95: auction_update,
+    0x96: auction_summary,
+    0x80: spin_image_available,
+    0x81: spin_request,
+    0x82: spin_response,
+    0x83: spin_finished
+}
+
+
+def short_form(shares, symbol, price):
+    return shares < 0x10000 and len(symbol) <= 6 and \
+        not price % SHORT_PRICE and price // SHORT_PRICE < 0x10000
+
+
+class BlockEncoder(object):
+    """
+    Encodes normalized events as sequenced unit blocks, the inverse of
+    Exchange.normalize. A Time message starts every new second; short forms
+    are used whenever the values fit.
+
+        encoder = BlockEncoder(symbols)
+        for event in events:
+            block = encoder.add(event)
+            if block:
+                sock.send(block)
+        sock.send(encoder.flush())
+
+    @param      symbols, bats.SymbolTable the event symbol ids refer to
+    @param      day, trading date, today by default
+    @param      block_size, maximum block length (datagram payload)
+    """
+
+    def __init__(self, symbols, day=None, unit=1, seq=1, block_size=1400):
+        self.symbols = symbols
+        self.midnight = int(mktime((day or date.today()).timetuple()))
+        self.unit = unit
+        self.seq = seq
+        self.block_size = block_size
+
+        self.second = None
+        self.buffer = bytearray(block_size)
+        self.size = HEADER.size
+        self.count = 0
+
+    def messages(self, event):
+        seconds, offset = divmod(event.ts, 1000000000)
+        seconds -= self.midnight
+        messages = []
+        if seconds != self.second:
+            self.second = seconds
+            messages.append(time(seconds))
+
+        etype = event.etype
+        symbol = '' if event.symbol == NO_SYMBOL \
+            else self.symbols.name(event.symbol)
+        side = SIDES.get(event.side, b' ')
+        flags = event.flags.rstrip(b'\x00')
+
+        if etype == EV_ADD:
+            if event.participant.strip(b'\x00'):
+                message = add_order_exp(
+                    offset, event.order_id, side, event.shares, symbol,
+                    event.price, flags[:1] or b' ', event.participant)
+            elif short_form(event.shares, symbol, event.price):
+                message = add_order(offset, event.order_id, side,
+                                    event.shares, symbol, event.price)
+            else:
+                message = add_order_long(offset, event.order_id, side,
+                                         event.shares, symbol, event.price)
+        elif etype == EV_EXECUTE:
+            if event.price:
+                message = order_executed_price(
+                    offset, event.order_id, event.shares, event.aux_shares,
+                    event.exec_id, event.price, flags)
+            else:
+                message = order_executed(offset, event.order_id,
+                                         event.shares, event.exec_id, flags)
+        elif etype == EV_REDUCE:
+            encode = reduce_size_short if event.shares < 0x10000 \
+                else reduce_size_long
+            message = encode(offset, event.order_id, event.shares)
+        elif etype == EV_MODIFY:
+            if short_form(event.shares, '', event.price):
+                message = modify_order_short(offset, event.order_id,
+                                             event.shares, event.price)
+            else:
+                message = modify_order_long(offset, event.order_id,
+                                            event.shares, event.price)
+        elif etype == EV_DELETE:
+            message = delete_order(offset, event.order_id)
+        elif etype == EV_TRADE:
+            encode = trade_short \
+                if short_form(event.shares, symbol, event.price) \
+                else trade_long
+            message = encode(offset, event.order_id, side, event.shares,
+                             symbol, event.price, event.exec_id, flags)
+        elif etype == EV_TRADE_BREAK:
+            message = trade_break(offset, event.exec_id)
+        elif etype == EV_TRADE_REPORT:
+            message = trade_report(offset, event.shares, symbol, event.price,
+                                   event.exec_id, event.ts, b'', b'',
+                                   flags)
+        elif etype == EV_STATUS:
+            message = trading_status(offset, symbol, flags[:1] or b'T')
+        elif etype == EV_STATISTIC:
+            message = statistics(offset, symbol, event.price,
+                                 flags[:1] or b'C', flags[1:2] or b'0')
+        elif etype == EV_AUCTION_UPDATE:
+            message = auction_update(offset, symbol, flags[:1] or b'O',
+                                     event.aux_price, event.shares,
+                                     event.aux_shares, event.price)
+        elif etype == EV_AUCTION_SUMMARY:
+            message = auction_summary(offset, symbol, flags[:1] or b'O',
+                                      event.price, event.shares)
+        elif etype == EV_CLEAR:
+            message = clear(offset)
+        elif etype == EV_END_SESSION:
+            message = end_session(offset)
+        else:
+            raise ValueError("Unknown event type %r" % etype)
+
+        messages.append(message)
+        return messages
+
+    """
+    Add an event to the current block
+    @return     the previous block if it is full, else None
+    """
+    def add(self, event):
+        done = None
+        for message in self.messages(event):
+            size = len(message)
+            if self.count and (self.size + size > self.block_size or
+                               self.count == 255):
+                done = self.flush()
+            self.buffer[self.size:self.size + size] = message
+            self.size += size
+            self.count += 1
+        return done
+
+    # Close the current block, None when empty
+    def flush(self):
+        if not self.count:
+            return None
+        HEADER.pack_into(self.buffer, 0, self.size, self.count, self.unit,
+                         self.seq)
+        block = bytes(self.buffer[:self.size])
+        self.seq += self.count
+        self.size = HEADER.size
+        self.count = 0
+        return block
+
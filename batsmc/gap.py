@@ -0,0 +1,258 @@
+"""
+@file           gap.py
+@description    BATS MC gap request proxy client
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+"""
+
+import asyncio
+import heapq
+import time
+
+from .encode import gap_request
+from .session import Session
+
+# Gap response status codes which will never be served, the gap is skipped
+GAP_FATAL = (b'O', b'D', b'I')
+
+
+class GapClient(Session):
+    """
+    Fills sequence gaps of the live feed from a gap request proxy.
+
+    Live datagrams go through feed(). A block past the expected sequence of
+    its unit is held back and the missing range is queued for request;
+    queued ranges are merged into as few gap requests as possible and sent
+    at no more than `rate` requests per second. Retransmitted blocks are fed
+    back the same way, and held blocks are released in sequence order as
+    soon as the hole before them is filled.
+
+    A request not filled within `request_timeout` seconds is sent again, up
+    to `retries` times, then the hole is skipped (counted in `lost`). When
+    the gap connection closes every hole is skipped and later blocks are
+    parsed as they come.
+
+        gap = GapClient(exchange, "10.0.0.1", 18002,
+                        username=b"USER", password=b"PASS")
+        receiver.parse = gap.feed
+        asyncio.ensure_future(gap.run())
+    """
+
+    def __init__(self, exchange, host, port, rate=10.0, burst=5,
+                 max_count=0xFFFF, merge_distance=16, request_timeout=2.0,
+                 retries=3, **params):
+        super().__init__(exchange, host, port, **params)
+        self.rate = rate
+        self.burst = burst
+        self.max_count = max_count
+        self.merge_distance = merge_distance
+        self.request_timeout = request_timeout
+        self.retries = retries
+        if exchange.gap_responses is None:
+            exchange.gap_responses = []
+
+        self.held = {}          # unit => heap of held blocks
+        self.highest = {}       # unit => highest sequence seen or requested
+        self.missing = {}       # unit => [(first, last), ...] to request
+        self.counter = 0        # keeps heap order stable for equal sequences
+        self.wakeup = asyncio.Event()
+        self.closed = False
+
+        # (unit, seq, count) => [deadline, attempts] of the requests sent
+        self.outstanding = {}
+        self.attempts = {}      # (unit, first) => attempts of a re-queued hole
+
+        self.tokens = float(burst)
+        self.refilled = time.monotonic()
+
+        self.requests = 0
+        self.rejected = 0
+        self.retried = 0
+        self.lost = 0
+
+    def feed(self, data, receive_timestamp=None):
+        parse_header = self.exchange.parse_sequence_header
+        start = 0
+        while True:
+            seq_len, count, unit, seq = parse_header(data, start)
+            if not seq_len:
+                break
+            self.feed_block(data[start:start + seq_len], unit, seq, count,
+                            receive_timestamp)
+            start += seq_len
+
+    def feed_block(self, block, unit, seq, count, receive_timestamp=None):
+        exchange = self.exchange
+        last = exchange.sequences.get(unit)
+
+        if not seq or last is None or seq <= last + 1 or self.closed:
+            exchange.parse(block, receive_timestamp)
+            if seq:
+                self.release(unit)
+            return
+
+        self.counter += 1
+        heapq.heappush(self.held.setdefault(unit, []),
+                       (seq, self.counter, block, receive_timestamp))
+
+        first = max(last, self.highest.get(unit, 0)) + 1
+        if first < seq:
+            self.missing.setdefault(unit, []).append((first, seq - 1))
+            self.wakeup.set()
+        end = seq + count - 1
+        if end > self.highest.get(unit, 0):
+            self.highest[unit] = end
+
+    # Parse held blocks of the unit which are now in sequence
+    def release(self, unit):
+        held = self.held.get(unit)
+        exchange = self.exchange
+        while held and held[0][0] <= exchange.sequences[unit] + 1:
+            seq, _, block, receive_timestamp = heapq.heappop(held)
+            exchange.parse(block, receive_timestamp)
+
+    # Drop a gap which cannot be filled and carry on after it
+    def skip(self, unit, seq, count):
+        sequences = self.exchange.sequences
+        last = sequences.get(unit, 0)
+        if seq + count - 1 > last:
+            self.lost += seq + count - 1 - max(last, seq - 1)
+            sequences[unit] = seq + count - 1
+        self.release(unit)
+
+    # Merge queued ranges into (unit, seq, count) requests
+    def take_requests(self):
+        requests = []
+        for unit, ranges in self.missing.items():
+            last = self.exchange.sequences.get(unit, 0)
+            merged = []
+            for first, end in sorted(ranges):
+                first = max(first, last + 1)
+                if first > end:
+                    continue
+                if merged and first <= merged[-1][1] + 1 + \
+                        self.merge_distance:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([first, end])
+
+            for first, end in merged:
+                while first <= end:
+                    count = min(end - first + 1, self.max_count)
+                    requests.append((unit, first, count))
+                    first += count
+        self.missing = {}
+        return requests
+
+    async def throttle(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.refilled) * self.rate)
+            self.refilled = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_block(self, block):
+        self.feed(block)
+
+        responses = self.exchange.gap_responses
+        while responses:
+            unit, seq, count, status = responses.pop(0)
+            if status == b'A':
+                continue
+            self.outstanding.pop((unit, seq, count), None)
+            self.rejected += 1
+            if status in GAP_FATAL:
+                self.skip(unit, seq, count)
+            else:
+                # Quota or count limits, ask again later
+                self.missing.setdefault(unit, []).append(
+                    (seq, seq + count - 1)
+                )
+                self.wakeup.set()
+
+    # Re-queue the unfilled part of the requests past their deadline, skip
+    # it after `retries` attempts
+    def expire(self, now):
+        sequences = self.exchange.sequences
+        for key, (deadline, attempts) in list(self.outstanding.items()):
+            if deadline > now:
+                continue
+            del self.outstanding[key]
+            unit, seq, count = key
+            first = max(seq, sequences.get(unit, 0) + 1)
+            end = seq + count - 1
+            if first > end:
+                continue
+            if attempts > self.retries:
+                self.skip(unit, first, end - first + 1)
+                continue
+            self.retried += 1
+            self.attempts[(unit, first)] = attempts + 1
+            self.missing.setdefault(unit, []).append((first, end))
+
+    def next_deadline(self):
+        if not self.outstanding:
+            return None
+        return max(0.0, min(deadline for deadline, attempts
+                            in self.outstanding.values()) - time.monotonic())
+
+    async def send_requests(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(),
+                                       self.next_deadline())
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            self.expire(time.monotonic())
+            for unit, seq, count in self.take_requests():
+                await self.throttle()
+                self.send(gap_request(unit, seq, count))
+                self.outstanding[(unit, seq, count)] = [
+                    time.monotonic() + self.request_timeout,
+                    self.attempts.pop((unit, seq), 1)]
+                self.requests += 1
+
+    # The gap server is gone: skip every hole, releasing the held blocks
+    def abandon(self):
+        self.closed = True
+        sequences = self.exchange.sequences
+        for unit, held in self.held.items():
+            while held:
+                last = sequences.get(unit, 0)
+                self.skip(unit, last + 1, held[0][0] - last - 1)
+        self.missing = {}
+        self.outstanding = {}
+        self.attempts = {}
+
+    async def read_blocks(self):
+        while True:
+            self.on_block(await self.read_block())
+
+    async def run(self):
+        await self.connect()
+        sender = asyncio.ensure_future(self.send_requests())
+        try:
+            await self.read_blocks()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            sender.cancel()
+            self.abandon()
+            await self.close()
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'retried': self.retried,
+            'lost': self.lost,
+            'held': sum(len(h) for h in self.held.values()),
+        }
@@ -8,11 +8,22 @@ This file is released under MIT license.
 More detailed information is stored in LICENSE.txt
 """
 
-import traceback
+from functools import wraps
 from datetime import datetime, date
 from time import mktime
-from struct import unpack as unpack, error as unpack_error
+from struct import unpack as unpack, unpack_from, error as unpack_error
 import ctypes
+import threading
+
+from bats.symbols import SymbolTable, NO_SYMBOL
+from bats.errors import ErrorChannel, hexdump
+from bats.stats import Instrumentation
+from bats.hooks import Hooks
+from bats.memory import memory_usage
+from bats.store import Event, PRICE_SCALE, SIDE_BUY, SIDE_SELL, \
+    EV_CLEAR, EV_ADD, EV_EXECUTE, EV_REDUCE, EV_MODIFY, EV_DELETE, \
+    EV_TRADE, EV_TRADE_BREAK, EV_TRADE_REPORT, EV_STATUS, EV_STATISTIC, \
+    EV_AUCTION_UPDATE, EV_AUCTION_SUMMARY, EV_END_SESSION
 
 """
 Issues:
@@ -68,38 +79,91 @@ class Flags(ctypes.Union):
     _anonymous_ = ("b",)
 
 
+# Normalized price ticks per wire unit
+SHORT_PRICE = PRICE_SCALE // 100
+LONG_PRICE = PRICE_SCALE // 10000
+
+SHARES = (
+    ('pitch_shares_s', "H"),
+    ('pitch_shares_l', "I"),
+    ('pitch_shares_ll', "Q"),
+    ('pitch_e_shares_l', "I"),
+    ('pitch_buy_shares_l', "I"),
+)
+
+PRICES = (
+    ('pitch_price_s', "H", SHORT_PRICE),
+    ('pitch_price_l', "Q", LONG_PRICE),
+    ('pitch_indicative_price_l', "Q", LONG_PRICE),
+)
+
+SIDES = {b'B': SIDE_BUY, b'S': SIDE_SELL}
+
+
+class Context(object):
+    """
+    Decode state of one unit: its Time message clock, the block being
+    parsed and the flags of the message being decoded. Handlers get the
+    context as an argument instead of keeping state on the Exchange, so
+    one Exchange can decode several units from several threads, as long
+    as a unit is parsed by one thread at a time. The quote writer and the
+    consumers are called under Exchange.output_lock, so they see one
+    event at a time and need no locking of their own (events of
+    different units interleave in no fixed order).
+    """
+
+    __slots__ = ('unit', 'pitch_time', 'midnight', 'contract', 'flags',
+                 'receive_timestamp', 'block_offset')
+
+    def __init__(self, unit, pitch_time=b'\x00\x00\x00\x00'):
+        self.unit = unit
+        self.pitch_time = pitch_time
+        self.midnight = 0
+        self.contract = 0
+        self.flags = None
+        self.receive_timestamp = None
+        self.block_offset = 0
+
+
 class Exchange():
 
     @staticmethod
     def to_bstr(data):
-        return " ".join(["%02x" % b for b in data])
+        return hexdump(data, len(data))
 
     def flag(func):
-        def wrapper(self, _flag, *args, **kwargs):
+        def wrapper(self, ctx, _flag, *args, **kwargs):
             try:
-                return func(self, chr(_flag), *args, **kwargs)
+                return func(self, ctx, chr(_flag), *args, **kwargs)
             except Exception as ex:
-                print("Error! In ", func.__name__, str(ex))
+                self.errors.report(func.__name__, ex, bytes([_flag]),
+                                   ctx.block_offset)
         return wrapper
 
-    def process_msg_header(msg_len):
+    def process_msg_header(msg_len, etype=None):
         def wrap(func):
-            def wrapper(self, data, *args, **kwargs):
+            @wraps(func)
+            def wrapper(self, ctx, data, *args, **kwargs):
                 try:
-                    self.flags = Flags()
+                    ctx.flags = Flags()
                     # print("Call %s(%s)" %
                     #      (func.__name__, self.to_bstr(data[0:msg_len]))
                     #     )
                     msg_data = MsgBody(data[0:msg_len])
-                    fields = func(self, msg_data, *args, **kwargs)
-                    q_map = self.map_quote(fields)
-                    self.write_quote(*q_map)
-                    del self.flags
+                    fields = func(self, ctx, msg_data, *args, **kwargs)
+                    q_map = self.map_quote(fields, ctx)
+                    event = self.normalize(etype, fields, ctx) \
+                        if etype and self.consumers else None
+                    # One thread at a time in the quote writer and the
+                    # consumers, whatever unit it decodes
+                    with self.output_lock:
+                        self.write_quote(*q_map)
+                        if event is not None:
+                            for consumer in self.consumers:
+                                consumer.on_event(event)
                 except Exception as ex:
-                    print("Error! Message", func.__name__,
-                          self.to_bstr(data[0:msg_len]),
-                          "ignored. (%s)" % str(ex))
-                    traceback.print_exc()
+                    self.errors.report(func.__name__, ex, data[0:msg_len],
+                                       ctx.block_offset)
                 return data[msg_len:]
 
             return wrapper
@@ -107,8 +171,8 @@ class Exchange():
         return wrap
 
     @flag
-    def market_mechanism(self, key):
-        self.flags.market_mechanism = {
+    def market_mechanism(self, ctx, key):
+        ctx.flags.market_mechanism = {
             "1": 1,
             "2": 2,
             "3": 3,
@@ -116,8 +180,8 @@ class Exchange():
         }.get(key, 0)
 
     @flag
-    def trading_mode(self, key):
-        self.flags.trading_mode = {
+    def trading_mode(self, ctx, key):
+        ctx.flags.trading_mode = {
             "1": 1,
             "2": 2,
             "3": 3,
@@ -132,8 +196,8 @@ class Exchange():
         }.get(key, 0)
 
     @flag
-    def transaction_category(self, key):
-        self.flags.transaction_category = {
+    def transaction_category(self, ctx, key):
+        ctx.flags.transaction_category = {
             "P": 1,
             "D": 2,
             "T": 3,
@@ -142,83 +206,83 @@ class Exchange():
         }.get(key, 0)
 
     @flag
-    def negotiated_trade(self, key):
-        self.flags.negotiated_trade = {
+    def negotiated_trade(self, ctx, key):
+        ctx.flags.negotiated_trade = {
             "N": 1,
         }.get(key, 0)
 
     @flag
-    def crossing_trade(self, key):
-        self.flags.crossing_trade = {
+    def crossing_trade(self, ctx, key):
+        ctx.flags.crossing_trade = {
             "X": 1,
         }.get(key, 0)
 
     @flag
-    def modification_indicator(self, key):
-        self.flags.modification_indicator = {
+    def modification_indicator(self, ctx, key):
+        ctx.flags.modification_indicator = {
             "A": 1,
             "C": 2,
         }.get(key, 0)
 
     @flag
-    def benchmark_indicator(self, key):
-        self.flags.benchmark_indicator = {
+    def benchmark_indicator(self, ctx, key):
+        ctx.flags.benchmark_indicator = {
             "B": 1,
         }.get(key, 0)
 
     @flag
-    def ex_cum_dividend(self, key):
-        self.flags.ex_cum_dividend = {
+    def ex_cum_dividend(self, ctx, key):
+        ctx.flags.ex_cum_dividend = {
             "E": 1,
         }.get(key, 0)
 
     @flag
-    def offbook_automated_indicator(self, key):
-        self.flags.offbook_automated_indicator = {
+    def offbook_automated_indicator(self, ctx, key):
+        ctx.flags.offbook_automated_indicator = {
             "Q": 1,
             "M": 2,
         }.get(key, 0)
 
     @flag
-    def publication_indicator(self, key):
-        self.flags.publication_indicator = {
+    def publication_indicator(self, ctx, key):
+        ctx.flags.publication_indicator = {
             "1": 1,
         }.get(key, 0)
 
     @flag
-    def trade_timing_indicator(self, key):
-        self.flags.trade_timing_indicator = {
+    def trade_timing_indicator(self, ctx, key):
+        ctx.flags.trade_timing_indicator = {
             "1": 1,
             "2": 2,
         }.get(key, 0)
 
-    def parse_order_execution_flag(self, data):
-        self.market_mechanism(data[0])
-        self.trading_mode(data[1])
-        self.ex_cum_dividend(data[2])
-
-    def parse_trade_flags(self, data):
-        self.market_mechanism(data[0])
-        self.trading_mode(data[1])
-        self.transaction_category(data[2])
-        self.ex_cum_dividend(data[3])
-
-    def parse_trade_report_flags(self, data):
-        self.trade_timing_indicator(data[0])
-        self.market_mechanism(data[1])
-        self.trading_mode(data[2])
-        self.transaction_category(data[3])
-        self.negotiated_trade(data[4])
-        self.crossing_trade(data[5])
-        self.modification_indicator(data[6])
-        self.benchmark_indicator(data[7])
-        self.ex_cum_dividend(data[8])
-        self.publication_indicator(data[9])
-        self.offbook_automated_indicator(data[10])
+    def parse_order_execution_flag(self, ctx, data):
+        self.market_mechanism(ctx, data[0])
+        self.trading_mode(ctx, data[1])
+        self.ex_cum_dividend(ctx, data[2])
+
+    def parse_trade_flags(self, ctx, data):
+        self.market_mechanism(ctx, data[0])
+        self.trading_mode(ctx, data[1])
+        self.transaction_category(ctx, data[2])
+        self.ex_cum_dividend(ctx, data[3])
+
+    def parse_trade_report_flags(self, ctx, data):
+        self.trade_timing_indicator(ctx, data[0])
+        self.market_mechanism(ctx, data[1])
+        self.trading_mode(ctx, data[2])
+        self.transaction_category(ctx, data[3])
+        self.negotiated_trade(ctx, data[4])
+        self.crossing_trade(ctx, data[5])
+        self.modification_indicator(ctx, data[6])
+        self.benchmark_indicator(ctx, data[7])
+        self.ex_cum_dividend(ctx, data[8])
+        self.publication_indicator(ctx, data[9])
+        self.offbook_automated_indicator(ctx, data[10])
 
     # Login message
     @process_msg_header(20)
-    def msg_login(self, data):
+    def msg_login(self, ctx, data):
         names = (
             ('login_session_sub_id', 4),
             ('login_username', 4),
@@ -229,19 +293,19 @@ class Exchange():
 
     # Login response message
     @process_msg_header(1)
-    def msg_login_response(self, data):
+    def msg_login_response(self, ctx, data):
         names = (
             ('flags', 1),
         )
         fields = data.get_fields(names)
-        self.flags.login_status = {
-            'A': 1, 'N': 2, 'B': 3, 'S': 4
+        ctx.flags.login_status = self.login_status = {
+            b'A': 1, b'N': 2, b'B': 3, b'S': 4
         }.get(fields['flags'], 0)
         return {}
 
     # Gap request message
     @process_msg_header(7)
-    def msg_gap_request(self, data):
+    def msg_gap_request(self, ctx, data):
         names = (
             ('gap_unit', 1),
             ('gap_sequense', 4),
@@ -251,7 +315,7 @@ class Exchange():
 
     # Gap response message
     @process_msg_header(8)
-    def msg_gap_response(self, data):
+    def msg_gap_response(self, ctx, data):
         names = (
             ('gap_unit', 1),
             ('gap_sequence', 4),
@@ -260,33 +324,84 @@ class Exchange():
         )
         fields = data.get_fields(names)
 
-        self.flags.gap_status = {
-            'A': 1, 'O': 2, 'D': 3, 'M': 4, 'S': 5, 'C': 6, 'I': 7
+        ctx.flags.gap_status = {
+            b'A': 1, b'O': 2, b'D': 3, b'M': 4, b'S': 5, b'C': 6, b'I': 7
         }.get(fields['flags'], 0)
 
+        if self.gap_responses is not None:
+            self.gap_responses.append((
+                unpack("B", fields['gap_unit'])[0],
+                unpack("I", fields['gap_sequence'])[0],
+                unpack("H", fields['gap_count'])[0],
+                fields['flags']
+            ))
+        return fields
+
+    # Spin Image Available message
+    @process_msg_header(4)
+    def msg_spin_image_available(self, ctx, data):
+        names = (
+            ('spin_sequence', 4),
+        )
+        fields = data.get_fields(names)
+        self.spin_image = unpack("I", fields['spin_sequence'])[0]
+        return fields
+
+    # Spin Request message
+    @process_msg_header(4)
+    def msg_spin_request(self, ctx, data):
+        names = (
+            ('spin_sequence', 4),
+        )
+        return data.get_fields(names)
+
+    # Spin Response message
+    @process_msg_header(9)
+    def msg_spin_response(self, ctx, data):
+        names = (
+            ('spin_sequence', 4),
+            ('spin_order_count', 4),
+            ('spin_status', 1),
+        )
+        fields = data.get_fields(names)
+        self.spin_response = (
+            unpack("I", fields['spin_sequence'])[0],
+            unpack("I", fields['spin_order_count'])[0],
+            fields['spin_status']
+        )
+        return fields
+
+    # Spin Finished message
+    @process_msg_header(4)
+    def msg_spin_finished(self, ctx, data):
+        names = (
+            ('spin_sequence', 4),
+        )
+        fields = data.get_fields(names)
+        self.spin_finished = unpack("I", fields['spin_sequence'])[0]
         return fields
 
     # Time message
     @process_msg_header(4)
-    def msg_time(self, data):
+    def msg_time(self, ctx, data):
         names = (
             ('pitch_time', 4),
         )
         fields = data.get_fields(names)
-        self.pitch_time = fields['pitch_time']
+        ctx.pitch_time = fields['pitch_time']
         return fields
 
     # Unit Clear Message
-    @process_msg_header(4)
-    def msg_clear(self, data):
+    @process_msg_header(4, EV_CLEAR)
+    def msg_clear(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
         )
         return data.get_fields(names)
 
     # Add Order Message
-    @process_msg_header(23)
-    def msg_add_order(self, data):
+    @process_msg_header(23, EV_ADD)
+    def msg_add_order(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -298,8 +413,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Add Order Message — Long Form
-    @process_msg_header(33)
-    def msg_add_order_long(self, data):
+    @process_msg_header(33, EV_ADD)
+    def msg_add_order_long(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -311,13 +426,13 @@ class Exchange():
         return data.get_fields(names)
 
     # Add Order Message — Expanded Form
-    @process_msg_header(38)
-    def msg_add_order_exp(self, data):
+    @process_msg_header(38, EV_ADD)
+    def msg_add_order_exp(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
             ('pitch_side', 1),
-            ('pitch_share_ls', 4),
+            ('pitch_shares_l', 4),
             ('pitch_symbol', 8),
             ('pitch_price_l', 8),
             ('pitch_add_order_flags', 1),
@@ -327,8 +442,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Executed Order Message
-    @process_msg_header(27)
-    def msg_order_executed(self, data):
+    @process_msg_header(27, EV_EXECUTE)
+    def msg_order_executed(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -338,13 +453,13 @@ class Exchange():
         )
         fields = data.get_fields(names)
 
-        self.parse_order_execution_flag(fields['flags'])
+        self.parse_order_execution_flag(ctx, fields['flags'])
 
         return fields
 
     # Executed Order Price/Size Message
-    @process_msg_header(39)
-    def msg_order_executed_price(self, data):
+    @process_msg_header(39, EV_EXECUTE)
+    def msg_order_executed_price(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -356,13 +471,13 @@ class Exchange():
         )
         fields = data.get_fields(names)
 
-        self.parse_order_execution_flag(fields['flags'])
+        self.parse_order_execution_flag(ctx, fields['flags'])
 
         return fields
 
     # Reduce Order Message
-    @process_msg_header(14)
-    def msg_reduce_size_short(self, data):
+    @process_msg_header(14, EV_REDUCE)
+    def msg_reduce_size_short(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -371,8 +486,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Reduce Order Message — Long Form
-    @process_msg_header(16)
-    def msg_reduce_size_long(self, data):
+    @process_msg_header(16, EV_REDUCE)
+    def msg_reduce_size_long(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -381,8 +496,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Modify Order Message — Short Form
-    @process_msg_header(16)
-    def msg_modify_order_short(self, data):
+    @process_msg_header(16, EV_MODIFY)
+    def msg_modify_order_short(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -392,8 +507,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Modify Order Message — Long Form
-    @process_msg_header(24)
-    def msg_modify_order_long(self, data):
+    @process_msg_header(24, EV_MODIFY)
+    def msg_modify_order_long(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -403,8 +518,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Delete Order Message
-    @process_msg_header(12)
-    def msg_delete_order(self, data):
+    @process_msg_header(12, EV_DELETE)
+    def msg_delete_order(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -412,8 +527,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Trade Message
-    @process_msg_header(35)
-    def msg_trade_short(self, data):
+    @process_msg_header(35, EV_TRADE)
+    def msg_trade_short(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -426,13 +541,13 @@ class Exchange():
         )
         fields = data.get_fields(names)
 
-        self.parse_trade_flags(fields['flags'])
+        self.parse_trade_flags(ctx, fields['flags'])
 
         return fields
 
     # Trade Message - Long form
-    @process_msg_header(45)
-    def msg_trade_long(self, data):
+    @process_msg_header(45, EV_TRADE)
+    def msg_trade_long(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_order', 8),
@@ -445,13 +560,13 @@ class Exchange():
         )
         fields = data.get_fields(names)
 
-        self.parse_trade_flags(fields['flags'])
+        self.parse_trade_flags(ctx, fields['flags'])
 
         return fields
 
     # Trade Break Message
-    @process_msg_header(12)
-    def msg_trade_break(self, data):
+    @process_msg_header(12, EV_TRADE_BREAK)
+    def msg_trade_break(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_execution_id', 8),
@@ -459,8 +574,8 @@ class Exchange():
         return data.get_fields(names)
 
     # Trade Report Message
-    @process_msg_header(62)
-    def msg_trade_report(self, data):
+    @process_msg_header(62, EV_TRADE_REPORT)
+    def msg_trade_report(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_shares_ll', 8),
@@ -485,21 +600,21 @@ class Exchange():
         del fields['time']
         """
 
-        self.parse_trade_report_flags(fields['flags'])
+        self.parse_trade_report_flags(ctx, fields['flags'])
 
         return fields
 
     # End Session Message
-    @process_msg_header(4)
-    def msg_end_session(self, data):
+    @process_msg_header(4, EV_END_SESSION)
+    def msg_end_session(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
         )
         return data.get_fields(names)
 
     # Trading Status Message
-    @process_msg_header(21)
-    def msg_trading_status(self, data):
+    @process_msg_header(21, EV_STATUS)
+    def msg_trading_status(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_symbol', 8),
@@ -507,15 +622,15 @@ class Exchange():
             ('pitch_reserved', 3)
         )
         fields = data.get_fields(names)
-        self.flags.trading_status = {
-            'T': 1, 'R': 2, 'C': 3, 'S': 4, 'N': 5, 'V': 6, 'O': 7,
-            'E': 8, 'H': 9, 'M': 10, 'P': 11
+        ctx.flags.trading_status = {
+            b'T': 1, b'R': 2, b'C': 3, b'S': 4, b'N': 5, b'V': 6, b'O': 7,
+            b'E': 8, b'H': 9, b'M': 10, b'P': 11
         }.get(fields['flags'], 0)
         return fields
 
     # Statistics Message
-    @process_msg_header(22)
-    def msg_statistics(self, data):
+    @process_msg_header(22, EV_STATISTIC)
+    def msg_statistics(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_symbol', 8),
@@ -525,18 +640,18 @@ class Exchange():
         )
         fields = data.get_fields(names)
 
-        self.flags.statistic_type = {
-            'C': 1, 'H': 2, 'L': 3, 'O': 4, 'P': 5
+        ctx.flags.statistic_type = {
+            b'C': 1, b'H': 2, b'L': 3, b'O': 4, b'P': 5
         }.get(fields['flags'], 0)
 
-        self.flags.pitch_price_determination = {
-            '0': 1, '1': 2
+        ctx.flags.pitch_price_determination = {
+            b'0': 1, b'1': 2
         }.get(fields['price_determination'], 0)
         return fields
 
     # Auction Update Message
-    @process_msg_header(45)
-    def msg_auction_update(self, data):
+    @process_msg_header(45, EV_AUCTION_UPDATE)
+    def msg_auction_update(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_symbol', 8),
@@ -548,14 +663,14 @@ class Exchange():
             ('pitch_reserved', 8),
         )
         fields = data.get_fields(names)
-        self.flags.auction_type = {
-            'O': 1, 'C': 2, 'H': 3, 'V': 4
-        }.get(fields['flags'], 0)
+        ctx.flags.auction_type = {
+            b'O': 1, b'C': 2, b'H': 3, b'V': 4
+        }.get(fields['auction_type'], 0)
         return fields
 
     # Auction Summary Message
-    @process_msg_header(47)
-    def msg_auction_summary(self, data):
+    @process_msg_header(47, EV_AUCTION_SUMMARY)
+    def msg_auction_summary(self, ctx, data):
         names = (
             ('pitch_time_offset', 4),
             ('pitch_symbol', 8),
@@ -564,9 +679,9 @@ class Exchange():
             ('pitch_shares_l', 4)
         )
         fields = data.get_fields(names)
-        self.flags.auction_type = {
-            'O': 1, 'C': 2, 'H': 3, 'V': 4
-        }.get(fields['flags'], 0)
+        ctx.flags.auction_type = {
+            b'O': 1, b'C': 2, b'H': 3, b'V': 4
+        }.get(fields['auction_type'], 0)
         return fields
 
     def __init__(self, name, **params):
@@ -595,11 +710,57 @@ class Exchange():
             0x31: self.msg_trading_status,
             0x34: self.msg_statistics,
             0x95: self.msg_auction_update,
-            0x96: self.msg_auction_summary
-            # TODO: Add spin message parsing
+            0x96: self.msg_auction_summary,
+            0x80: self.msg_spin_image_available,
+            0x81: self.msg_spin_request,
+            0x82: self.msg_spin_response,
+            0x83: self.msg_spin_finished
         }
 
         self.date = date.today()
+        self.symbols = SymbolTable()
+
+        # Last sequence processed per unit, messages at or below it are
+        # duplicates (A/B feeds, spin or gap replays overlapping live data)
+        self.sequences = {}
+
+        # Bytes of input parsed so far, a restored session resumes from here
+        self.position = 0
+
+        # Receivers of normalized events (bats.store.Event)
+        self.consumers = []
+
+        # Incomplete last block of the data fed so far
+        self.pending = b''
+
+        # Seconds since midnight of units without a Time message yet
+        self.pitch_time = b'\x00\x00\x00\x00'
+
+        # Decode state per unit, see Context
+        self.contexts = {}
+        self.lock = threading.Lock()
+        # Serializes write_quote and consumer dispatch, see parse_block
+        self.output_lock = threading.Lock()
+
+        # Session state reported by the login, spin and gap servers
+        self.login_status = None
+        self.spin_image = None
+        self.spin_response = None
+        self.spin_finished = None
+        # Gap responses, collected only once a GapClient drains them
+        self.gap_responses = None
+
+        # Decode errors per handler and skipped unknown message types,
+        # counted on those paths only; see enable_stats() for the rest
+        self.errors = ErrorChannel()
+        self.unknown = {}
+        self.instrumentation = None
+
+        # Handler wrappers (stats, hooks) over the original self.types
+        self.layers = []
+        self.base_types = None
+        self.hooks = None
+        self.unit_stats = None
 
     """
     Name            Offset  Length      Description
@@ -614,9 +775,9 @@ class Exchange():
     Hdr Sequence    4       4 Binary    Sequence of first message to
                                         follow this header.
     """
-    def parse_sequence_header(self, data):
+    def parse_sequence_header(self, data, offset=0):
         try:
-            return unpack("HBBI", data)
+            return unpack_from("HBBI", data, offset)
         except unpack_error:
             # End of stream
             return 0, 0, 0, 0
@@ -624,39 +785,217 @@ class Exchange():
     """
     Parse data entry point
     @param      bytes_data, RAW data to parse
+    @param      receive_timestamp, time the data was received (ns), optional
     """
-    def parse(self, bytes_data):
+    def parse(self, bytes_data, receive_timestamp=None):
 
-        self.fields = []
-        self.midnight = mktime(datetime.today().timetuple())
+        midnight = mktime(self.date.timetuple())
 
         data = bytes_data
         if not data:
             return
 
+        # Concurrent calls get their own stream offsets
+        with self.lock:
+            position = self.position
+            self.position += len(data)
+
+        # Blocks are walked by offset, the buffer is never re-sliced
+        start = 0
         while True:
             seq_len, msg_count, unit, seq = \
-                self.parse_sequence_header(data[0:8])
+                self.parse_sequence_header(data, start)
 
             if not seq_len:
                 break
 
             # print("Start sequence:", seq)
-            offset = 8
+            ctx = self.context(unit)
+            ctx.midnight = midnight
+            ctx.receive_timestamp = receive_timestamp
+            ctx.block_offset = position + start
+            self.parse_block(unit, seq, msg_count, data, start + 8, ctx)
+            start += seq_len
+
+    # Decode state of a unit, created on its first block
+    def context(self, unit):
+        ctx = self.contexts.get(unit)
+        if ctx is None:
+            with self.lock:
+                ctx = self.contexts.get(unit)
+                if ctx is None:
+                    ctx = self.contexts[unit] = Context(unit, self.pitch_time)
+        return ctx
+
+    """
+    Parse the messages of one sequenced unit block
+    @param      unit, seq, msg_count, block header fields
+    @param      data, buffer holding the block
+    @param      offset, offset of the first message in data
+    @param      ctx, Context of the unit, context(unit) by default
+    """
+    def parse_block(self, unit, seq, msg_count, data, offset, ctx=None):
+        if ctx is None:
+            ctx = self.context(unit)
+
+        # Unsequenced blocks (seq == 0) carry session messages
+        skip = 0
+        if seq:
+            last = self.sequences.get(unit, 0)
+            if last >= seq:
+                skip = last - seq + 1
+            if seq + msg_count - 1 > last:
+                self.sequences[unit] = seq + msg_count - 1
+        if self.unit_stats is not None:
+            self.unit_stats.block(unit, seq, msg_count, min(skip, msg_count))
+
+        ctx.contract = seq
+        types = self.types
+        try:
             for i in range(0, msg_count):
-                self.contract = seq
-                mlen, mtype = unpack("BB", data[offset:offset+2])
+                mlen, mtype = unpack_from("BB", data, offset)
+                if mlen < 2:
+                    raise ValueError("message length %d" % mlen)
 
                 # process message body
-                if mtype in self.types:
-                    self.types[mtype](data[offset+2:offset+mlen])
+                if i >= skip:
+                    if mtype in types:
+                        types[mtype](ctx, data[offset+2:offset+mlen])
+                    else:
+                        with self.lock:
+                            self.unknown[mtype] = \
+                                self.unknown.get(mtype, 0) + 1
                 offset += mlen
-            data = data[seq_len:]
+        except (ValueError, unpack_error) as ex:
+            # Corrupt or truncated block, the rest of it is dropped
+            self.errors.report('parse_block', ex, data[offset:offset + 64],
+                               ctx.block_offset)
 
-            # closing quotes, also flush rows...
-            self.close_quotes()
+        # closing quotes, also flush rows...
+        self.close_quotes()
+
+    """
+    Incremental parse entry point, data may be cut anywhere
+    @param      bytes_data, RAW data to parse
+    @param      receive_timestamp, time the data was received (ns), optional
+    """
+    def feed(self, bytes_data, receive_timestamp=None):
+        data = self.pending + bytes_data if self.pending else bytes_data
+        size = len(data)
+        end = 0
+        while end + 2 <= size:
+            seq_len = unpack_from("H", data, end)[0]
+            if not seq_len or end + seq_len > size:
+                break
+            end += seq_len
+        self.pending = data[end:]
+        if end:
+            self.parse(data[:end] if end < size else data, receive_timestamp)
+
+    # End of the fed stream, a remaining partial block is truncated data
+    def feed_end(self):
+        truncated = len(self.pending)
+        self.pending = b''
+        return truncated
+
+    """
+    Count messages and bytes per type, and per unit blocks and sequences
+    @param      sample_every, time one message of N per type, 0 disables
+                latency histograms
+    """
+    def enable_stats(self, sample_every=0):
+        self.disable_stats()
+        self.instrumentation = Instrumentation(self, sample_every).install()
+        return self.instrumentation
+
+    def disable_stats(self):
+        if self.instrumentation is not None:
+            self.instrumentation.uninstall()
+            self.instrumentation = None
+
+    def stats(self):
+        if self.instrumentation is not None:
+            return self.instrumentation.snapshot()
+        return {'errors': self.errors.snapshot(),
+                'unknown': dict(self.unknown)}
 
-    def map_quote(self, fields):
+    """
+    Register a tracing callback, see bats.hooks for events and arguments
+    """
+    def add_hook(self, event, callback):
+        if self.hooks is None:
+            self.hooks = Hooks(self)
+        return self.hooks.add(event, callback)
+
+    def remove_hook(self, event, callback):
+        self.hooks.remove(event, callback)
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+        return consumer
+
+    def remove_consumer(self, consumer):
+        self.consumers.remove(consumer)
+
+    """
+    Memory held by the parser buffers, symbol table and each consumer,
+    see bats.memory
+    @return     dict component => bytes, 'total' for the sum
+    """
+    def memory_usage(self):
+        return memory_usage(self)
+
+    """
+    Normalize decoded message fields into bats.store.Event
+    @param      etype, EV_* event type
+    @param      fields, fields returned by the message handler
+    @param      ctx, Context of the unit
+    """
+    def normalize(self, etype, fields, ctx):
+        get = fields.get
+
+        offset = get('pitch_time_offset')
+        ts = (int(ctx.midnight) + unpack("I", ctx.pitch_time)[0]) * \
+            1000000000 + (unpack("I", offset)[0] if offset else 0)
+
+        symbol = get('pitch_symbol')
+        symbol = NO_SYMBOL if symbol is None else self.symbols.intern(symbol)
+
+        order = get('pitch_order')
+        order = unpack("Q", order)[0] if order else 0
+        exec_id = get('pitch_execution_id') or get('pitch_trade')
+        exec_id = unpack("Q", exec_id)[0] if exec_id else 0
+
+        shares = aux_shares = price = aux_price = 0
+        for name, fmt in SHARES:
+            if name in fields:
+                shares = unpack(fmt, fields[name])[0]
+                break
+        for name, fmt, scale in PRICES:
+            if name in fields:
+                price = unpack(fmt, fields[name])[0] * scale
+                break
+        if 'pitch_r_shares_l' in fields:
+            aux_shares = unpack("I", fields['pitch_r_shares_l'])[0]
+        elif 'pitch_sell_shares_l' in fields:
+            aux_shares = unpack("I", fields['pitch_sell_shares_l'])[0]
+        elif etype == EV_ADD or etype == EV_CLEAR:
+            # Orders of a unit are dropped by the Clear of that unit
+            aux_shares = ctx.unit
+        if 'pitch_reference_price_l' in fields:
+            aux_price = unpack("Q", fields['pitch_reference_price_l'])[0] * \
+                LONG_PRICE
+
+        flags = get('flags') or get('auction_type') or \
+            get('pitch_add_order_flags') or b''
+        if 'price_determination' in fields:
+            flags += fields['price_determination']
+
+        return Event(ts, order, exec_id, shares, price, aux_shares, aux_price,
+                     symbol, get('pitch_participant') or b'', flags, etype,
+                     SIDES.get(get('pitch_side'), 0))
+
+    def map_quote(self, fields, ctx):
 
         """
         BATS                           LOB
@@ -721,8 +1060,8 @@ class Exchange():
             dt = datetime.now()
             if 'pitch_time_offset' in fields:
                 dt = self.date_format(
-                    self.midnight +
-                    unpack("I", self.pitch_time)[0] +
+                    ctx.midnight +
+                    unpack("I", ctx.pitch_time)[0] +
                     unpack("I", fields['pitch_time_offset'])[0]/1000
                 )
             return dt
@@ -749,8 +1088,9 @@ class Exchange():
                   lambda x: float(unpack("H", x)[0] / 100))
 
         map_entry('pitch_side', 'side', lambda x: {b'B': 0, b'S': 1}.get(x))
+        map_entry('pitch_symbol', 'symbol_id', self.symbols.intern)
 
-        contract = self.contract
+        contract = ctx.contract
 
         # f = [k for k, v in fields.items() if k not in self.fields]
         # self.fields += f
@@ -758,7 +1098,7 @@ class Exchange():
         #     ["%s => %s:%s"%(k, type(v), str(v))for k,v in entry.items()])
         # )
 
-        entry['flags'] = self.flags
+        entry['flags'] = ctx.flags
 
         return contract, get_ts(), entry, ""
 
@@ -0,0 +1,191 @@
+"""
+@file           receiver.py
+@description    asyncio UDP multicast receiver for BATS MC feeds
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+
+from .parser import Exchange
+
+
+class QueueExchange(Exchange):
+    """Exchange used by the receiver, output goes to consumers only"""
+
+    def write_quote(self, *quote):
+        pass
+
+    def close_quotes(self):
+        pass
+
+
+class FeedProtocol(asyncio.DatagramProtocol):
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver.datagram_received(data, addr)
+
+    def error_received(self, exc):
+        self.receiver.errors += 1
+
+
+class MulticastReceiver(object):
+    """
+    Joins one or more (group, port) feeds and decodes datagrams as they
+    arrive. All sockets share one event loop and one event queue of
+    (receive timestamp, bats.store.Event), filled from a consumer attached
+    to the Exchange (any bats or batsmc Exchange).
+
+        async with MulticastReceiver([("233.54.12.1", 30001)]) as rx:
+            async for receive_ts, event in rx:
+                ...
+
+    Unicast addresses (e.g. 127.0.0.1) are bound without a group join,
+    which allows testing against a local sender (see batsmc.standin).
+    When `maxsize` events are queued the sockets stop being read until the
+    consumer brings the queue down to half of it; datagrams then wait in
+    the kernel receive buffer (see `rcvbuf`), nothing is dropped here.
+    """
+
+    def __init__(self, groups, exchange=None, interface="0.0.0.0",
+                 maxsize=65536, rcvbuf=None):
+        self.groups = list(groups)
+        self.exchange = exchange or QueueExchange("batsmc")
+        self.exchange.add_consumer(self)
+        # Datagram consumer, e.g. SpinClient.feed while recovering
+        self.parse = self.exchange.parse
+        self.interface = interface
+        self.rcvbuf = rcvbuf
+        self.queue = asyncio.Queue()
+        self.high_water = maxsize
+        self.low_water = maxsize // 2
+        self.paused = False
+        self.receive_timestamp = None
+        self.transports = []
+        self.addresses = []
+        self.closed = False
+
+        self.packets = 0
+        self.bytes = 0
+        self.events = 0
+        self.pauses = 0
+        self.errors = 0
+        self.max_depth = 0
+
+    def open_socket(self, port, groups):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM,
+                             socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if self.rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+
+        multicast = [g for g in groups
+                     if ipaddress.ip_address(g).is_multicast]
+        if multicast:
+            sock.bind(("", port))
+        else:
+            sock.bind((groups[0], port))
+
+        for group in multicast:
+            sock.setsockopt(
+                socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                socket.inet_aton(group) + socket.inet_aton(self.interface)
+            )
+
+        sock.setblocking(False)
+        return sock
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+
+        ports = {}
+        for group, port in self.groups:
+            ports.setdefault(port, []).append(group)
+
+        for port, groups in ports.items():
+            sock = self.open_socket(port, groups)
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: FeedProtocol(self), sock=sock
+            )
+            self.transports.append(transport)
+            self.addresses.append(sock.getsockname())
+        return self
+
+    def datagram_received(self, data, addr):
+        self.packets += 1
+        self.bytes += len(data)
+
+        # Datagrams are parsed one at a time, from the event loop
+        self.receive_timestamp = time.time_ns()
+        self.parse(data, self.receive_timestamp)
+
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if depth >= self.high_water and not self.paused:
+            self.pause()
+
+    def on_event(self, event):
+        self.queue.put_nowait((self.receive_timestamp, event))
+        self.events += 1
+
+    def pause(self):
+        self.paused = True
+        self.pauses += 1
+        for transport in self.transports:
+            transport.pause_reading()
+
+    def resume(self):
+        self.paused = False
+        for transport in self.transports:
+            transport.resume_reading()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for transport in self.transports:
+            transport.close()
+        self.transports = []
+        self.exchange.remove_consumer(self)
+
+        # Wake up the consumer
+        self.queue.put_nowait(None)
+
+    def stats(self):
+        return {
+            'packets': self.packets,
+            'bytes': self.bytes,
+            'events': self.events,
+            'pauses': self.pauses,
+            'errors': self.errors,
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+        }
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        if self.paused and self.queue.qsize() <= self.low_water:
+            self.resume()
+        return event
@@ -0,0 +1,262 @@
+"""
+@file           ring.py
+@description    Shared memory ring buffer between a BATS MC receiver and
+                parser worker processes
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Single producer, multiple consumers. The producer (receiver process) never
+waits: it writes a datagram into the next slot and moves the cursor on.
+Every reader keeps its own position and skips the slots of units it does
+not own; a reader which falls a whole ring behind, or sees its slot
+rewritten while copying it, counts an overrun and jumps forward.
+
+Layout:
+    Header      Magic (8), slots (I), slot size (I), cursor (Q), padding
+    Slot *      Slot sequence (Q), receive timestamp (q), length (I),
+                unit (B), padding, then `slot_size` bytes of data
+
+A slot sequence of 0 marks a slot being written; otherwise it is the
+1-based publish number, which readers check before and after copying.
+"""
+
+import time
+from multiprocessing import Event, Process, shared_memory
+from struct import Struct
+
+from .parser import Exchange
+
+MAGIC = b"BATSRNG\x01"
+HEADER = Struct("<8sIIQ40x")
+CURSOR = Struct("<Q")
+CURSOR_OFFSET = 16
+SLOT = Struct("<QqIB3x")
+SEQUENCE = Struct("<Q")
+
+
+class RingOverflow(ValueError):
+    pass
+
+
+class SharedRing(object):
+    def __init__(self, slots=4096, slot_size=2048, name=None, create=True):
+        if create:
+            self.slots = slots
+            self.slot_size = slot_size
+            self.shm = shared_memory.SharedMemory(
+                name, create=True,
+                size=HEADER.size + slots * (SLOT.size + slot_size)
+            )
+            HEADER.pack_into(self.shm.buf, 0, MAGIC, slots, slot_size, 0)
+        else:
+            self.shm = attach_shared_memory(name)
+            magic, self.slots, self.slot_size, cursor = \
+                HEADER.unpack_from(self.shm.buf, 0)
+            if magic != MAGIC:
+                raise ValueError("%s is not a ring buffer" % name)
+
+        self.owner = create
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.stride = SLOT.size + self.slot_size
+        self.cursor = CURSOR.unpack_from(self.buf, CURSOR_OFFSET)[0]
+
+    @classmethod
+    def attach(cls, name):
+        return cls(name=name, create=False)
+
+    def slot_offset(self, seq):
+        return HEADER.size + (seq - 1) % self.slots * self.stride
+
+    """
+    Publish a datagram, never blocks
+    @param      data, one or more sequenced unit blocks
+    @param      receive_timestamp, time the data was received (ns), optional
+    """
+    def publish(self, data, receive_timestamp=None):
+        size = len(data)
+        if size > self.slot_size:
+            raise RingOverflow("%d bytes do not fit a %d bytes slot" %
+                               (size, self.slot_size))
+
+        buf = self.buf
+        seq = self.cursor + 1
+        offset = self.slot_offset(seq)
+        # Hdr Unit of the first block routes the datagram
+        unit = data[3] if size >= 8 else 0
+
+        SEQUENCE.pack_into(buf, offset, 0)
+        start = offset + SLOT.size
+        buf[start:start + size] = data
+        SLOT.pack_into(buf, offset, seq, receive_timestamp or 0, size, unit)
+
+        self.cursor = seq
+        CURSOR.pack_into(buf, CURSOR_OFFSET, seq)
+        return seq
+
+    # Same signature as Exchange.parse, e.g. MulticastReceiver.parse
+    parse = publish
+
+    def reader(self, units=None, latest=True):
+        return RingReader(self, units, latest)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Before Python 3.13, child processes share the resource tracker of
+        # the creator, which unlinks the segment once
+        return shared_memory.SharedMemory(name)
+
+
+class RingReader(object):
+    def __init__(self, ring, units=None, latest=True):
+        self.ring = ring
+        self.units = None if units is None else frozenset(units)
+        cursor = CURSOR.unpack_from(ring.buf, CURSOR_OFFSET)[0]
+        self.position = cursor if latest else max(0, cursor - ring.slots)
+
+        self.received = 0
+        self.overruns = 0
+        self.lost = 0
+
+    """
+    Datagrams published since the last call
+    @return     list of (receive timestamp, unit, data)
+    """
+    def poll(self, limit=256):
+        ring = self.ring
+        buf = ring.buf
+        slots = ring.slots
+        units = self.units
+
+        cursor = CURSOR.unpack_from(buf, CURSOR_OFFSET)[0]
+        if cursor - self.position > slots:
+            self.overrun(cursor - slots)
+
+        items = []
+        while self.position < cursor and len(items) < limit:
+            seq = self.position + 1
+            offset = ring.slot_offset(seq)
+            slot_seq, ts, size, unit = SLOT.unpack_from(buf, offset)
+            if slot_seq != seq:
+                # Rewritten by the producer, a ring behind
+                cursor = CURSOR.unpack_from(buf, CURSOR_OFFSET)[0]
+                self.overrun(max(seq, cursor - slots))
+                continue
+
+            self.position = seq
+            if units is not None and unit not in units:
+                continue
+
+            start = offset + SLOT.size
+            data = bytes(buf[start:start + size])
+            if SEQUENCE.unpack_from(buf, offset)[0] != seq:
+                self.overrun(seq)
+                continue
+            items.append((ts, unit, data))
+
+        self.received += len(items)
+        return items
+
+    def overrun(self, position):
+        self.overruns += 1
+        self.lost += max(0, position - self.position)
+        self.position = max(self.position, position)
+
+    def __iter__(self):
+        idle = 0
+        while True:
+            items = self.poll()
+            if items:
+                idle = 0
+                for item in items:
+                    yield item
+            else:
+                idle = min(idle + 1, 20)
+                time.sleep(0.00005 * idle)
+
+
+class RingExchange(Exchange):
+    """Default worker Exchange, output goes to consumers only"""
+
+    def write_quote(self, *quote):
+        pass
+
+    def close_quotes(self):
+        pass
+
+
+def run_worker(name, units, factory, stop, setup=None):
+    ring = SharedRing.attach(name)
+    reader = ring.reader(units)
+    exchange = factory("batsmc-ring-%s" % ",".join(map(str, units)))
+    if setup is not None:
+        setup(exchange)
+
+    idle = 0
+    try:
+        while not stop.is_set():
+            items = reader.poll()
+            if not items:
+                idle = min(idle + 1, 20)
+                time.sleep(0.00005 * idle)
+                continue
+            idle = 0
+            for ts, unit, data in items:
+                exchange.parse(data, ts)
+    finally:
+        ring.close()
+
+
+class RingWorkers(object):
+    """
+    One parser process per group of units, fed from a SharedRing.
+
+        ring = SharedRing()
+        workers = RingWorkers(ring, {1: 0, 2: 0, 3: 1, 4: 1}).start()
+        receiver.parse = ring.publish
+        ...
+        workers.stop()
+
+    factory builds the worker Exchange (must be picklable); setup, if given,
+    is called with it to attach consumers.
+    """
+
+    def __init__(self, ring, routing, factory=RingExchange, setup=None):
+        self.ring = ring
+        self.groups = {}
+        for unit, worker in sorted(routing.items()):
+            self.groups.setdefault(worker, []).append(unit)
+        self.factory = factory
+        self.setup = setup
+        self.stopping = Event()
+        self.processes = []
+
+    def start(self):
+        for worker, units in sorted(self.groups.items()):
+            process = Process(
+                target=run_worker, name="batsmc-ring-%s" % worker,
+                args=(self.ring.name, units, self.factory, self.stopping,
+                      self.setup),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stopping.set()
+        for process in self.processes:
+            process.join(timeout)
+        self.processes = []
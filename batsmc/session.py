@@ -0,0 +1,88 @@
+"""
+@file           session.py
+@description    BATS MC TCP session helpers (framing, login) shared by
+                the spin and gap clients
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+"""
+
+import asyncio
+from struct import unpack
+
+from .encode import login, pack_block
+
+
+class SessionError(Exception):
+    pass
+
+
+class Session(object):
+    """
+    TCP session to a BATS MC spin or gap server. Everything the server
+    sends is decoded by the attached Exchange, which records the session
+    state (login_status, spin_image, ...) the clients wait on.
+    """
+
+    def __init__(self, exchange, host, port, session_sub_id=b'0001',
+                 username=b'', password=b'', timeout=10.0):
+        self.exchange = exchange
+        self.host = host
+        self.port = port
+        self.session_sub_id = session_sub_id
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+
+        exchange = self.exchange
+        exchange.login_status = None
+        self.send(login(
+            self.session_sub_id, self.username, self.password
+        ))
+        await self.wait_for(lambda: exchange.login_status is not None)
+        if exchange.login_status != 1:
+            raise SessionError("Login rejected (%s)" % exchange.login_status)
+
+    def send(self, *messages):
+        self.writer.write(pack_block(0, 0, list(messages)))
+
+    async def read_block(self):
+        header = await self.reader.readexactly(2)
+        length = unpack("H", header)[0]
+        return header + await self.reader.readexactly(length - 2)
+
+    def on_block(self, block):
+        self.exchange.parse(block)
+
+    """
+    Read blocks until the predicate is true. `timeout` limits the wait for
+    each block, not the whole wait: a long snapshot goes on while it flows
+    @param      predicate, called after every block
+    """
+    async def wait_for(self, predicate):
+        try:
+            while not predicate():
+                self.on_block(await asyncio.wait_for(self.read_block(),
+                                                     self.timeout))
+        except asyncio.IncompleteReadError:
+            raise SessionError("Connection closed by server")
+        except asyncio.TimeoutError:
+            raise SessionError("Timed out waiting for the server")
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.writer = None
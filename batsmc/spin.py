@@ -0,0 +1,122 @@
+"""
+@file           spin.py
+@description    BATS MC spin server snapshot recovery client
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+"""
+
+from struct import unpack
+
+from bats.store import Event, EV_CLEAR
+from bats.symbols import NO_SYMBOL
+from .encode import spin_request
+from .session import Session, SessionError
+
+
+class SpinClient(Session):
+    """
+    Recovers the order book of one unit from a spin server after a gap or
+    a late start.
+
+    Live datagrams go through feed(). While a spin is in progress they are
+    buffered; once the snapshot is complete they are replayed and the
+    Exchange drops every message already covered by the snapshot. The
+    consumers get a Clear of the unit before the snapshot orders, so a book
+    already built from live data is replaced, not added to.
+
+        spin = SpinClient(exchange, "10.0.0.1", 18001, unit=1,
+                          username=b"USER", password=b"PASS")
+        receiver.parse = spin.feed
+        await spin.recover()
+    """
+
+    def __init__(self, exchange, host, port, unit, **params):
+        super().__init__(exchange, host, port, **params)
+        self.unit = unit
+        self.recovering = False
+        self.pending = []
+
+    def feed(self, data, receive_timestamp=None):
+        if self.recovering:
+            self.pending.append((data, receive_timestamp))
+        else:
+            self.exchange.parse(data, receive_timestamp)
+
+    # Lowest sequence of the unit among the buffered live datagrams
+    def first_pending_sequence(self):
+        first = None
+        for data, ts in self.pending:
+            start = 0
+            while True:
+                seq_len, count, unit, seq = \
+                    self.exchange.parse_sequence_header(data, start)
+                if not seq_len:
+                    break
+                if unit == self.unit and seq and \
+                        (first is None or seq < first):
+                    first = seq
+                start += seq_len
+        return first
+
+    # The image must reach the first buffered message, leaving no hole
+    def image_ready(self):
+        image = self.exchange.spin_image
+        if image is None:
+            return False
+        first = self.first_pending_sequence()
+        return first is None or image >= first - 1
+
+    # Drop the orders of the unit from the consumers before a snapshot
+    def clear_unit(self):
+        exchange = self.exchange
+        ctx = exchange.context(self.unit)
+        ts = (int(ctx.midnight) + unpack("I", ctx.pitch_time)[0]) * \
+            1000000000
+        event = Event(ts, 0, 0, 0, 0, self.unit, 0, NO_SYMBOL, b'', b'',
+                      EV_CLEAR, 0)
+        for consumer in exchange.consumers:
+            consumer.on_event(event)
+
+    """
+    Pull a snapshot and merge it with the buffered live data.
+    On failure the buffered live data is dropped and live datagrams are
+    parsed again as they come; recover() can be called again.
+    """
+    async def recover(self):
+        exchange = self.exchange
+        self.recovering = True
+        try:
+            exchange.spin_image = None
+            await self.connect()
+            await self.wait_for(self.image_ready)
+
+            seq = exchange.spin_image
+            exchange.spin_response = None
+            exchange.spin_finished = None
+            self.clear_unit()
+            self.send(spin_request(seq))
+
+            await self.wait_for(lambda: exchange.spin_response is not None)
+            status = exchange.spin_response[2]
+            if status != b'A':
+                raise SessionError("Spin request rejected (%s)" % status)
+
+            await self.wait_for(lambda: exchange.spin_finished == seq)
+        except BaseException:
+            self.recovering = False
+            self.pending = []
+            raise
+        finally:
+            await self.close()
+
+        exchange.sequences[self.unit] = seq
+        self.recovering = False
+
+        pending, self.pending = self.pending, []
+        for data, ts in pending:
+            exchange.parse(data, ts)
+
+        return seq
@@ -0,0 +1,473 @@
+"""
+@file           standin.py
+@description    Local stand-ins for the BATS MC network, with self checks
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Runs the network clients against local peers: a loopback UDP sender
+(batsmc.synth.UdpSender) for the multicast receiver, a TCP spin server
+(SpinServer) for the spin client and a gap server (GapServer) for the gap
+client. Every check feeds a synthetic flow
+(bats.synth) and compares the events or the order book delivered with a
+direct decode of the same blocks.
+
+    python -m batsmc.standin
+    python -m batsmc.standin --check receiver_loopback
+
+Exits with status 1 when a check fails.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from bats.book import OrderBook
+from bats.store import Event, EV_ADD
+from bats.synth import Synthesizer
+from .encode import HEADER, GAP_REQUEST, BlockEncoder, pack_block, \
+    login_response, gap_response, spin_image_available, spin_response, \
+    spin_finished
+from .gap import GapClient
+from .receiver import MulticastReceiver
+from .ring import RingExchange
+from .session import SessionError
+from .spin import SpinClient
+from .synth import UdpSender, iter_blocks
+
+# name => coroutine function, run by main()
+CHECKS = {}
+
+TIMEOUT = 10.0
+
+
+class CheckFailed(AssertionError):
+    pass
+
+
+def check(func):
+    CHECKS[func.__name__[len('check_'):]] = func
+    return func
+
+
+def expect(condition, message, *args):
+    if not condition:
+        raise CheckFailed(message % args)
+
+
+class Collector(object):
+    def __init__(self):
+        self.events = []
+
+    def on_event(self, event):
+        self.events.append(event)
+
+
+def synthetic_blocks(count, seed=1, unit=1, seq=1, block_size=1400):
+    return list(iter_blocks(Synthesizer(symbols=20, seed=seed), count,
+                            unit=unit, seq=seq, block_size=block_size))
+
+
+def last_sequence(block):
+    length, count, unit, seq = HEADER.unpack_from(block)
+    return seq + count - 1
+
+
+def book_of(blocks):
+    exchange = RingExchange("book")
+    book = exchange.add_consumer(OrderBook())
+    for block in blocks:
+        exchange.parse(block)
+    return exchange, book
+
+
+# Orders by symbol name, comparable across symbol id assignments
+def book_state(exchange, book):
+    name = exchange.symbols.name
+    orders = dict((order_id, (name(sid), side, price, shares))
+                  for order_id, (sid, side, price, shares, unit)
+                  in book.orders.items())
+    levels = dict((name(sid), book.depth(sid, 1 << 20))
+                  for sid, levels in enumerate(book.books)
+                  if levels is not None and (levels.bids or levels.asks))
+    return orders, levels
+
+
+async def read_messages(reader):
+    header = await reader.readexactly(2)
+    length = HEADER.unpack_from(header + bytes(6))[0]
+    block = header + await reader.readexactly(length - 2)
+    messages = []
+    offset = HEADER.size
+    while offset < length:
+        size = block[offset]
+        messages.append((block[offset + 1], block[offset + 2:offset + size]))
+        offset += size
+    return messages
+
+
+class SpinServer(object):
+    """
+    Spin server of one unit: logs any client in, offers one image and
+    sends the snapshot blocks on request
+
+    @param      image, sequence the snapshot is taken at
+    @param      snapshot, blocks of Add Orders, sent unsequenced
+    @param      delay, seconds between two snapshot blocks
+    @param      stall, accept the spin request and send nothing more
+    """
+
+    def __init__(self, unit, image, snapshot, orders, delay=0.0,
+                 stall=False):
+        self.unit = unit
+        self.image = image
+        self.snapshot = [bytearray(block) for block in snapshot]
+        for block in self.snapshot:
+            HEADER.pack_into(block, 0, len(block), block[2], unit, 0)
+        self.orders = orders
+        self.delay = delay
+        self.stall = stall
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def handle(self, reader, writer):
+        try:
+            await read_messages(reader)
+            writer.write(pack_block(0, 0, [login_response(b'A')]))
+            writer.write(pack_block(0, 0, [spin_image_available(self.image)]))
+            await read_messages(reader)
+            writer.write(pack_block(0, 0, [
+                spin_response(self.image, self.orders, b'A')]))
+            await writer.drain()
+            if self.stall:
+                await reader.read()
+                return
+            for block in self.snapshot:
+                writer.write(block)
+                await writer.drain()
+                await asyncio.sleep(self.delay)
+            writer.write(pack_block(0, 0, [spin_finished(self.image)]))
+            await writer.drain()
+            await reader.read()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class GapServer(object):
+    """
+    Gap server of one unit: accepts every request and sends back the
+    blocks holding the requested range
+
+    @param      blocks, sequenced blocks of the unit
+    @param      ignore, accept that many first requests without serving
+    @param      close_after, close the connection after that many requests
+    """
+
+    def __init__(self, blocks, ignore=0, close_after=None):
+        self.blocks = blocks
+        self.ignore = ignore
+        self.close_after = close_after
+        self.requests = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def serve(self, seq, count):
+        end = seq + count - 1
+        for block in self.blocks:
+            first = HEADER.unpack_from(block)[3]
+            if first <= end and last_sequence(block) >= seq:
+                yield block
+
+    async def handle(self, reader, writer):
+        try:
+            await read_messages(reader)
+            writer.write(pack_block(0, 0, [login_response(b'A')]))
+            while self.close_after is None or \
+                    len(self.requests) < self.close_after:
+                for mtype, body in await read_messages(reader):
+                    if mtype != GAP_REQUEST.mtype:
+                        continue
+                    unit, seq, count = GAP_REQUEST.unpack(
+                        bytes([GAP_REQUEST.size, mtype]) + body)[2:]
+                    self.requests.append((unit, seq, count))
+                    writer.write(pack_block(0, 0, [
+                        gap_response(unit, seq, count, b'A')]))
+                    if len(self.requests) > self.ignore:
+                        for block in self.serve(seq, count):
+                            writer.write(block)
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+"""
+Spin server of the book at the end of `blocks`, orders as Add Orders
+@return     SpinServer, not started
+"""
+def spin_server(blocks, unit=1, **params):
+    exchange, book = book_of(blocks)
+    encoder = BlockEncoder(exchange.symbols, unit=unit, block_size=200)
+    ts = (encoder.midnight + 8 * 3600) * 1000000000
+    snapshot = []
+    for order_id, (sid, side, price, shares, u) in book.orders.items():
+        block = encoder.add(Event(ts, order_id, 0, shares, price, 0, 0, sid,
+                                  b'', b'', EV_ADD, side))
+        if block:
+            snapshot.append(block)
+    block = encoder.flush()
+    if block:
+        snapshot.append(block)
+    return SpinServer(unit, last_sequence(blocks[-1]), snapshot,
+                      len(book.orders), **params)
+
+
+# Events of a direct decode of the blocks
+def decode(blocks):
+    exchange = RingExchange("direct")
+    collector = exchange.add_consumer(Collector())
+    for block in blocks:
+        exchange.parse(block)
+    return collector.events
+
+
+"""
+Synthetic blocks over loopback UDP into a receiver with a small queue and
+a slow consumer: every event arrives in order, the sockets are paused
+instead of dropping, and any Exchange can be attached
+"""
+@check
+async def check_receiver_loopback():
+    blocks = synthetic_blocks(5000)
+    expected = decode(blocks)
+
+    rx = MulticastReceiver([("127.0.0.1", 0)], exchange=RingExchange("rx"),
+                           maxsize=256, rcvbuf=8 << 20)
+    async with rx:
+        sender = UdpSender(*rx.addresses[0])
+        sender.send_all(blocks)
+        sender.close()
+        expect(not sender.errors, "%d datagrams not sent", sender.errors)
+
+        received = []
+
+        async def consume():
+            async for receive_ts, event in rx:
+                received.append(event)
+                if len(received) == len(expected):
+                    return
+                if not len(received) % 64:
+                    await asyncio.sleep(0.001)
+
+        await asyncio.wait_for(consume(), TIMEOUT)
+
+    expect(received == expected, "%d of %d events differ",
+           sum(1 for a, b in zip(received, expected) if a != b),
+           len(expected))
+    expect(rx.pauses > 0, "the receiver never paused its sockets")
+    expect(rx.stats()['packets'] == len(blocks), "%d of %d datagrams",
+           rx.stats()['packets'], len(blocks))
+
+
+"""
+Live data up to block 300 builds the book, blocks 300 to 600 are lost and
+the rest arrives during the spin: after recovery the book equals the book
+of the whole feed, no order of the live book is left over or duplicated.
+The snapshot takes longer than the session timeout, in small steps.
+"""
+@check
+async def check_spin_recovery():
+    blocks = synthetic_blocks(20000, block_size=400)
+    server = await spin_server(blocks[:600], delay=0.005).start()
+    expected = book_state(*book_of(blocks))
+
+    exchange, book = book_of(blocks[:300])
+    spin = SpinClient(exchange, "127.0.0.1", server.port, unit=1,
+                      timeout=0.2)
+    try:
+        recovery = asyncio.ensure_future(spin.recover())
+        await asyncio.sleep(0)
+        for block in blocks[600:]:
+            spin.feed(block)
+        seq = await asyncio.wait_for(recovery, TIMEOUT)
+    finally:
+        await server.close()
+
+    expect(len(server.snapshot) * server.delay > spin.timeout,
+           "the snapshot is faster than the session timeout")
+    expect(seq == server.image, "recovered at %s, image %s", seq,
+           server.image)
+    orders, levels = book_state(exchange, book)
+    expect(orders == expected[0], "%d orders, %d expected", len(orders),
+           len(expected[0]))
+    expect(levels == expected[1], "price levels differ")
+
+
+"""
+The server accepts the spin and goes silent: recover() fails after the
+timeout and live datagrams are parsed again, nothing stays buffered
+"""
+@check
+async def check_spin_stall():
+    blocks = synthetic_blocks(2000)
+    server = await spin_server(blocks[:10], stall=True).start()
+    exchange, book = book_of(blocks[:5])
+    spin = SpinClient(exchange, "127.0.0.1", server.port, unit=1,
+                      timeout=0.2)
+    try:
+        recovery = asyncio.ensure_future(spin.recover())
+        await asyncio.sleep(0)
+        for block in blocks[10:20]:
+            spin.feed(block)
+        try:
+            await asyncio.wait_for(recovery, TIMEOUT)
+            raise CheckFailed("recover() did not fail")
+        except SessionError:
+            pass
+    finally:
+        await server.close()
+
+    expect(not spin.recovering, "still recovering")
+    expect(not spin.pending, "%d datagrams still buffered",
+           len(spin.pending))
+    spin.feed(blocks[20])
+    expect(exchange.sequences[1] == last_sequence(blocks[20]),
+           "live data not parsed after the failure")
+
+
+async def until(predicate, timeout=TIMEOUT):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+"""
+Feed the blocks but every 7th through a GapClient against `server`
+@return     (client, collected events, direct decode of all blocks)
+"""
+async def run_gaps(blocks, server, **params):
+    exchange = RingExchange("gap")
+    collector = exchange.add_consumer(Collector())
+    gap = GapClient(exchange, "127.0.0.1", server.port, **params)
+    client = asyncio.ensure_future(gap.run())
+    try:
+        for i, block in enumerate(blocks):
+            if i % 7 != 3:
+                gap.feed(block)
+        await until(lambda: exchange.sequences.get(1) ==
+                    last_sequence(blocks[-1]) or client.done())
+    finally:
+        client.cancel()
+        await asyncio.gather(client, return_exceptions=True)
+        await server.close()
+    return gap, collector.events, decode(blocks)
+
+
+"""
+Every 7th block is lost and the server ignores the first request: the
+request is sent again at its deadline and the events come out complete
+and in order
+"""
+@check
+async def check_gap_fill():
+    blocks = synthetic_blocks(10000)
+    server = await GapServer(blocks, ignore=1).start()
+    gap, events, expected = await run_gaps(blocks, server,
+                                           request_timeout=0.1, rate=100.0,
+                                           burst=100)
+    expect(gap.retried > 0, "no request was retried")
+    expect(not gap.lost, "%d messages lost", gap.lost)
+    expect(events == expected, "%d events, %d expected", len(events),
+           len(expected))
+
+
+"""
+The server accepts and never serves: holes are skipped after the retries
+and the held blocks come out, nothing stays held
+"""
+@check
+async def check_gap_unserved():
+    blocks = synthetic_blocks(2000)
+    server = await GapServer(blocks, ignore=1 << 30).start()
+    gap, events, expected = await run_gaps(blocks, server,
+                                           request_timeout=0.05, retries=2,
+                                           rate=100.0, burst=100)
+    expect(gap.lost > 0, "no message counted lost")
+    expect(not gap.stats()['held'], "%d blocks still held",
+           gap.stats()['held'])
+    expect(len(events) < len(expected), "lost blocks decoded")
+    expect(len(server.requests) == gap.requests, "%d requests served, %d sent",
+           len(server.requests), gap.requests)
+
+
+"""
+The gap connection closes after the first request: the holes are skipped
+and later blocks are parsed as they come
+"""
+@check
+async def check_gap_closed():
+    blocks = synthetic_blocks(2000)
+    server = await GapServer(blocks, ignore=1 << 30, close_after=1).start()
+    exchange = RingExchange("gap")
+    gap = GapClient(exchange, "127.0.0.1", server.port, rate=100.0,
+                    burst=100)
+    client = asyncio.ensure_future(gap.run())
+    try:
+        for block in blocks[:3] + blocks[5:10]:
+            gap.feed(block)
+        expect(await until(client.done), "the client is still running")
+    finally:
+        await server.close()
+    expect(not gap.stats()['held'], "%d blocks still held",
+           gap.stats()['held'])
+    for block in blocks[12:]:
+        gap.feed(block)
+    expect(exchange.sequences[1] == last_sequence(blocks[-1]),
+           "blocks after the close not parsed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--check", action="append", choices=sorted(CHECKS))
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for name in args.check or sorted(CHECKS):
+        try:
+            asyncio.run(CHECKS[name]())
+            print("ok     %s" % name)
+        except Exception as ex:
+            failed += 1
+            print("FAILED %s: %s: %s" % (name, ex.__class__.__name__, ex))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
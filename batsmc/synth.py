@@ -0,0 +1,164 @@
+"""
+@file           synth.py
+@description    Synthetic BATS MC feed to file or loopback UDP
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Encodes a bats.synth.Synthesizer order flow as sequenced unit blocks.
+Generating the flow costs a few microseconds per message, so for load
+tests above that rate a pool of blocks is generated once and replayed in
+a loop (UdpSender.replay): only the sequence numbers are rewritten, which
+sends millions of messages per second from one process.
+
+    python -m batsmc.synth --messages 10000000 --udp 127.0.0.1:30001
+    python -m batsmc.synth --messages 1000000 --output synthetic.bin
+"""
+
+import argparse
+import socket
+import sys
+import time
+
+from bats.synth import Synthesizer
+from .encode import BlockEncoder, HEADER
+
+SEQUENCE_OFFSET = 4
+
+
+"""
+Sequenced unit blocks of a synthetic flow
+@param      synth, bats.synth.Synthesizer
+@param      count, number of events
+@return     bytes generator, one block each
+"""
+def iter_blocks(synth, count, unit=1, seq=1, block_size=1400, batch=65536):
+    encoder = BlockEncoder(synth.symbols, synth.day, unit, seq, block_size)
+    while count > 0:
+        for event in synth.events(min(batch, count)):
+            block = encoder.add(event)
+            if block:
+                yield block
+        count -= batch
+    block = encoder.flush()
+    if block:
+        yield block
+
+
+def write_blocks(path, synth, count, **params):
+    blocks = 0
+    with open(path, "wb") as f:
+        for block in iter_blocks(synth, count, **params):
+            f.write(block)
+            blocks += 1
+    return blocks
+
+
+class UdpSender(object):
+    """
+    Sends blocks as datagrams, optionally paced.
+
+    @param      rate, messages per second, None sends as fast as possible
+    """
+
+    def __init__(self, host="127.0.0.1", port=30001, rate=None,
+                 sndbuf=8 << 20):
+        self.address = (host, port)
+        self.rate = rate
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+        self.socket.connect(self.address)
+        self.messages = 0
+        self.datagrams = 0
+        self.errors = 0
+        self.started = None
+
+    def pace(self):
+        if self.started is None:
+            self.started = time.perf_counter()
+            return
+        ahead = self.messages / self.rate - \
+            (time.perf_counter() - self.started)
+        if ahead > 0.001:
+            time.sleep(ahead)
+
+    def send(self, block):
+        try:
+            self.socket.send(block)
+        except OSError:
+            # Receive buffer full on loopback, the datagram is lost
+            self.errors += 1
+        self.messages += block[2]
+        self.datagrams += 1
+        if self.rate and not self.datagrams % 64:
+            self.pace()
+
+    def send_all(self, blocks):
+        for block in blocks:
+            self.send(block)
+
+    """
+    Send a pool of blocks over and over, renumbered to stay in sequence
+    @param      blocks, pre-encoded blocks of one unit
+    @param      messages, stop after this number of messages
+    """
+    def replay(self, blocks, messages):
+        pool = [bytearray(block) for block in blocks]
+        seq = HEADER.unpack_from(pool[0])[3]
+        while self.messages < messages:
+            for block in pool:
+                HEADER.pack_into(block, 0, len(block), block[2], block[3],
+                                 seq)
+                seq += block[2]
+                self.send(block)
+                if self.messages >= messages:
+                    break
+
+    def close(self):
+        self.socket.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Synthetic BATS MC feed generator")
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--unit", type=int, default=1)
+    parser.add_argument("--output", help="write blocks to this file")
+    parser.add_argument("--udp", metavar="HOST:PORT",
+                        help="send blocks as datagrams")
+    parser.add_argument("--rate", type=float,
+                        help="messages per second, unpaced by default")
+    parser.add_argument("--pool", type=int, default=100000,
+                        help="messages generated for UDP replay, 0 to "
+                             "generate every message")
+    args = parser.parse_args(argv)
+
+    synth = Synthesizer(symbols=args.symbols, seed=args.seed)
+    started = time.perf_counter()
+    if args.output:
+        write_blocks(args.output, synth, args.messages, unit=args.unit)
+        sent = args.messages
+    elif args.udp:
+        host, port = args.udp.rsplit(":", 1)
+        sender = UdpSender(host, int(port), args.rate)
+        if args.pool:
+            sender.replay(list(iter_blocks(synth, args.pool, args.unit)),
+                          args.messages)
+        else:
+            sender.send_all(iter_blocks(synth, args.messages, args.unit))
+        sender.close()
+        sent = sender.messages
+    else:
+        parser.error("one of --output or --udp is required")
+    elapsed = time.perf_counter() - started
+    print("%d messages in %.2fs, %.0f msgs/s" % (sent, elapsed,
+                                                 sent / elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+@file           feeds.py
+@description    Synthetic BATS and BATS MC streams for the benchmarks
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+The order flow comes from bats.synth.Synthesizer (weighted mix, bursts,
+consistent order lifecycle). It is encoded message by message, so the
+benchmarks can regroup the messages per type before packing them into a
+BATS text or BATS MC stream.
+"""
+
+from bats.encode import TextEncoder, line
+from batsmc.encode import BlockEncoder, pack_block
+
+
+"""
+BATS text encoding
+@param      feed, bats.synth.Synthesizer
+@param      count, number of events
+@return     list of (message type, line)
+"""
+def bats_messages(feed, count):
+    encoder = TextEncoder(feed.symbols, feed.day)
+    midnight = encoder.midnight * 1000
+    messages = []
+    for event in feed.events(count):
+        ms = event.ts // 1000000 - midnight
+        for mtype, body in encoder.messages(event):
+            messages.append((mtype, line(ms, mtype, body)))
+    return messages
+
+
+def bats_stream(messages):
+    return "".join(text for mtype, text in messages).encode('ascii')
+
+
+"""
+BATS MC encoding, a Time message starts every second
+@return     list of (message type, message)
+"""
+def batsmc_messages(feed, count):
+    encoder = BlockEncoder(feed.symbols, feed.day)
+    messages = []
+    for event in feed.events(count):
+        for message in encoder.messages(event):
+            messages.append((message[1], message))
+    return messages
+
+
+"""
+Pack BATS MC messages into sequenced unit blocks
+@param      block_size, maximum block length, as a datagram payload
+"""
+def batsmc_stream(messages, unit=1, block_size=1400):
+    blocks = []
+    block = []
+    size = 8
+    seq = 1
+    for mtype, message in messages:
+        if block and (size + len(message) > block_size or len(block) == 255):
+            blocks.append(pack_block(unit, seq, block))
+            seq += len(block)
+            block = []
+            size = 8
+        block.append(message)
+        size += len(message)
+    if block:
+        blocks.append(pack_block(unit, seq, block))
+    return b"".join(blocks)
@@ -0,0 +1,165 @@
+"""
+@file           memory.py
+@description    Peak memory budgets of full day replays
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Replays synthetic days of growing size (bats.synth) through an Exchange
+with an order book and an event store writer attached, as a production
+replay does, and measures the peak memory with tracemalloc. The growth of
+the peak from one day to the next is divided by the growth of the resting
+orders left on the book at the end of the day and by the growth of the
+input; the run fails (exit status 1) when either ratio is above its
+budget. With the peak of the smallest day as fixed cost, container limits
+can be set from
+
+    peak <= fixed + resting orders / 1e6 * bytes_per_million_orders
+    peak <= fixed + input MB * bytes_per_mb_input
+
+    python -m benchmarks.memory
+    python -m benchmarks.memory --days 250000,1000000,4000000 --usage
+
+The stream is encoded before tracing starts and is not counted; it is fed
+in chunks of --read-size bytes, as read from a file.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+from bats.book import OrderBook
+from bats.memory import format_usage
+from bats.store import EventWriter
+from bats.synth import Synthesizer
+
+from .run import PROTOCOLS
+
+# Peak bytes allowed per million more orders resting at the end of the day
+# and per MB more of input
+BUDGETS = {
+    'bytes_per_million_orders': 512 << 20,
+    'bytes_per_mb_input': 4 << 20,
+}
+
+DAYS = (100000, 200000, 400000)
+
+
+"""
+Replay one synthetic day under tracemalloc
+@param      name, protocol, key of benchmarks.run.PROTOCOLS
+@param      messages, events of the day
+@return     result dict, with the memory_usage() of the Exchange at the end
+"""
+def replay(name, messages, symbols=500, seed=1, read_size=1 << 20):
+    factory, encode, stream = PROTOCOLS[name]
+    data = stream(encode(Synthesizer(symbols=symbols, seed=seed), messages))
+
+    tracemalloc.start()
+    exchange = factory("memory")
+    book = exchange.add_consumer(OrderBook())
+    writer = exchange.add_consumer(EventWriter(os.devnull))
+    for start in range(0, len(data), read_size):
+        exchange.feed(data[start:start + read_size])
+    exchange.feed_end()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    writer.close()
+
+    orders = len(book.orders)
+    return {
+        'messages': messages,
+        'bytes': len(data),
+        'resting_orders': orders,
+        'peak_bytes': peak,
+        'usage': exchange.memory_usage(),
+    }
+
+
+# Peak growth per million resting orders and per MB of input since the
+# previous (smaller) day
+def growth(result, previous):
+    peak = result['peak_bytes'] - previous['peak_bytes']
+    orders = result['resting_orders'] - previous['resting_orders']
+    size = result['bytes'] - previous['bytes']
+    result['bytes_per_million_orders'] = peak * 1e6 / orders if orders \
+        else 0.0
+    result['bytes_per_mb_input'] = peak * 1e6 / size if size else 0.0
+
+
+"""
+Compare results with the budgets
+@return     list of budget overruns
+"""
+def check(results, budgets):
+    overruns = []
+    for name, days in results.items():
+        for result in days[1:]:
+            for metric, budget in budgets.items():
+                if result[metric] > budget:
+                    overruns.append("%s %d msgs %s: %.0f > %.0f" % (
+                        name, result['messages'], metric, result[metric],
+                        budget))
+    return overruns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--days", default=",".join(map(str, DAYS)),
+                        help="messages per day, comma separated")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--read-size", type=int, default=1 << 20)
+    parser.add_argument("--protocol", action="append",
+                        choices=sorted(PROTOCOLS))
+    parser.add_argument("--per-million-orders", type=int,
+                        default=BUDGETS['bytes_per_million_orders'],
+                        help="budget, peak bytes per million resting orders")
+    parser.add_argument("--per-mb", type=int,
+                        default=BUDGETS['bytes_per_mb_input'],
+                        help="budget, peak bytes per MB of input")
+    parser.add_argument("--usage", action="store_true",
+                        help="print memory_usage() of the largest day")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    budgets = {
+        'bytes_per_million_orders': args.per_million_orders,
+        'bytes_per_mb_input': args.per_mb,
+    }
+    results = {}
+    for name in args.protocol or sorted(PROTOCOLS):
+        days = results[name] = []
+        for messages in sorted(int(n) for n in args.days.split(",")):
+            result = replay(name, messages, args.symbols, args.seed,
+                            args.read_size)
+            line = "%-7s %9d msgs %8.1f MB %8d orders %12d peak bytes" % (
+                name, messages, result['bytes'] / 1e6,
+                result['resting_orders'], result['peak_bytes'])
+            if days:
+                growth(result, days[-1])
+                line += " %6.0f MB/M orders %5.1f MB/MB" % (
+                    result['bytes_per_million_orders'] / 2 ** 20,
+                    result['bytes_per_mb_input'] / 2 ** 20)
+            days.append(result)
+            print(line)
+        if args.usage and days:
+            print(format_usage(days[-1]['usage']))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'budgets': budgets, 'results': results}, f, indent=2,
+                      sort_keys=True)
+
+    overruns = check(results, budgets)
+    for overrun in overruns:
+        print("OVER BUDGET", overrun)
+    return 1 if overruns else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+@file           run.py
+@description    Parser throughput and memory benchmarks
+@author         Andrian Yablonskyy (andrian.yablonskyy@gmail.com)
+@date           18 Oct 2026
+
+This file is released under MIT license.
+More detailed information is stored in LICENSE.txt
+
+Measures messages per second and peak memory of bats.Exchange.parse and
+batsmc.Exchange.parse per message type and end to end (with and without
+normalized events), on synthetic streams from bats.synth.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json
+
+With --baseline the run fails (exit status 1) when a throughput drops or
+a peak memory grows by more than the thresholds stored in the baseline.
+Throughput is the best of at least MIN_REPEAT parses, and is compared
+relative to the speed of a fixed reference loop timed in the same rounds,
+so a machine slower or busier than when the baseline was taken is not
+reported as a regression.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from struct import unpack_from
+
+import bats
+import batsmc
+from bats.store import EventBuffer
+from bats.synth import Synthesizer
+
+from .feeds import bats_messages, bats_stream, batsmc_messages, \
+    batsmc_stream
+
+# Relative regression tolerated by --baseline
+THRESHOLDS = {
+    'msgs_per_sec': 0.20,
+    'peak_bytes': 0.25,
+}
+
+# Cases with fewer messages are too noisy to be compared
+MIN_MESSAGES = 1000
+
+# Fewest timed parses per case
+MIN_REPEAT = 3
+
+
+class BenchBats(bats.Exchange):
+    def write_quote(self, *quote):
+        pass
+
+    def close_quotes(self):
+        pass
+
+
+class BenchBatsMC(batsmc.Exchange):
+    def write_quote(self, *quote):
+        pass
+
+    def close_quotes(self):
+        pass
+
+
+PROTOCOLS = {
+    'bats': (BenchBats, bats_messages, bats_stream),
+    'batsmc': (BenchBatsMC, batsmc_messages, batsmc_stream),
+}
+
+
+# Fixed pure Python work, unpacking and dict updates like a parser
+REFERENCE_DATA = bytes(range(256)) * 64
+REFERENCE_LOOPS = 20
+
+
+def reference_loop():
+    book = {}
+    for offset in range(0, len(REFERENCE_DATA) - 16, 4):
+        key, value = unpack_from("<QI", REFERENCE_DATA, offset)
+        book[key & 0xffff] = book.get(key & 0xffff, 0) + value
+
+
+"""
+Time REFERENCE_LOOPS runs of the reference loop
+@return     seconds
+"""
+def timed_reference():
+    gc.collect()
+    start = time.perf_counter()
+    for i in range(REFERENCE_LOOPS):
+        reference_loop()
+    return time.perf_counter() - start
+
+
+"""
+Time one parse of the stream
+@return     seconds
+"""
+def timed(factory, data, events=False):
+    exchange = factory("bench")
+    if events:
+        exchange.add_consumer(EventBuffer())
+    gc.collect()
+    start = time.perf_counter()
+    exchange.parse(data)
+    return time.perf_counter() - start
+
+
+"""
+Peak memory of one parse of the stream, `best` its fastest parse time
+@return     result dict
+"""
+def measure(factory, data, count, best, events=False):
+    exchange = factory("bench")
+    if events:
+        exchange.add_consumer(EventBuffer())
+    tracemalloc.start()
+    exchange.parse(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'messages': count,
+        'bytes': len(data),
+        'seconds': best,
+        'msgs_per_sec': count / best if best else 0.0,
+        'peak_bytes': peak,
+    }
+
+
+"""
+Best of `repeat` rounds over all the cases: a slow period of the machine
+then costs one round of every case, not every parse of one case
+@return     (results, reference loops per second)
+"""
+def run(messages=200000, symbols=100, repeat=5, seed=1, protocols=None):
+    cases = []  # (protocol, case, factory, data, count, events)
+    for name in protocols or sorted(PROTOCOLS):
+        factory, encode, stream = PROTOCOLS[name]
+        feed = Synthesizer(symbols=symbols, seed=seed)
+        encoded = encode(feed, messages)
+
+        by_type = {}
+        for mtype, message in encoded:
+            by_type.setdefault(mtype, []).append((mtype, message))
+
+        for mtype, items in sorted(by_type.items(), key=lambda x: str(x[0])):
+            key = mtype if isinstance(mtype, str) else "0x%02x" % mtype
+            cases.append((name, key, factory, stream(items), len(items),
+                          False))
+
+        data = stream(encoded)
+        cases.append((name, 'mix', factory, data, len(encoded), False))
+        cases.append((name, 'mix+events', factory, data, len(encoded), True))
+
+    best = [None] * len(cases)
+    reference = None
+    for i in range(repeat):
+        elapsed = timed_reference()
+        if reference is None or elapsed < reference:
+            reference = elapsed
+        for j, (name, key, factory, data, count, events) in \
+                enumerate(cases):
+            elapsed = timed(factory, data, events)
+            if best[j] is None or elapsed < best[j]:
+                best[j] = elapsed
+
+    results = {}
+    for j, (name, key, factory, data, count, events) in enumerate(cases):
+        results.setdefault(name, {})[key] = measure(factory, data, count,
+                                                    best[j], events)
+    return results, REFERENCE_LOOPS / reference
+
+
+"""
+Compare results with a baseline
+@return     list of regression descriptions
+"""
+def compare(results, baseline, reference=None):
+    thresholds = baseline.get('thresholds', THRESHOLDS)
+    # Machine speed now relative to the baseline's
+    scale = 1.0
+    if reference and baseline.get('reference'):
+        scale = reference / baseline['reference']
+    regressions = []
+    for name, protocol in baseline['results'].items():
+        for case, old in protocol.items():
+            new = results.get(name, {}).get(case)
+            if new is None or old['messages'] < MIN_MESSAGES:
+                continue
+            for metric, tolerance in thresholds.items():
+                if metric == 'msgs_per_sec':
+                    bad = new[metric] < \
+                        old[metric] * scale * (1 - tolerance)
+                else:
+                    bad = new[metric] > old[metric] * (1 + tolerance)
+                if bad:
+                    regressions.append("%s %s %s: %.0f => %.0f" % (
+                        name, case, metric, old[metric], new[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--protocol", action="append",
+                        choices=sorted(PROTOCOLS))
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    args = parser.parse_args(argv)
+    args.repeat = max(args.repeat, MIN_REPEAT)
+
+    results, reference = run(args.messages, args.symbols, args.repeat,
+                             args.seed, args.protocol)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'messages': args.messages,
+        'symbols': args.symbols,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'reference': reference,
+        'thresholds': THRESHOLDS,
+        'results': results,
+    }
+
+    for name, protocol in sorted(results.items()):
+        for case, result in protocol.items():
+            print("%-7s %-11s %10d msgs %12.0f msgs/s %10d peak bytes" % (
+                name, case, result['messages'], result['msgs_per_sec'],
+                result['peak_bytes']))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), reference)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())